@@ -0,0 +1,62 @@
+"""Samples taken by the adaptive schedule vs. a fixed 500 ms interval.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_adaptive_interval
+
+Replays synthetic usage traces in simulated time (no sleeping): an idle
+disk, a runaway log writing 50 MB/s for five minutes, and a 2 GB image pull.
+Reports the number of samples per hour and the largest change in usage
+between two consecutive samples, which is what a plot cannot resolve. The
+step at the onset of a burst is bounded by rate x max interval, since the
+schedule only notices activity at its next sample.
+"""
+from utils.adaptive_interval import AdaptiveInterval
+
+HOUR = 3600.0
+FIXED_INTERVAL = 0.5
+MAX_INTERVALS = (5.0, 10.0, 30.0)
+
+
+def idle(t):
+    return 100 + 1e-7 * t  # A few hundred bytes per second of log noise
+
+
+def runaway_log(t):
+    burst_start, burst_end = 1800, 2100
+    return 100 + 0.05 * min(max(t - burst_start, 0), burst_end - burst_start)
+
+
+def image_pull(t):
+    start = 1200
+    return 100 + min(max(t - start, 0) * 0.1, 2.0)  # 100 MB/s for 20 s
+
+
+def replay(trace, next_interval):
+    t = 0.0
+    last = trace(t)
+    samples = 1
+    worst_step = 0.0
+    while t < HOUR:
+        t += next_interval(t, last)
+        value = trace(t)
+        worst_step = max(worst_step, abs(value - last))
+        last = value
+        samples += 1
+    return samples, worst_step
+
+
+def main():
+    print(f"{'trace':<14} {'schedule':<22} {'samples/h':>10} {'max step (MB)':>14}")
+    for name, trace in (('idle', idle), ('runaway log', runaway_log), ('image pull', image_pull)):
+        cases = [('fixed 500 ms', lambda t, value: FIXED_INTERVAL)]
+        for max_interval in MAX_INTERVALS:
+            schedule = AdaptiveInterval(0.1, max_interval, 0.01)
+            cases.append((f'adaptive 0.1-{max_interval:g} s', lambda t, value, s=schedule: s.update(t, {'/': value})))
+        for label, next_interval in cases:
+            samples, worst_step = replay(trace, next_interval)
+            print(f"{name:<14} {label:<22} {samples:>10} {worst_step * 1000:>14.1f}")
+
+
+if __name__ == '__main__':
+    main()
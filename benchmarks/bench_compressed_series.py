@@ -0,0 +1,76 @@
+"""Encode/decode throughput and size of the compressed history chunks.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_compressed_series [days]
+
+Builds `days` (default 30) of 500 ms samples for one mount: timestamps with
+timer jitter, usage changing by a filesystem block now and then, and a flat
+Docker column. Reports bytes per sample against the raw ring buffer layout,
+encode throughput for per-sample appends and bulk loads, and decode
+throughput for a full scan and for a 20-minute view.
+"""
+import sys
+import time
+
+import numpy as np
+
+from utils.compressed_series import CompressedSeries
+
+RAW_BYTES_PER_SAMPLE = 2 * (8 + 4 + 4)  # Mirrored ring buffer: float64 time, two float32 columns
+APPEND_SAMPLES = 200_000
+VIEW_MINUTES = 20
+
+
+def make_samples(days, seed=0):
+    rng = np.random.default_rng(seed)
+    n = int(days * 24 * 60 * 60 * 2)
+    times = (np.arange(n) * 0.5 + rng.uniform(0, 0.002, n)) / 60  # Minutes, up to 2 ms jitter
+    steps = rng.choice([0] * 9 + [4096, -4096, 8192], n) / 1e9
+    usage = (250 + np.cumsum(steps)).astype(np.float32)
+    docker = np.full(n, 12.5, dtype=np.float32)
+    return times, usage, docker
+
+
+def rate(count, seconds):
+    return f"{count / seconds / 1e6:7.2f} M samples/s"
+
+
+def main():
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    times, usage, docker = make_samples(days)
+    n = len(times)
+    print(f"{n:,} samples ({days:g} days at 500 ms)\n")
+
+    for level in (1, 6):
+        series = CompressedSeries(level=level)
+        start = time.perf_counter()
+        series.extend(times, usage, docker)
+        elapsed = time.perf_counter() - start
+        print(f"bulk extend, zlib level {level}:  {rate(n, elapsed)}   "
+              f"{series.nbytes / n:5.2f} B/sample   {series.nbytes / 1e6:6.2f} MB "
+              f"(raw ring layout: {n * RAW_BYTES_PER_SAMPLE / 1e6:.0f} MB)")
+
+    appended = CompressedSeries()
+    count = min(n, APPEND_SAMPLES)
+    start = time.perf_counter()
+    for i in range(count):
+        appended.append(times[i], usage[i], docker[i])
+    print(f"per-sample append:           {rate(count, time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    decoded_times, decoded = series.range(times[0], times[-1])
+    elapsed = time.perf_counter() - start
+    assert np.array_equal(decoded['usage'], usage) and np.abs(decoded_times - times).max() < 1e-2 / 60  # Kept to 10 ms
+    print(f"decode everything:           {rate(n, elapsed)}")
+
+    view_start = times[n // 2]
+    series._cache.clear()
+    start = time.perf_counter()
+    view_times, _ = series.range(view_start, view_start + VIEW_MINUTES)
+    elapsed = time.perf_counter() - start
+    print(f"decode a {VIEW_MINUTES}-minute view:      {elapsed * 1000:7.2f} ms ({len(view_times):,} samples)")
+
+
+if __name__ == '__main__':
+    main()
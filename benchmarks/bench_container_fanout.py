@@ -0,0 +1,54 @@
+"""Total time to sample many containers with bounded concurrent fan-out.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_container_fanout
+
+A fake daemon answers each container's size query after 50 ms; one extra
+container takes 30 s and must be cut off by the per-container timeout
+without delaying the rest.
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.fake_docker import FakeDockerDaemon, container_names
+from utils import docker_utils
+
+QUERY_DELAY = 0.05
+TIMEOUT = 1.0
+COUNTS = (1, 10, 50, 200)
+
+
+def run(count, concurrency, socket_path):
+    names = container_names(count + 1)
+    daemon = FakeDockerDaemon(socket_path, names=names, delay=QUERY_DELAY,
+                              delays={f'id{count}': 30}).start()
+    docker_utils._client = None
+    try:
+        start = time.perf_counter()
+        sizes = asyncio.run(docker_utils.get_container_sizes_async(None, concurrency, TIMEOUT))
+        elapsed = time.perf_counter() - start
+    finally:
+        docker_utils.get_docker_client().close()
+        daemon.stop()
+    answered = sum(1 for size in sizes.values() if size is not None)
+    return elapsed, answered
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        socket_path = os.path.join(directory, 'docker.sock')
+        os.environ['DOCKER_HOST'] = f'unix://{socket_path}'
+        print(f"{'containers':>10}  {'sequential':>10}  {'concurrency 8':>14}  {'concurrency 32':>15}  answered")
+        for count in COUNTS:
+            row = []
+            for concurrency in (1, 8, 32):
+                elapsed, answered = run(count, concurrency, socket_path)
+                row.append(elapsed)
+            print(f"{count:>10}  {row[0]:9.2f}s  {row[1]:13.2f}s  {row[2]:14.2f}s  {answered}/{count + 1}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Directory scan time and memory, cold and with the mtime cache.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_dir_scanner [files]
+
+Builds a temporary tree of `files` (default 200,000) small files, 100 per
+directory, three levels deep, then times a sequential os.walk + lstat
+baseline, cold scans with 1 and 8 workers, and a warm rescan after touching
+1% of the directories. Peak traced memory of a cold scan, and the memory its
+cache keeps afterwards, show that both grow with directories, not files. With the tree in the page cache the scan is CPU-bound and extra
+workers gain little; they pay off on cold disks and network filesystems,
+where each worker waits on I/O.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from utils.dir_scanner import DirectoryScanner
+
+FILES_PER_DIR = 100
+FANOUT = 20
+
+
+def build_tree(root, files):
+    dirs = []
+    count = 0
+    while count < files:
+        n = len(dirs)
+        path = os.path.join(root, f'a{n // (FANOUT * FANOUT)}', f'b{n // FANOUT % FANOUT}', f'c{n % FANOUT}')
+        os.makedirs(path)
+        for i in range(min(FILES_PER_DIR, files - count)):
+            with open(os.path.join(path, f'f{i}'), 'wb') as f:
+                f.write(b'x' * 100)
+        count += FILES_PER_DIR
+        dirs.append(path)
+    return dirs
+
+
+def walk(root):
+    total = 0
+    for path, _, names in os.walk(root):
+        for name in names:
+            total += os.lstat(os.path.join(path, name)).st_blocks * 512
+    return total
+
+
+def timed(label, func):
+    start = time.perf_counter()
+    result = func()
+    print(f"{label:<34} {(time.perf_counter() - start) * 1000:9.1f} ms")
+    return result
+
+
+def traced_memory(func):
+    """(bytes still held, peak bytes) allocated while func() ran"""
+    tracemalloc.start()
+    func()
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return held, peak
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    root = tempfile.mkdtemp()
+    try:
+        dirs = build_tree(root, files)
+        print(f"{files:,} files in {len(dirs):,} directories\n")
+        timed('os.walk + lstat, sequential', lambda: walk(root))
+        timed('scanner, cold, 1 worker', DirectoryScanner(root, workers=1).scan)
+        scanner = DirectoryScanner(root)
+        timed('scanner, cold, 8 workers', scanner.scan)
+        for path in dirs[::100]:
+            with open(os.path.join(path, 'new'), 'wb') as f:
+                f.write(b'y' * 4096)
+        snapshot = timed('scanner, warm, 1% of dirs changed', scanner.scan)
+        print(f"\n{len(scanner.cache):,} cached listings, {len(snapshot.sizes):,} directories in the snapshot")
+        scanner = DirectoryScanner(root)
+        held, peak = traced_memory(scanner.scan)
+        print(f"cold scan: peak traced memory {peak / 1e6:.1f} MB, cache kept {held / 1e6:.1f} MB")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Per-sample latency and CPU of the Docker usage query, CLI vs. Engine API.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_docker [samples]
+
+Everything runs against fakes (benchmarks/fake_docker.py), so no Docker
+installation is needed. The fake daemon runs in a child process and the CLI
+cases fork the fake `docker` script, so CPU is reported as this process plus
+any children it waited for (the forked CLI processes).
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.fake_docker import FakeDockerDaemon, write_fake_cli
+from utils import docker_utils
+
+
+def _serve(socket_path, host_path):
+    FakeDockerDaemon(socket_path, host_path=host_path).serve_forever()
+
+
+def start_daemon(socket_path, host_path):
+    process = multiprocessing.Process(target=_serve, args=(socket_path, host_path), daemon=True)
+    process.start()
+    while not os.path.exists(socket_path):
+        time.sleep(0.01)
+    return process
+
+
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def measure(name, fn, samples):
+    fn()  # Warm up (connection, container lookup)
+    latencies = np.empty(samples)
+    cpu_start = cpu_seconds()
+    for i in range(samples):
+        start = time.perf_counter()
+        total, used = fn()
+        latencies[i] = time.perf_counter() - start
+        assert total, f"{name} returned no data"
+    cpu = (cpu_seconds() - cpu_start) / samples
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{name:<22} p50 {p50:8.3f} ms   p99 {p99:8.3f} ms   cpu {cpu * 1000:8.3f} ms/sample")
+
+
+def main():
+    samples = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with tempfile.TemporaryDirectory() as directory:
+        write_fake_cli(directory)
+        os.environ['PATH'] = directory + os.pathsep + os.environ['PATH']
+        measure('CLI (before)', docker_utils.get_docker_usage_cli, max(10, samples // 10))
+
+        for name, host_path in (('API + host statvfs', directory), ('API + exec', None)):
+            socket_path = os.path.join(directory, 'docker.sock')
+            daemon = start_daemon(socket_path, host_path)
+            os.environ['DOCKER_HOST'] = f'unix://{socket_path}'
+            docker_utils._client = None
+            try:
+                measure(name, docker_utils.get_docker_usage, samples)
+            finally:
+                docker_utils.get_docker_client().close()
+                daemon.terminate()
+                daemon.join()
+                os.remove(socket_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""Throughput and latency of the fleet collector over localhost.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_fleet
+
+Starts a collector in its own process (as `main.py --collector` would), then:
+
+- throughput: 100 and 300 simulated agents on one asyncio loop each send
+  pre-encoded 500-sample batches as fast as their acknowledgement window
+  allows, for a few seconds; reports samples/s stored and the collector's CPU
+- latency: 200 real AgentSinks sample at 10 Hz with a 100 ms batch interval,
+  and a CollectorClient subscribed to 10 of them measures the time from a
+  sample's timestamp to its arrival in the GUI-side queue
+"""
+import asyncio
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import psutil
+
+from utils.fleet_agent import AgentSink, MAX_IN_FLIGHT
+from utils.fleet_client import CollectorClient
+from utils.fleet_protocol import HELLO, WIRE_DTYPE, batch_frame, json_frame, read_frame
+
+PORT = 19840
+THROUGHPUT_AGENTS = (100, 300)
+THROUGHPUT_SECONDS = 5
+BATCH = 500
+LATENCY_AGENTS = 200
+LATENCY_RATE = 10  # Samples per second per agent
+LATENCY_SECONDS = 10
+LATENCY_VIEWED = 10
+
+
+def start_collector():
+    process = subprocess.Popen([sys.executable, 'main.py', '--collector', f'127.0.0.1:{PORT}'],
+                               stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', PORT), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("collector did not start")
+
+
+def make_records(count):
+    records = np.zeros(count, dtype=WIRE_DTYPE)
+    records['time'] = time.time() + np.arange(count) * 0.1
+    records['total'] = 1000
+    records['used'] = 400 + np.arange(count) * 1e-4
+    return records
+
+
+async def flood(index, records, stop, counts):
+    """One simulated agent sending batches back to back within the acknowledgement window"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+    writer.write(json_frame(HELLO, {'role': 'agent', 'session': index, 'host': f'flood-{index}', 'drive': '/'}))
+    seq = acked = 0
+    while not stop.is_set():
+        while seq - acked < MAX_IN_FLIGHT:
+            seq += 1
+            writer.write(batch_frame(seq, records))
+        await writer.drain()
+        _, payload = await read_frame(reader)
+        acked = int.from_bytes(payload, 'little')
+        counts[index] = acked * len(records)
+    writer.close()
+
+
+async def measure_throughput(agents, collector):
+    records = make_records(BATCH)
+    stop = asyncio.Event()
+    counts = [0] * agents
+    tasks = [asyncio.create_task(flood(i, records, stop, counts)) for i in range(agents)]
+    await asyncio.sleep(1)  # Connect and warm up
+    start_count, start = sum(counts), time.perf_counter()
+    collector.cpu_percent()
+    await asyncio.sleep(THROUGHPUT_SECONDS)
+    rate = (sum(counts) - start_count) / (time.perf_counter() - start)
+    cpu = collector.cpu_percent()
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return rate, cpu
+
+
+def measure_latency():
+    client = CollectorClient(('127.0.0.1', PORT))
+    loop = asyncio.new_event_loop()
+    loop.create_task(client.run())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    agents = [AgentSink(('127.0.0.1', PORT), host=f'agent-{i}', batch_interval=0.1) for i in range(LATENCY_AGENTS)]
+
+    def sample():
+        return {'time': time.time(), 'drive': '/', 'total_gb': 1000.0, 'used_gb': 400.0, 'available_gb': 600.0,
+                'percent': 40.0, 'docker_total_gb': None, 'docker_used_gb': None}
+
+    latencies = []
+    subscribed = None  # When the GUI side subscribed; older samples are its backlog
+    end = time.monotonic() + LATENCY_SECONDS
+    next_tick = time.monotonic()
+    while time.monotonic() < end:
+        for agent in agents:
+            agent.write(sample())
+        if subscribed is None and time.monotonic() > end - LATENCY_SECONDS + 1:
+            for i in range(LATENCY_VIEWED):
+                client.subscribe(f'agent-{i}:/')
+            subscribed = time.time()
+        now = time.time()
+        for _, records in client.drain():
+            live = records['time'][records['time'] > subscribed]
+            latencies.extend((now - live).tolist())
+        next_tick += 1 / LATENCY_RATE
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+    dropped = sum(agent.stats()['dropped'] for agent in agents)
+    for agent in agents:
+        agent.close(timeout=0.5)
+    client.stop()
+    return np.array(latencies), dropped
+
+
+def main():
+    collector_process = start_collector()
+    collector = psutil.Process(collector_process.pid)
+    try:
+        print(f"{'agents':>8} {'samples/s':>12} {'MB/s':>8} {'collector CPU':>14}")
+        for agents in THROUGHPUT_AGENTS:
+            rate, cpu = asyncio.run(measure_throughput(agents, collector))
+            print(f"{agents:>8} {rate:>12,.0f} {rate * WIRE_DTYPE.itemsize / 1e6:>8.1f} {cpu:>13.0f}%")
+
+        latencies, dropped = measure_latency()
+        latencies *= 1000
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"\n{LATENCY_AGENTS} agents at {LATENCY_RATE} Hz, 100 ms batches: sample to GUI queue "
+              f"p50 {p50:.1f} ms, p99 {p99:.1f} ms, max {latencies.max():.1f} ms "
+              f"({len(latencies):,} samples seen, {dropped} dropped)")
+    finally:
+        collector_process.terminate()
+        collector_process.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Cost of the streaming fill-rate estimator vs. history length.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_forecast
+
+Primes a GrowthEstimator with 1k, 100k and 10M samples of a slowly
+climbing disk (100 ms apart), then times update() + fit() per new sample.
+For comparison, refitting a weighted regression over the whole history with
+numpy, as a non-streaming forecast would on every sample, grows linearly.
+"""
+import time
+
+import numpy as np
+
+from utils.forecast import GrowthEstimator
+
+HISTORY_SIZES = (1_000, 100_000, 10_000_000)
+UPDATES = 100_000
+INTERVAL = 0.1 / 60  # Minutes
+
+
+def make_history(n, seed=0):
+    rng = np.random.default_rng(seed)
+    times = np.arange(n) * INTERVAL
+    usage = 200 + 0.001 * times + rng.normal(0, 0.005, n)  # 60 MB/h plus noise
+    return times, usage
+
+
+def main():
+    print(f"{'history':>12} {'update+fit (us)':>16} {'full refit (ms)':>16} {'GB/h':>8}")
+    for n in HISTORY_SIZES:
+        times, usage = make_history(n)
+        estimator = GrowthEstimator()
+        estimator.extend(times, usage)
+
+        new_times = times[-1] + np.arange(1, UPDATES + 1) * INTERVAL
+        new_usage = 200 + 0.001 * new_times
+        start = time.perf_counter()
+        for t, y in zip(new_times.tolist(), new_usage.tolist()):
+            estimator.update(t, y)
+            estimator.fit()
+        per_update = (time.perf_counter() - start) / UPDATES
+
+        start = time.perf_counter()
+        weights = np.exp(estimator.decay * (times - times[-1]))
+        np.polyfit(times - times[-1], usage, 1, w=np.sqrt(weights))
+        refit = time.perf_counter() - start
+
+        _, rate = estimator.fit()
+        print(f"{n:>12,} {per_update * 1e6:>16.2f} {refit * 1000:>16.2f} {rate * 60:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Restart cost with a large persisted history.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_history_store [stored_samples]
+
+Writes `stored_samples` records (default 5M) into a temporary history
+directory, then times what DiskMonitor does on startup: repairing and mapping
+the segments, copying the newest ring-capacity records and rebuilding the
+decimation pyramid.
+"""
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from utils.decimation import MinMaxPyramid
+from utils.history_store import HistoryStore, RECORD_DTYPE, SEGMENT_MAGIC, HEADER_SIZE, PAYLOAD_SIZE
+from utils.ring_buffer import RingBuffer, DEFAULT_CAPACITY
+
+SEGMENT_RECORDS = 1_000_000
+
+
+def write_segments(directory, count):
+    """Write segment files in the store's format without going through append()"""
+    start = time.time() - count * 0.5
+    for number, first in enumerate(range(0, count, SEGMENT_RECORDS), start=1):
+        n = min(SEGMENT_RECORDS, count - first)
+        records = np.zeros(n, dtype=RECORD_DTYPE)
+        records['time'] = start + (first + np.arange(n)) * 0.5
+        records['usage'] = 150 + np.sin(np.arange(n) / 1000)
+        records['docker_usage'] = 20
+        raw = records.view(np.uint8).reshape(n, -1)
+        records['crc'] = [zlib.crc32(row[:PAYLOAD_SIZE].tobytes()) for row in raw]
+        with open(os.path.join(directory, f'segment-{number:06d}.dat'), 'wb') as f:
+            f.write(SEGMENT_MAGIC.ljust(HEADER_SIZE, b'\0'))
+            f.write(records.tobytes())
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000_000
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Writing {count:,} records...")
+        write_segments(directory, count)
+
+        start = time.perf_counter()
+        store = HistoryStore(directory, segment_records=SEGMENT_RECORDS)
+        segments = store.load()
+        loaded = time.perf_counter()
+
+        history = RingBuffer(DEFAULT_CAPACITY)
+        pyramid = MinMaxPyramid(history)
+        tail = HistoryStore.tail(segments, history.capacity)
+        start_time = float(tail[0]['time'][0])
+        for part in tail:
+            history.extend((part['time'] - start_time) / 60, part['usage'], part['docker_usage'])
+        copied = time.perf_counter()
+        pyramid.rebuild()
+        done = time.perf_counter()
+        store.close()
+
+    print(f"map segments:    {(loaded - start) * 1000:8.1f} ms")
+    print(f"copy tail ({len(history):,}): {(copied - loaded) * 1000:8.1f} ms")
+    print(f"rebuild pyramid: {(done - copied) * 1000:8.1f} ms")
+    print(f"total:           {(done - start) * 1000:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
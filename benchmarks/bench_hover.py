@@ -0,0 +1,67 @@
+"""Hover/click lookup latency against history size.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_hover
+
+The indexed lookup (binary search plus direct reads) should stay flat as the
+history grows; the legacy list/argmin scan is shown for comparison and grows
+linearly.
+"""
+import sys
+import time
+
+import numpy as np
+
+from utils.ring_buffer import RingBuffer
+
+SIZES = (1_000, 100_000, 1_000_000, 10_000_000)
+LEGACY_MAX_SIZE = 1_000_000  # The legacy scan takes seconds per lookup beyond this
+LOOKUPS = 2000
+
+
+def make_history(size):
+    history = RingBuffer(size)
+    times = np.arange(size, dtype=np.float64) / 120  # 500 ms samples, in minutes
+    usage = np.linspace(100, 200, size, dtype=np.float32)
+    history.extend(times, usage, usage / 2)
+    return history
+
+
+def indexed_lookup(history, x):
+    idx = history.nearest_index(x)
+    return history.time_at(idx), history.value_at('usage', idx), history.value_at('docker_usage', idx)
+
+
+def legacy_lookup(history, x):
+    times_array = np.array(list(history.times))
+    idx = np.abs(times_array - x).argmin()
+    return times_array[idx], list(history.column('usage'))[idx], list(history.column('docker_usage'))[idx]
+
+
+def measure(lookup, history, count):
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(0, history.times[-1], count)
+    samples = np.empty(count)
+    for i, x in enumerate(xs):
+        start = time.perf_counter()
+        lookup(history, x)
+        samples[i] = time.perf_counter() - start
+    return np.percentile(samples, [50, 99]) * 1e6
+
+
+def main():
+    print(f"{'samples':>12}  {'indexed p50':>12}  {'indexed p99':>12}  {'legacy p50':>12}")
+    for size in SIZES:
+        history = make_history(size)
+        p50, p99 = measure(indexed_lookup, history, LOOKUPS)
+        legacy = '-'
+        if size <= LEGACY_MAX_SIZE:
+            legacy_p50, _ = measure(legacy_lookup, history, max(3, LOOKUPS // size))
+            legacy = f"{legacy_p50:10.1f}us"
+        print(f"{size:>12,}  {p50:10.1f}us  {p99:10.1f}us  {legacy:>12}")
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Cost of scraping the metrics endpoint, with and without a new sample in between.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_metrics
+
+Publishes a snapshot of 20 drives and 200 containers, then scrapes /metrics
+over HTTP: first repeatedly between samples (served from the cached
+encoding), then with a new snapshot published before every scrape (encoded
+each time), as when polling faster than sampling. Every scrape also adds
+the freshness of three sources, which is never cached. Also times building
+and publishing a snapshot, which the collector does once per sample.
+"""
+import time
+import urllib.request
+
+import numpy as np
+
+from utils.metrics_exporter import (MetricsExporter, MetricsSnapshot, add_drive, add_docker, add_containers,
+                                    add_freshness, add_sampler)
+from utils.scheduler import SampleStore
+
+DRIVES = 20
+CONTAINERS = 200
+SCRAPES = 500
+STATS = {'interval_ms': 100.0, 'ticks': 1000, 'late_ticks': 2, 'dropped_ticks': 0, 'overflowed': 0,
+         'jitter_p99_ms': 0.4}
+
+
+def make_snapshot(t):
+    snapshot = MetricsSnapshot()
+    for i in range(DRIVES):
+        add_drive(snapshot, f'/mnt/disk{i}', (1000.0, 400.0 + t, 600.0 - t, 40.0), 0.01, 60_000.0)
+    add_docker(snapshot, (250.0, 80.0), 0.002)
+    add_containers(snapshot, {f'container-{i}': 0.1 * i for i in range(CONTAINERS)})
+    add_sampler(snapshot, STATS, time.time())
+    return snapshot
+
+
+def scrape_times(url, exporter=None):
+    latencies = np.empty(SCRAPES)
+    for i in range(SCRAPES):
+        if exporter is not None:
+            exporter.publish(make_snapshot(i))
+        start = time.perf_counter()
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+def main():
+    store = SampleStore()
+    for name in ('disk', 'docker', 'containers'):
+        store.register(name, stale_after=30.0)
+        store.put(name, time.time(), None)
+    exporter = MetricsExporter(port=0, live=lambda snapshot: add_freshness(snapshot, store)).start()
+    url = f'http://127.0.0.1:{exporter.address[1]}/metrics'
+    exporter.publish(make_snapshot(0))
+
+    start = time.perf_counter()
+    for i in range(SCRAPES):
+        exporter.publish(make_snapshot(i))
+    publish = (time.perf_counter() - start) / SCRAPES
+
+    size = len(exporter.encoded(False))
+    print(f"{DRIVES} drives, {CONTAINERS} containers: {size / 1000:.1f} KB per scrape, "
+          f"snapshot built and published in {publish * 1000:.3f} ms")
+    print(f"{'scrape':<26} {'p50 ms':>8} {'p99 ms':>8} {'encodings':>10}")
+    for label, publisher in (('between samples (cached)', None), ('new sample every scrape', exporter)):
+        before = exporter.encodings
+        latencies = scrape_times(url, publisher) * 1000
+        p50, p99 = np.percentile(latencies, [50, 99])
+        print(f"{label:<26} {p50:8.3f} {p99:8.3f} {exporter.encodings - before:>10}")
+    exporter.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Build and query cost of the rollup tiers, and the memory they hold.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rollups [days]
+
+Rolls up `days` (default 30) of 500 ms samples for one mount in bulk, as a
+history restore does, then times per-sample appends and a 1000-pixel view
+for every zoom stop of the plot, ending at the newest sample. Memory is
+fixed by ROLLUP_TIERS however long the history gets.
+"""
+import sys
+import time
+
+from benchmarks.bench_compressed_series import make_samples, rate
+from ui.plot_manager import ZOOM_WINDOWS, format_window
+from utils.rollups import Rollups, ROLLUP_TIERS
+
+APPEND_SAMPLES = 100_000
+WIDTH = 1000
+VIEW_REPEATS = 20
+
+
+def main():
+    days = float(sys.argv[1]) if len(sys.argv) > 1 else 30
+    times, usage, docker = make_samples(days)
+    n = len(times)
+    print(f"{n:,} samples ({days:g} days at 500 ms)\n")
+
+    rollups = Rollups()
+    start = time.perf_counter()
+    rollups.extend(times, usage, docker)
+    print(f"bulk extend:        {rate(n, time.perf_counter() - start)}")
+
+    appended = Rollups()
+    count = min(n, APPEND_SAMPLES)
+    start = time.perf_counter()
+    for i in range(count):
+        appended.append(times[i], usage[i], docker[i])
+    print(f"per-sample append:  {rate(count, time.perf_counter() - start)}")
+
+    nbytes = sum(tier.buckets._times.nbytes + sum(c.nbytes for c in tier.buckets._columns.values())
+                 for tier in rollups.tiers)
+    print(f"memory:             {nbytes / 1e6:.2f} MB for tiers "
+          + ", ".join(f"{width * 60:g} s x {retention / (24 * 60):g} d" for width, retention in ROLLUP_TIERS))
+
+    print(f"\n{'zoom':>8} {'tier':>8} {'points':>8} {'ms':>8}")
+    latest = times[-1]
+    for window in ZOOM_WINDOWS:
+        t0 = max(0, latest - window)
+        tier = rollups.select(t0, latest, WIDTH)
+        start = time.perf_counter()
+        for _ in range(VIEW_REPEATS):
+            x, _ = rollups.visible(t0, latest, WIDTH)
+        elapsed = (time.perf_counter() - start) / VIEW_REPEATS
+        print(f"{format_window(window):>8} {tier.width * 60:>7g}s {len(x):>8} {elapsed * 1000:>8.3f}")
+
+
+if __name__ == '__main__':
+    main()
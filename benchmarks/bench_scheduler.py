@@ -0,0 +1,97 @@
+"""Whether a slow or hung source holds up the others on the shared scheduler.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_scheduler
+
+Runs the real disk source at a fixed 10 ms interval for a few seconds, first
+alone, then next to sources that misbehave: one whose reads hang forever
+(threads), one whose coroutine reads take 20x their timeout, one that always
+raises and one that takes 300 ms per read at a 50 ms interval. Reports the
+disk source's readings, gaps between readings and tick lateness in each run,
+and what the scheduler counted for the misbehaving sources.
+"""
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from utils.scheduler import SampleStore, Scheduler, Source
+from utils.sources import DiskSource
+
+SECONDS = 5
+INTERVAL = 0.01
+
+
+class HungSource(Source):
+    def __init__(self):
+        super().__init__('hung', interval=0.05, timeout=0.2, concurrency=2)
+
+    def read(self):
+        threading.Event().wait()
+
+
+class SlowAsyncSource(Source):
+    def __init__(self):
+        super().__init__('slow_async', interval=0.05, timeout=0.05)
+
+    async def read(self):
+        await asyncio.sleep(1.0)
+
+
+class FailingSource(Source):
+    def __init__(self):
+        super().__init__('failing', interval=0.02, timeout=0.5)
+
+    def read(self):
+        raise OSError('unavailable')
+
+
+class OverrunningSource(Source):
+    def __init__(self):
+        super().__init__('overrunning', interval=0.05, timeout=1.0)
+
+    def read(self):
+        time.sleep(0.3)
+        return 0.0
+
+
+def run(extra_sources):
+    store = SampleStore()
+    scheduler = Scheduler(store)
+    scheduler.add(DiskSource(lambda: ['/'], INTERVAL, INTERVAL, 0.01))
+    for source in extra_sources:
+        scheduler.add(source)
+    scheduler.start()
+    time.sleep(SECONDS)
+    stats = {name: scheduler.stats(name) for name in scheduler.sources}
+    readings = store.drain('disk')
+    scheduler.stop()
+    times = np.array([timestamp for timestamp, _ in readings])
+    return times, stats
+
+
+def main():
+    print(f"disk source every {INTERVAL * 1000:.0f} ms for {SECONDS} s\n")
+    print(f"{'alongside':<28} {'readings':>9} {'gap p50':>8} {'gap p99':>8} {'gap max':>8} "
+          f"{'late p99':>9} {'dropped':>8}")
+    for label, sources in (('nothing', []),
+                           ('4 misbehaving sources', [HungSource(), SlowAsyncSource(), FailingSource(),
+                                                      OverrunningSource()])):
+        times, stats = run(sources)
+        gaps = np.diff(times) * 1000
+        p50, p99 = np.percentile(gaps, [50, 99])
+        disk = stats['disk']
+        print(f"{label:<28} {len(times):>9} {p50:>7.1f}ms {p99:>7.1f}ms {gaps.max():>7.1f}ms "
+              f"{disk['jitter_p99_ms']:>8.1f}ms {disk['dropped_ticks']:>8}")
+    print()
+    for name, source in stats.items():
+        if name != 'disk':
+            print(f"{name:<12} ticks {source['ticks']:>4}  dropped {source['dropped_ticks']:>4}  "
+                  f"timeouts {source['timeouts']:>3}  errors {source['errors']:>4}")
+    print(f"\nthreads alive at the end: {threading.active_count()} (hung reads hold at most their concurrency)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""Export and import speed of session files.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_session_file [samples]
+
+Fills a drive history with `samples` synthetic samples (default 10M, close
+together so all of them are still held raw), then for each available format
+times what "Export Session..." does (streaming the compressed history to the
+file) and what "Open Session..." does (loading the file and filling a new
+history, until its background restore has compressed and rolled up every
+sample), and reports the file size.
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from utils.drive_history import DriveHistory
+from utils.history_store import RECORD_DTYPE
+from utils.ring_buffer import DEFAULT_CAPACITY
+from utils.session_file import export_session, have_pyarrow, load_session
+
+DEFAULT_SAMPLES = 10_000_000
+SPACING = 0.015  # Seconds between samples; 10M of them span less than the raw retention
+
+
+def make_history(count):
+    end = time.time()
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    records['time'] = end - (count - np.arange(count)) * SPACING
+    steps = np.random.default_rng(0).choice([0] * 9 + [4096, -4096, 8192], count) / 1e9
+    records['usage'] = 100 + np.cumsum(steps)
+    records['docker_usage'] = 12.5
+    start_time = float(records['time'][0])
+    history = DriveHistory('/', DEFAULT_CAPACITY)
+    history.fill([records], start_time)
+    history.raw_samples()  # Wait for the restore
+    return history, start_time
+
+
+def export(history, start_time, path):
+    count, chunks = history.raw_samples()
+    columns = ((start_time + times * 60, values['usage'], values['docker_usage']) for times, values in chunks)
+    return export_session(path, columns, count, {'drive': '/', 'total_gb': 500.0})
+
+
+def load(path):
+    parts, _ = load_session(path)
+    history = DriveHistory('file:' + path, DEFAULT_CAPACITY)
+    history.fill(parts, float(parts[0]['time'][0]))
+    first_frame = time.perf_counter()
+    history._restore_thread.join()
+    history._collect_restore()
+    history.visible(0, (parts[-1]['time'][-1] - parts[0]['time'][0]) / 60, 1000)
+    return first_frame, history
+
+
+def main():
+    count = int(float(sys.argv[1])) if len(sys.argv) > 1 else DEFAULT_SAMPLES
+    print(f"Building a history of {count:,} samples...")
+    history, start_time = make_history(count)
+    extensions = ['.npy', '.csv']
+    if have_pyarrow():
+        extensions = ['.arrow', '.parquet'] + extensions
+    else:
+        print("pyarrow is not installed; skipping .arrow and .parquet")
+
+    print(f"\n{'format':>9} {'export s':>9} {'MB':>8} {'shown s':>8} {'loaded s':>9}")
+    with tempfile.TemporaryDirectory() as directory:
+        for extension in extensions:
+            path = os.path.join(directory, 'session' + extension)
+            start = time.perf_counter()
+            written = export(history, start_time, path)
+            exported = time.perf_counter() - start
+            assert written == count, (written, count)
+
+            start = time.perf_counter()
+            first_frame, loaded = load(path)
+            done = time.perf_counter()
+            assert len(loaded.restored) == count
+            print(f"{extension:>9} {exported:>9.2f} {os.path.getsize(path) / 1e6:>8.1f} "
+                  f"{first_frame - start:>8.2f} {done - start:>9.2f}")
+            del loaded
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Startup time per phase, and a budget for time to first paint.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup [runs] [budget_ms]
+
+Starts the app `runs` times (default 5) with `--profile-startup` on Qt's
+offscreen platform and without stored history, prints the median of every
+phase, and exits non-zero if the median time to first paint is over
+`budget_ms` (default 1500), so it can gate changes in CI.
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+DEFAULT_RUNS = 5
+DEFAULT_BUDGET_MS = 1500
+
+
+def profile_once(path):
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    subprocess.run([sys.executable, 'main.py', '--profile-startup', path, '--no-history'],
+                   env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=60, check=True)
+    with open(path) as f:
+        return json.load(f)['phases']
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RUNS
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BUDGET_MS
+    durations = {}  # Phase -> [ms per run]
+    to_first_paint = []
+    with tempfile.TemporaryDirectory() as directory:
+        for i in range(runs):
+            total = 0
+            for phase in profile_once(os.path.join(directory, f'run{i}.json')):
+                durations.setdefault(phase['phase'], []).append(phase['ms'])
+                total += phase['ms']
+                if phase['phase'] == 'first paint':
+                    to_first_paint.append(total)
+
+    cumulative = 0
+    print(f"{'phase':<28} {'median ms':>10} {'total':>8}")
+    for phase, values in durations.items():
+        median = float(np.median(values))
+        cumulative += median
+        print(f"{phase:<28} {median:10.1f} {cumulative:8.1f}")
+
+    first_paint = float(np.median(to_first_paint))
+    ok = first_paint <= budget_ms
+    print(f"\nfirst paint after {first_paint:.0f} ms (budget {budget_ms:.0f} ms): {'ok' if ok else 'OVER BUDGET'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Live write attribution under an event storm, like an `npm install`.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_write_attribution [files]
+
+Writes `files` (default 50,000) small files into 500 fresh directories of a
+watched temporary tree: without a watcher, with a WriteAttributor reading
+inotify directly (Linux only) and with one going through watchdog, REPEATS
+times each, interleaved. Reports the median process CPU time of each, the
+events received and dropped, and how long after the storm the totals were
+complete.
+"""
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from utils import write_attribution
+from utils.write_attribution import WriteAttributor
+
+DIRECTORIES = 500
+FILE_BYTES = 1000
+SETTLE_TIMEOUT = 30
+REPEATS = 3
+
+
+def storm(root, files):
+    per_dir = -(-files // DIRECTORIES)
+    for d in range(DIRECTORIES):
+        path = os.path.join(root, 'node_modules', f'pkg{d}')
+        os.makedirs(path)
+        for i in range(per_dir):
+            with open(os.path.join(path, f'f{i}.js'), 'wb') as f:
+                f.write(b'x' * FILE_BYTES)
+
+
+def run(files, watch):
+    root = tempfile.mkdtemp()
+    libc = write_attribution._libc
+    if watch == 'watchdog':
+        write_attribution._libc = None  # As on a system without inotify
+    try:
+        attributor = None
+        if watch:
+            attributor = WriteAttributor([root])
+            attributor.start()
+            time.sleep(1)  # Let it plan and schedule its watches
+        cpu = time.process_time()
+        storm(root, files)
+        written = -(-files // DIRECTORIES) * DIRECTORIES * FILE_BYTES
+        if attributor is None:
+            return time.process_time() - cpu, None
+        start = time.monotonic()
+        while time.monotonic() - start < SETTLE_TIMEOUT:
+            counted = sum(count for _, count in attributor.top(DIRECTORIES))
+            if counted >= written or attributor.stats()['pending'] == 0 and time.monotonic() - start > 2:
+                break
+            time.sleep(0.1)
+        settle = time.monotonic() - start
+        cpu = time.process_time() - cpu
+        stats = attributor.stats()
+        attributor.stop()
+        attributor.join()
+        return cpu, (stats, counted / written, settle)
+    finally:
+        write_attribution._libc = libc
+        shutil.rmtree(root)
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    modes = [None, 'watchdog'] + (['inotify'] if write_attribution._libc is not None else [])
+    cpu = {mode: [] for mode in modes}
+    results = {}
+    for _ in range(REPEATS):
+        for mode in modes:
+            seconds, results[mode] = run(files, watch=mode)
+            cpu[mode].append(seconds)
+    baseline = statistics.median(cpu[None])
+    print(f"{files:,} files in {DIRECTORIES} directories, median of {REPEATS} runs\n")
+    print(f"{'':<16} {'CPU s':>7} {'overhead':>9} {'events':>8} {'dropped':>8} {'attributed':>11} {'settle s':>9}")
+    print(f"{'no watcher':<16} {baseline:7.2f}")
+    for mode in modes[1:]:
+        stats, share, settle = results[mode]
+        seconds = statistics.median(cpu[mode])
+        print(f"{mode:<16} {seconds:7.2f} {seconds / baseline - 1:+9.0%} {stats['events']:>8,} "
+              f"{stats['dropped']:>8,} {share:>11.0%} {settle:9.1f}")
+
+
+if __name__ == '__main__':
+    main()
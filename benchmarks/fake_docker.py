@@ -0,0 +1,132 @@
+"""A fake Docker daemon and docker CLI for exercising utils/docker_utils offline.
+
+FakeDockerDaemon answers the handful of Engine API endpoints the monitor uses
+on a Unix socket; write_fake_cli() writes a `docker` shell script that mimics
+`docker ps` and `docker exec ... df -k /` for the CLI fallback.
+"""
+import json
+import os
+import socketserver
+import stat
+import threading
+
+DF_OUTPUT = (
+    b'Filesystem     1K-blocks     Used Available Use% Mounted on\n'
+    b'overlay         61255492 12345678  45678901  22% /\n'
+)
+
+
+def container_names(count):
+    return [f'prokit_database_{i}' for i in range(count)]
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            request_line = self.rfile.readline()
+            if not request_line:
+                return
+            method, path, _ = request_line.decode().split(' ', 2)
+            length = 0
+            while True:
+                line = self.rfile.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode().partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            if length:
+                self.rfile.read(length)
+            try:
+                if not self.respond(method, path.split('?')[0]):
+                    return
+            except (BrokenPipeError, ConnectionResetError):
+                return  # The client gave up on a slow request
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.wfile.write(f'HTTP/1.1 {status} OK\r\nContent-Type: application/json\r\n'
+                         f'Content-Length: {len(data)}\r\n\r\n'.encode() + data)
+
+    def respond(self, method, path):
+        daemon = self.server.daemon
+        if path == '/containers/json':
+            self.send_json(200, [{'Id': f'id{i}', 'Names': [f'/{name}']}
+                                 for i, name in enumerate(daemon.names)])
+        elif path == '/info':
+            self.send_json(200, {'DockerRootDir': daemon.host_path or '/nonexistent'})
+        elif path.startswith('/containers/') and path.endswith('/json'):
+            container_id = path.split('/')[2]
+            delay = daemon.delays.get(container_id, daemon.delay)
+            if delay:
+                daemon.stopped.wait(delay)  # The daemon walking the container's layer
+            self.send_json(200, {'SizeRw': 1_000_000 * (1 + int(container_id[2:])), 'GraphDriver': {'Name': 'overlay2', 'Data': {
+                'MergedDir': daemon.host_path or '/nonexistent'}}})
+        elif path.startswith('/containers/') and path.endswith('/exec'):
+            self.send_json(201, {'Id': 'exec-' + path.split('/')[2]})
+        elif path.startswith('/exec/') and path.endswith('/start'):
+            frame = b'\x01\0\0\0' + len(DF_OUTPUT).to_bytes(4, 'big') + DF_OUTPUT
+            self.wfile.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/vnd.docker.raw-stream\r\n\r\n' + frame)
+            return False  # Hijacked connection: output ends when we close
+        elif path == '/events':
+            self.wfile.write(b'HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n')
+            self.wfile.flush()
+            daemon.stopped.wait()
+            return False
+        else:
+            self.send_json(404, {'message': 'not found'})
+        return True
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 256  # Like the real daemon, accept bursts of connections
+
+
+class FakeDockerDaemon:
+    """Serve a fake Engine API on `socket_path`.
+
+    With `host_path` set, container inspection points at that directory so the
+    client reads usage with statvfs; otherwise it has to use the exec API.
+    Container inspection takes `delay` seconds, or `delays[container_id]`.
+    """
+
+    def __init__(self, socket_path, names=None, host_path=None, delay=0, delays=None):
+        self.socket_path = socket_path
+        self.names = names or container_names(1)
+        self.host_path = host_path
+        self.delay = delay
+        self.delays = delays or {}
+        self.stopped = threading.Event()
+        self.server = _Server(socket_path, _Handler)
+        self.server.daemon = self
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.server.shutdown()
+        self.server.server_close()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+
+def write_fake_cli(directory, names=None):
+    """Write a `docker` executable into `directory`; put it first on PATH to use it"""
+    names = names or container_names(1)
+    path = os.path.join(directory, 'docker')
+    listing = '\n'.join(names)
+    with open(path, 'w') as f:
+        f.write('#!/bin/sh\n'
+                'if [ "$1" = ps ]; then\n'
+                f"cat <<'END'\n{listing}\nEND\n"
+                'elif [ "$1" = exec ]; then\n'
+                f"cat <<'END'\n{DF_OUTPUT.decode()}END\n"
+                'fi\n')
+    os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+    return path
@@ -0,0 +1,332 @@
+"""Benchmark suite for the sampling, redraw and interaction hot paths.
+
+Run from the repository root:
+
+    python -m benchmarks.suite [--sizes 1k,100k,10M] [--cases update,mouse_moved]
+                               [--output results.json] [--compare baseline.json]
+
+Every case runs in its own process (offscreen Qt) against a DiskMonitor
+whose selected drive holds a synthetic history of each size, restored the
+way a real startup restores it: the newest samples in the ring buffer, the
+rest compressed and rolled up. Sampling and the frame timer are stopped so
+only the measured call runs. Reported per case and size:
+
+- latency percentiles (p50/p90/p99/max, ms) over --iterations calls
+- allocations: peak bytes traced by tracemalloc during one call, and bytes
+  still held after it, averaged over a few separate calls
+- RSS of the process once the case has run (MB), and its peak, which also
+  counts the synthetic records the history is built from and can be far higher
+
+Cases: get_disk_usage, get_docker_usage (against benchmarks/fake_docker.py),
+PlotManager.update (after recording one new sample), update_idle (an
+unchanged sample, then update and the paint it causes, if any), mouse_moved,
+mouse_clicked (adding, then removing, a reference point; the case fails if
+either click does not) and on_time_changed, the last three at random
+positions.
+
+Results are written as JSON with the commit they were taken at. With
+--compare, each p50 is checked against a previous result file and the exit
+status is 1 if any is slower by more than --tolerance (default 25%) and
+by more than MIN_REGRESSION_MS.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import psutil
+
+CASES = ('get_disk_usage', 'get_docker_usage', 'update', 'update_idle', 'mouse_moved', 'mouse_clicked',
+         'on_time_changed')
+SIZE_SUFFIXES = {'k': 1_000, 'M': 1_000_000}
+DEFAULT_SIZES = '1k,100k,10M'
+DEFAULT_ITERATIONS = 200
+ALLOCATION_CALLS = 10
+SAMPLE_SPACING = 0.5  # Seconds between synthetic samples
+RESTORE_TIMEOUT = 120
+MIN_REGRESSION_MS = 0.05  # Slowdowns smaller than this are timer noise, whatever the ratio
+
+
+def parse_size(text):
+    suffix = text[-1]
+    if suffix in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[suffix])
+    return int(text)
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == 'darwin' else peak * 1024 / 1e6  # Bytes on macOS, KiB elsewhere
+
+
+def synthetic_records(size, end_time, seed=0):
+    """`size` history records ending at `end_time`, as the store would hand them to DriveHistory.fill()"""
+    from utils.history_store import RECORD_DTYPE
+    rng = np.random.default_rng(seed)
+    records = np.zeros(size, dtype=RECORD_DTYPE)
+    records['time'] = end_time - (size - np.arange(size)) * SAMPLE_SPACING
+    steps = rng.choice([0] * 9 + [4096, -4096, 8192], size) / 1e9
+    records['usage'] = 100 + np.cumsum(steps)
+    records['docker_usage'] = 12.5
+    return [records]
+
+
+class FakeEvent:
+    """Stands in for the mouse click events pyqtgraph passes to mouse_clicked"""
+
+    def __init__(self, pos):
+        self.pos = pos
+
+    def scenePos(self):
+        return self.pos
+
+
+def make_monitor(size):
+    """A DiskMonitor with `size` samples of history on '/', its background work stopped"""
+    from disk_monitor import DiskMonitor
+    monitor = DiskMonitor(history_dir=None)
+    monitor.timer.stop()
+    monitor.scheduler.stop()
+    # No drive discovery or Docker polling in the background either
+    monitor.plot_manager.win.viewport().removeEventFilter(monitor.plot_manager.first_paint)
+    monitor.plot_manager.main_widget.resize(1200, 800)
+    monitor.app.processEvents()
+
+    now = time.time()
+    history = monitor.selected_history
+    monitor.start_time = now - size * SAMPLE_SPACING
+    history.fill(synthetic_records(size, now), monitor.start_time)
+    deadline = time.monotonic() + RESTORE_TIMEOUT
+    while history._restore_result is None and time.monotonic() < deadline:
+        time.sleep(0.05)
+    history._collect_restore()
+    usage = (500.0, float(history.buffer.last('usage')), 400.0, 20.0)
+    history.latest = usage
+    monitor.latest_sample = (usage, (None, None))
+    monitor.plot_manager.update()
+    return monitor
+
+
+def scene_point(monitor, fraction):
+    """Scene position `fraction` of the way across the plot area, halfway down"""
+    from PyQt6.QtCore import QPointF
+    rect = monitor.plot_manager.plot.vb.sceneBoundingRect()
+    return QPointF(rect.left() + rect.width() * fraction, rect.center().y())
+
+
+def no_op():
+    pass
+
+
+def build_case(case, size, rng):
+    """(setup, call, teardown) for one case: setup() runs untimed before every call()"""
+    if case == 'get_disk_usage':
+        from utils.disk_utils import get_disk_usage
+        return no_op, (lambda: get_disk_usage('/')), no_op
+
+    if case == 'get_docker_usage':
+        from benchmarks.bench_docker import start_daemon
+        from utils import docker_utils
+        directory = tempfile.mkdtemp()
+        socket_path = os.path.join(directory, 'docker.sock')
+        daemon = start_daemon(socket_path, directory)
+        os.environ['DOCKER_HOST'] = f'unix://{socket_path}'
+        docker_utils._client = None
+        docker_utils.get_docker_usage()  # Connect and find the container once, as the app does
+        return no_op, docker_utils.get_docker_usage, daemon.terminate
+
+    monitor = make_monitor(size)
+    plot_manager = monitor.plot_manager
+
+    if case == 'update':
+        clock = [time.time()]
+
+        def record():
+            clock[0] += SAMPLE_SPACING
+            usage = (500.0, 100 + rng.uniform(0, 1), 400.0, 20.0)
+            monitor.record_sample(clock[0], {'/': usage}, (None, None))
+            monitor.latest_sample = (usage, (None, None))
+        return record, plot_manager.update, no_op
+
+    if case == 'update_idle':
+        clock = [time.time()]
+        usage = monitor.latest_sample[0]
+
+        def record_same():
+            clock[0] += 0.01  # Too little to scroll the view by a pixel
+            monitor.record_sample(clock[0], {'/': usage}, (None, None))
+
+        def update_and_paint():
+            plot_manager.update()
+            monitor.app.processEvents()
+        return record_same, update_and_paint, no_op
+
+    if case == 'mouse_moved':
+        pending = []
+
+        def jump():
+            plot_manager.time_slider.setValue(int(rng.integers(0, plot_manager.time_slider.maximum() + 1)))
+            pending[:] = [scene_point(monitor, rng.uniform(0.05, 0.95))]
+        return jump, lambda: plot_manager.mouse_moved(pending[0]), no_op
+
+    if case == 'mouse_clicked':
+        pending = []
+
+        def place():
+            plot_manager.clear_references()
+            plot_manager.time_slider.setValue(int(rng.integers(0, plot_manager.time_slider.maximum() + 1)))
+            pending[:] = [FakeEvent(scene_point(monitor, rng.uniform(0.05, 0.95)))]
+
+        def add_and_remove():
+            plot_manager.mouse_clicked(pending[0])
+            added = len(plot_manager.reference_lines)
+            plot_manager.mouse_clicked(pending[0])
+            if added != 1 or plot_manager.reference_lines:
+                raise AssertionError(f"Clicking twice left {added}, then {len(plot_manager.reference_lines)} "
+                                     "reference points instead of 1, then 0")
+        return place, add_and_remove, no_op
+
+    if case == 'on_time_changed':
+        values = []
+
+        def pick():
+            values[:] = [int(rng.integers(0, plot_manager.time_slider.maximum() + 1))]
+        return pick, lambda: plot_manager.on_time_changed(values[0]), no_op
+
+    raise ValueError(f"Unknown case {case}")
+
+
+def run_case(case, size, iterations):
+    """Measure one case in this process and return its result dict"""
+    rng = np.random.default_rng(0)
+    setup, call, teardown = build_case(case, size, rng)
+    setup()
+    call()  # Warm up
+
+    latencies = np.empty(iterations)
+    for i in range(iterations):
+        setup()
+        start = time.perf_counter()
+        call()
+        latencies[i] = time.perf_counter() - start
+
+    peaks = []
+    retained = []
+    for _ in range(ALLOCATION_CALLS):
+        setup()
+        tracemalloc.start()
+        before, _ = tracemalloc.get_traced_memory()
+        call()
+        after, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak - before)
+        retained.append(after - before)
+    teardown()
+
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+    return {
+        'case': case,
+        'size': size,
+        'iterations': iterations,
+        'p50_ms': p50,
+        'p90_ms': p90,
+        'p99_ms': p99,
+        'max_ms': latencies.max() * 1000,
+        'alloc_peak_bytes': int(np.mean(peaks)),
+        'alloc_retained_bytes': int(np.mean(retained)),
+        'rss_mb': psutil.Process().memory_info().rss / 1e6,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def run_worker(case, size, iterations):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    result = run_case(case, size, iterations)
+    # Results go last on stdout; the app prints its own messages before them
+    print(json.dumps(result), flush=True)
+    os._exit(0)  # Skip Qt and daemon teardown
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, tolerance):
+    """Print p50 changes against a previous result file; True if none regressed beyond tolerance"""
+    with open(baseline_path) as f:
+        baseline = {(r['case'], r['size']): r for r in json.load(f)['results']}
+    ok = True
+    print(f"\nAgainst {baseline_path}:")
+    for result in results:
+        before = baseline.get((result['case'], result['size']))
+        if before is None:
+            continue
+        ratio = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] > 0 else 1.0
+        regressed = ratio > 1 + tolerance and result['p50_ms'] - before['p50_ms'] > MIN_REGRESSION_MS
+        ok = ok and not regressed
+        print(f"{result['case']:<18} {result['size']:>11,}  p50 {before['p50_ms']:9.3f} -> {result['p50_ms']:9.3f} ms"
+              f"  ({ratio:5.2f}x){'  REGRESSED' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f'history sizes (default: {DEFAULT_SIZES})')
+    parser.add_argument('--cases', default=','.join(CASES), help='comma-separated cases (default: all)')
+    parser.add_argument('--iterations', type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument('--output', default='benchmark-results.json', help='JSON results file')
+    parser.add_argument('--compare', metavar='BASELINE', help='previous results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p50 slowdown vs. the baseline')
+    parser.add_argument('--worker', nargs=2, metavar=('CASE', 'SIZE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker[0], int(args.worker[1]), args.iterations)
+
+    env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+    results = []
+    print(f"{'case':<18} {'history':>11} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9} "
+          f"{'alloc KB':>9} {'kept KB':>8} {'RSS MB':>8} {'peak MB':>8}")
+    for case in args.cases.split(','):
+        for size in (parse_size(s) for s in args.sizes.split(',')):
+            completed = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.suite', '--worker', case, str(size),
+                 '--iterations', str(args.iterations)],
+                capture_output=True, text=True, env=env)
+            lines = completed.stdout.strip().splitlines()
+            if completed.returncode != 0 or not lines:
+                print(f"{case:<18} {size:>11,}  failed:\n{completed.stderr[-2000:]}")
+                continue
+            r = json.loads(lines[-1])
+            results.append(r)
+            print(f"{case:<18} {size:>11,} {r['p50_ms']:9.3f} {r['p90_ms']:9.3f} {r['p99_ms']:9.3f} {r['max_ms']:9.3f} "
+                  f"{r['alloc_peak_bytes'] / 1e3:9.1f} {r['alloc_retained_bytes'] / 1e3:8.1f} {r['rss_mb']:8.0f} "
+                  f"{r['peak_rss_mb']:8.0f}")
+    print("\nRSS is the process's after the case ran; peak also counts building the synthetic history.")
+
+    with open(args.output, 'w') as f:
+        json.dump({
+            'commit': git_commit(),
+            'timestamp': time.time(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results,
+        }, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""Fleet collector: receives samples from agents and serves them to GUIs.
+
+Agents are headless collectors sending to `--sink collector:HOST:PORT`
+(`--agent HOST:PORT` for short); GUIs started with `--connect HOST:PORT` list
+every host and show the one selected. One asyncio process serves hundreds of
+agents: a batch costs one np.frombuffer() and a copy into the host's ring
+buffer, and is forwarded to subscribed GUIs as the same bytes. Like headless
+mode this needs neither Qt nor a display.
+"""
+import asyncio
+import json
+import sys
+import time
+
+import numpy as np
+
+from utils.fleet_protocol import (HELLO, BATCH, HOSTS, SUBSCRIBE, WIRE_DTYPE, ProtocolError, ack_frame, decode_records,
+                                  host_key, json_frame, parse_batch, read_frame, samples_frame)
+from utils.ring_buffer import RingBuffer
+
+DEFAULT_PORT = 9840
+HOST_BACKLOG = 10_000  # Newest samples kept per host, sent to a GUI when it selects the host
+BACKLOG_CHUNK = 5_000  # Samples per frame when sending a backlog
+SESSIONS_PER_HOST = 8  # Agent sessions remembered per host for discarding resent batches
+HOSTS_INTERVAL = 1.0  # Seconds between checks for a changed host list to send to GUIs
+MAX_VIEWER_BACKLOG = 4 * 1024 * 1024  # Bytes queued for a GUI beyond which it misses live batches
+STATS_INTERVAL = 60  # Seconds between summary lines
+
+WIRE_COLUMNS = tuple((name, WIRE_DTYPE[name]) for name in WIRE_DTYPE.names if name != 'time')
+
+
+class HostState:
+    """What the collector holds for one agent's drive"""
+
+    def __init__(self, key, host, drive):
+        self.key = key
+        self.host = host
+        self.drive = drive
+        self.history = RingBuffer(HOST_BACKLOG, WIRE_COLUMNS)
+        self.sessions = {}  # Agent session -> last sequence number stored, oldest session first
+        self.connections = 0
+        self.viewers = set()  # StreamWriters of the GUIs showing this host
+
+    def accept(self, session, seq):
+        """Whether batch `seq` of `session` is new, rather than resent after a lost acknowledgement"""
+        if seq <= self.sessions.get(session, 0):
+            return False
+        self.sessions[session] = seq
+        while len(self.sessions) > SESSIONS_PER_HOST:
+            del self.sessions[next(iter(self.sessions))]
+        return True
+
+    def add(self, records):
+        self.history.extend(records['time'], *(records[name] for name in self.history.column_names))
+
+    def backlog(self):
+        records = np.empty(len(self.history), dtype=WIRE_DTYPE)
+        records['time'] = self.history.times
+        for name in self.history.column_names:
+            records[name] = self.history.column(name)
+        return records
+
+    def describe(self):
+        return {'key': self.key, 'host': self.host, 'drive': self.drive, 'connected': self.connections > 0}
+
+
+class FleetCollector:
+    def __init__(self):
+        self.hosts = {}  # Key -> HostState
+        self.viewers = set()
+        self.hosts_changed = False
+        self.agents = 0
+        self.samples = 0
+        self.batches = 0
+        self.duplicates = 0
+        self.skipped_forwards = 0  # Live batches not sent to a GUI that was too far behind
+
+    async def handle(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        try:
+            kind, payload = await read_frame(reader)
+            if kind != HELLO:
+                raise ProtocolError(f"Expected HELLO, got frame type {kind}")
+            hello = json.loads(payload)
+            if hello.get('role') == 'viewer':
+                await self.serve_viewer(reader, writer)
+            else:
+                await self.serve_agent(hello, reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Disconnected
+        except (ProtocolError, ValueError, KeyError) as e:
+            print(f"Dropping connection from {peer}: {e}", file=sys.stderr)
+        finally:
+            writer.close()
+
+    async def serve_agent(self, hello, reader, writer):
+        key = host_key(hello['host'], hello['drive'])
+        state = self.hosts.get(key)
+        if state is None:
+            state = self.hosts[key] = HostState(key, hello['host'], hello['drive'])
+        session = hello['session']
+        state.connections += 1
+        self.agents += 1
+        self.hosts_changed = True
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind != BATCH:
+                    raise ProtocolError(f"Expected BATCH, got frame type {kind}")
+                seq, data = parse_batch(payload)
+                if state.accept(session, seq):
+                    records = decode_records(data)
+                    state.add(records)
+                    self.samples += len(records)
+                    self.batches += 1
+                    if state.viewers:
+                        forward = samples_frame(key, data)
+                        for viewer in state.viewers:
+                            if viewer.transport.get_write_buffer_size() < MAX_VIEWER_BACKLOG:
+                                viewer.write(forward)
+                            else:
+                                self.skipped_forwards += 1
+                else:
+                    self.duplicates += 1
+                writer.write(ack_frame(seq))  # Tiny, and the agent's window bounds how many can queue
+        finally:
+            state.connections -= 1
+            self.agents -= 1
+            self.hosts_changed = True
+
+    async def serve_viewer(self, reader, writer):
+        self.viewers.add(writer)
+        writer.write(json_frame(HOSTS, [state.describe() for state in self.hosts.values()]))
+        subscribed = []
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                if kind != SUBSCRIBE:
+                    raise ProtocolError(f"Expected SUBSCRIBE, got frame type {kind}")
+                state = self.hosts.get(payload.decode())
+                if state is None or writer in state.viewers:
+                    continue
+                # Backlog first, then live batches; nothing can arrive in between without an await
+                backlog = state.backlog()
+                for start in range(0, len(backlog), BACKLOG_CHUNK):
+                    writer.write(samples_frame(state.key, backlog[start:start + BACKLOG_CHUNK].tobytes()))
+                state.viewers.add(writer)
+                subscribed.append(state)
+                await writer.drain()
+        finally:
+            self.viewers.discard(writer)
+            for state in subscribed:
+                state.viewers.discard(writer)
+
+    async def broadcast_hosts(self):
+        while True:
+            await asyncio.sleep(HOSTS_INTERVAL)
+            if self.hosts_changed and self.viewers:
+                self.hosts_changed = False
+                data = json_frame(HOSTS, [state.describe() for state in self.hosts.values()])
+                for viewer in self.viewers:
+                    viewer.write(data)
+
+    async def report(self):
+        last_samples, last_time = self.samples, time.monotonic()
+        while True:
+            await asyncio.sleep(STATS_INTERVAL)
+            now = time.monotonic()
+            print(f"{self.agents} agents, {len(self.hosts)} hosts, {len(self.viewers)} viewers, "
+                  f"{(self.samples - last_samples) / (now - last_time):.0f} samples/s, "
+                  f"{self.duplicates} resent batches discarded", file=sys.stderr)
+            last_samples, last_time = self.samples, now
+
+    async def serve(self, host, port, started=None):
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        if started is not None:
+            started(server)
+        asyncio.get_running_loop().create_task(self.broadcast_hosts())
+        async with server:
+            await server.serve_forever()
+
+
+def start_collector(address):
+    """Run a collector listening on [HOST:]PORT until interrupted"""
+    host, _, port = address.rpartition(':')
+    host = host or '0.0.0.0'  # Agents are on other machines
+    collector = FleetCollector()
+
+    def started(server):
+        print(f"Collector listening on {host}:{server.sockets[0].getsockname()[1]}", file=sys.stderr)
+        asyncio.get_running_loop().create_task(collector.report())
+
+    try:
+        asyncio.run(collector.serve(host, int(port or DEFAULT_PORT), started))
+    except KeyboardInterrupt:
+        pass
@@ -1,33 +1,92 @@
-import asyncio
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import QTimer
 import sys
 import threading
-from collections import deque
 import signal
+import math
+import os
+import time
 
-from utils.disk_utils import get_disk_usage
-from utils.docker_utils import get_docker_usage, get_docker_usage_async
+import numpy as np
+
+from utils.disk_utils import get_disk_usage, get_available_drives, MountWatcher
+from utils.ring_buffer import RingBuffer, DEFAULT_CAPACITY
+from utils.decimation import MinMaxPyramid
+from utils.drive_history import DriveHistory
+from utils.history_store import DEFAULT_HISTORY_DIR
+from utils.scheduler import Scheduler, SampleStore
+from utils.sources import DiskSource, DockerSource, ContainerSource
+from utils.dir_scanner import DirectoryScanner, ScanJob
+from utils.tick_profile import TickProfiler
 from ui.plot_manager import PlotManager
 from ui.event_handlers import EventHandler
 
+# Change in usage (GB) that is worth one sample; sources are sampled faster the quicker they move by this much
+DISK_RESOLUTION_GB = 0.01
+DOCKER_RESOLUTION_GB = 0.01
+DOCKER_MIN_INTERVAL = 1.0  # Seconds; each Docker round costs far more than a statvfs
+# TickProfiler phase each source's read time is recorded under
+SOURCE_PHASES = {'disk': 'sample', 'docker': 'docker', 'containers': 'docker'}
+
 class DiskMonitor:
-    def __init__(self):
+    def __init__(self, history_capacity=DEFAULT_CAPACITY, history_dir=DEFAULT_HISTORY_DIR, sample_interval=100,
+                 max_sample_interval=10_000, containers=None, container_concurrency=8, container_timeout=5.0, profiler=None,
+                 forecast_threshold=90, watch_roots=None, tick_profile_path=None, metrics_address=None,
+                 collector_address=None):
+        self.profiler = profiler  # StartupProfiler when running with --profile-startup
+        self.drives_listed = False
+        self.first_sample_drawn = False
         self.app = QApplication(sys.argv)
         self.app.aboutToQuit.connect(self.cleanup)  # Connect cleanup to quit signal
         self.selected_drive = '/'  # Default to root
+        self.history_capacity = history_capacity
+        self.history_dir = history_dir  # None disables persistence
+        self.sample_interval = sample_interval  # Fastest sampling period (ms)
+        self.max_sample_interval = max_sample_interval  # Slowest, reached while usage is flat (ms)
+        # Per-container monitoring: None disables it, [] watches every running container
+        self.container_filters = containers
+        self.container_concurrency = container_concurrency
+        self.container_timeout = container_timeout
+        self.forecast_threshold = forecast_threshold  # Percent full reported alongside 100% in the forecast
+        self.watch_roots = watch_roots  # Directories for live write attribution; None means the selected drive
+        self.write_attributor = None
+        self.latest_sample = None
+        # Per-phase timings of every frame, shown by the plot's performance HUD
+        self.tick_profile = TickProfiler()
+        self.tick_profile_path = tick_profile_path  # Dumped there on exit when set
+        self.last_tick = None
+        self.metrics_address = metrics_address  # [HOST:]PORT of the metrics endpoint, None for none
+        self.exporter = None
+        self.collector_address = collector_address  # (host, port) of a fleet collector to show hosts from
+        self.collector_client = None
+        self.mark_startup('QApplication')
         self.setup_data_structures()
+        self.scheduler = None
+        self.set_drives([self.selected_drive])  # The rest are added after drive discovery
+        self.mark_startup('history restore')
         self.plot_manager = PlotManager(self)
+        if len(self.history) > 0:
+            self.plot_manager.reset_view()  # Show restored history right away
+        self.mark_startup('window setup')
         self.setup_update_interval()
+
+        # Every metric is read off the UI thread by one scheduler, into one store drained each frame;
+        # Docker and containers are added after the first frame
+        self.store = SampleStore()
+        self.scheduler = Scheduler(self.store, self.tick_profile, SOURCE_PHASES)
+        self.scheduler.add(DiskSource(lambda: self.drives, self.sample_interval / 1000,
+                                      self.max_sample_interval / 1000, DISK_RESOLUTION_GB))
+        self.scheduler.start()
         
-        # Create async event loop
-        self.loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(self.loop)
-        
-        # Setup timer for updates
+        # Setup timer that drains samples and redraws at display rate
         self.timer = QTimer()
         self.timer.timeout.connect(self.update_plot)
-        self.timer.start(self.update_interval)
+        self.timer.start(self.frame_interval)
+        
+        self.mount_watcher = None
+        if self.metrics_address is not None:
+            from utils.metrics_exporter import start_exporter, add_freshness
+            self.exporter = start_exporter(self.metrics_address, lambda snapshot: add_freshness(snapshot, self.store))
         
         # Flag for clean shutdown
         self.running = True
@@ -36,68 +95,401 @@ class DiskMonitor:
     def cleanup(self):
         self.running = False
         self.timer.stop()
-        self.loop.call_soon_threadsafe(self.loop.stop)  # Stop event loop safely
+        self.scheduler.stop()
+        if self.mount_watcher is not None:
+            self.mount_watcher.stop()
+        self.stop_write_attribution()
+        if self.exporter is not None:
+            self.exporter.stop()
+        self.close_history_stores()
+        if self.tick_profile_path is not None:
+            self.dump_tick_profile(self.tick_profile_path)
+        if self.collector_client is not None:
+            self.collector_client.stop()
     
     def setup_data_structures(self):
-        self.times = deque()
-        self.usage = deque()
-        self.docker_usage = deque()
+        # Mountpoint -> DriveHistory; times are minutes since start_time
+        self.drive_histories = {}
+        self.drives = []  # Mountpoints sampled on every tick
+        self.discovered_drives = None  # Set by the discovery thread, applied on the next frame
         self.start_time = None
+        # Container name -> MinMaxPyramid over that container's writable-layer size
+        self.container_histories = {}
+        self.latest_container_sizes = {}  # Container name -> GB, from the last round that answered
+        self.dir_scanners = {}  # Mountpoint -> DirectoryScanner, kept so repeat scans reuse its cache
+        self.remote_drives = set()  # Host keys listed by the collector; their histories are filled from it
+        self.imported_drives = set()  # Keys of sessions loaded from files, shown but never sampled
+
+    def is_local(self, drive):
+        """Whether `drive` is a mountpoint of this machine, not a collector's host or an imported session"""
+        return drive not in self.remote_drives and drive not in self.imported_drives
+
+    def set_drives(self, drives):
+        """Sample `drives` from now on, loading the stored history of any new ones"""
+        selected = [self.selected_drive] if self.is_local(self.selected_drive) else []
+        drives = list(dict.fromkeys(list(drives) + selected))
+        loaded = []
+        added = False
+        for drive in drives:
+            if drive in self.drive_histories:
+                continue
+            added = True
+            history = self.drive_histories[drive] = DriveHistory(drive, self.history_capacity)
+            if self.history_dir is not None:
+                parts = history.open_store(self.history_dir)
+                if parts:
+                    loaded.append((history, parts))
+
+        if loaded:
+            # All histories share one time origin: the earliest sample of any drive
+            self.extend_origin(min(float(parts[0]['time'][0]) for _, parts in loaded))
+            for history, parts in loaded:
+                history.fill(parts, self.start_time)
+        self.drives = drives
+        if added and self.scheduler is not None:
+            self.scheduler.sample_soon('disk')  # Don't leave new drives empty for a whole backed-off interval
+
+    def extend_origin(self, first):
+        """Move the shared time origin back to wall-clock `first` if that is earlier, shifting every history"""
+        if self.start_time is None:
+            self.start_time = first
+        elif first < self.start_time:
+            self.shift_histories((self.start_time - first) / 60)
+            self.start_time = first
+
+    def shift_histories(self, delta):
+        for history in self.drive_histories.values():
+            history.shift_times(delta)
+        for pyramid in self.container_histories.values():
+            pyramid.shift_times(delta)
+
+    def close_history_stores(self):
+        for history in self.drive_histories.values():
+            history.close()
+
+    def record_sample(self, timestamp, usages, docker_values):
+        """Store one tick taken at wall-clock `timestamp` (seconds since the epoch).
+
+        `usages` maps each mountpoint that answered to its usage tuple.
+        """
+        if self.start_time is None:
+            self.start_time = timestamp
+        t = (timestamp - self.start_time) / 60
+        docker_used_gb = docker_values[1] if docker_values[1] is not None else 0
+        for drive, disk in usages.items():
+            history = self.drive_histories.get(drive)
+            if history is not None:
+                history.append(timestamp, t, disk[1], docker_used_gb)
+                history.latest = disk
+
+    def record_remote(self, key, records):
+        """Store samples of a remote host forwarded by the collector (WIRE_DTYPE records, oldest first)"""
+        history = self.drive_histories.get(key)
+        if history is None:
+            return
+        self.extend_origin(float(records['time'][0]))  # A backlog may predate this session
+        timestamps = records['time']
+        minutes = (timestamps - self.start_time) / 60
+        docker_used = np.nan_to_num(records['docker_used'])  # 0 when unavailable, as for local samples
+        for timestamp, t, used, docker in zip(timestamps.tolist(), minutes.tolist(), records['used'].tolist(),
+                                              docker_used.tolist()):
+            history.append(timestamp, t, used, docker)
+        last = records[-1]
+        history.latest = (float(last['total']), float(last['used']), float(last['available']), float(last['percent']))
+        history.latest_docker = tuple(None if math.isnan(value) else float(value)
+                                      for value in (last['docker_total'], last['docker_used']))
+
+    def add_remote_drive(self, key):
+        """Start recording a remote host, its recent history first"""
+        self.drive_histories[key] = DriveHistory(key, self.history_capacity)  # Kept by the agent's collector
+        self.collector_client.subscribe(key)
+
+    def import_session(self, path):
+        """Load a session file (see utils/session_file.py) as a drive of its own; returns its key"""
+        from utils.session_file import load_session
+        key = f'file:{os.path.abspath(path)}'
+        if key in self.drive_histories:
+            return key
+        parts, metadata = load_session(path)
+        if not parts:
+            raise ValueError(f"{path} holds no samples")
+        history = DriveHistory(key, self.history_capacity)
+        self.extend_origin(float(parts[0]['time'][0]))
+        history.fill(parts, self.start_time)  # The newest samples now, the rest compressed in the background
+        used = float(parts[-1]['usage'][-1])
+        # Files without metadata (.npy) don't know the disk size; the fullest it got is the best guess
+        total = float(metadata.get('total_gb') or max(float(part['usage'].max()) for part in parts))
+        history.latest = (total, used, total - used, used / total * 100 if total else 0.0)
+        history.latest_docker = (None, None)  # Not this machine's Docker
+        self.drive_histories[key] = history
+        self.imported_drives.add(key)
+        return key
+
+    def export_session(self, path):
+        """Write the selected drive's raw samples to a session file; returns how many were written"""
+        from utils.session_file import export_session
+        history = self.selected_history
+        count, chunks = history.raw_samples()
+        start_time = self.start_time or 0.0
+
+        def columns():
+            for times, values in chunks:
+                yield start_time + times * 60, values['usage'], values['docker_usage']
+        metadata = {'drive': self.selected_drive, 'exported_at': time.time()}
+        if history.latest is not None:
+            metadata['total_gb'] = history.latest[0]
+        return export_session(path, columns(), count, metadata)
+
+    def record_container_sizes(self, timestamp, sizes):
+        """Append one round of per-container sizes (GB); None marks a failed query"""
+        if self.start_time is None:
+            self.start_time = timestamp
+        t = (timestamp - self.start_time) / 60
+        for name, size in sizes.items():
+            if size is None:
+                continue
+            self.latest_container_sizes[name] = size
+            pyramid = self.container_histories.get(name)
+            if pyramid is None:
+                # Containers are polled about once a second, half the default sample rate
+                history = RingBuffer(max(1, self.history_capacity // 2), (('size', np.float32),))
+                pyramid = self.container_histories[name] = MinMaxPyramid(history)
+            pyramid.append(t, size)
+
+    def clear_history(self):
+        """Drop every drive's and container's samples, in memory and on disk"""
+        for history in self.drive_histories.values():
+            history.clear()
+        self.container_histories.clear()
+        self.latest_container_sizes.clear()
+        self.start_time = None
+        self.latest_sample = None
+        self.scheduler.sample_soon('disk')
+
+    @property
+    def selected_history(self):
+        return self.drive_histories[self.selected_drive]
+
+    @property
+    def history(self):
+        return self.selected_history.buffer
+
+    @property
+    def pyramid(self):
+        return self.selected_history.pyramid
+
+    @property
+    def times(self):
+        return self.history.times
+
+    @property
+    def usage(self):
+        return self.history.column('usage')
+
+    @property
+    def docker_usage(self):
+        return self.history.column('docker_usage')
+
+    @property
+    def docker_values(self):
+        """(total_gb, used_gb) of the Docker disk from the latest poll; (None, None) if unknown or stale"""
+        return self.store.latest('docker', (None, None))
     
     def setup_update_interval(self):
-        self.update_interval = 500
-    
+        self.update_interval = self.sample_interval  # Initial sampling period (ms)
+        self.frame_interval = 16  # Redraw period (ms), about one frame at 60 Hz
+
     def get_disk_usage(self):
         return get_disk_usage(self.selected_drive)
-    
-    async def get_docker_usage_async(self):
-        return await get_docker_usage_async()
-    
-    def get_docker_usage(self):
-        # Return last known values if async operation is running
-        if not hasattr(self, 'last_docker_values'):
-            self.last_docker_values = (None, None)
-        return self.last_docker_values
-    
-    async def update_docker_usage(self):
-        while self.running:
-            values = await self.get_docker_usage_async()
-            self.last_docker_values = values
-            await asyncio.sleep(1)
-    
+
     def start_async_tasks(self):
-        self.loop.create_task(self.update_docker_usage())
+        """Start polling Docker, and the collector's hosts, on the scheduler's loop"""
+        if 'docker' in self.scheduler.sources:
+            return
+        # Sample quickly while usage moves and back off while it is flat
+        max_interval = max(DOCKER_MIN_INTERVAL, self.max_sample_interval / 1000)
+        self.scheduler.add(DockerSource(DOCKER_MIN_INTERVAL, max_interval, DOCKER_RESOLUTION_GB))
+        if self.container_filters is not None:
+            self.scheduler.add(ContainerSource(self.container_filters, DOCKER_MIN_INTERVAL, max_interval,
+                                               DOCKER_RESOLUTION_GB, self.container_concurrency,
+                                               self.container_timeout))
+        if self.collector_address is not None:
+            from utils.fleet_client import CollectorClient
+            self.collector_client = CollectorClient(self.collector_address)
+            self.scheduler.run_coroutine(self.collector_client.run())
+
+    def on_first_paint(self):
+        """The window is on screen: start everything that was deferred"""
+        self.mark_startup('first paint')
+        self.start_drive_discovery()
+        self.start_async_tasks()
+        if sys.platform.startswith('linux'):
+            # Refresh the drive list when something is mounted or unmounted
+            self.mount_watcher = MountWatcher()
+            self.mount_watcher.start()
+        if self.profiler is not None:
+            QTimer.singleShot(5000, self.finish_startup_profile)  # In case nothing gets sampled
+
+    def start_drive_discovery(self):
+        # diskutil takes a while on macOS, so never run it on the UI thread
+        threading.Thread(target=self.discover_drives, daemon=True).start()
+
+    def discover_drives(self):
+        self.discovered_drives = get_available_drives()
+
+    def mark_startup(self, phase):
+        if self.profiler is not None:
+            self.profiler.mark(phase)
+
+    def finish_startup_profile(self):
+        """--profile-startup: report once the drive list and the first sample are shown"""
+        if self.profiler is not None:
+            self.profiler.report()
+            self.profiler = None
+            self.app.quit()
     
     def update_plot(self):
-        if not self.paused:
+        """Record everything sampled since the last frame, then redraw once"""
+        profile = self.tick_profile
+        now = time.monotonic()
+        if self.last_tick is not None:
+            # Early firings count as on time; only lateness matters for smoothness
+            profile.record('timer_drift', max(0.0, now - self.last_tick - self.frame_interval / 1000))
+        self.last_tick = now
+        profile.begin()
+        if self.discovered_drives is not None:
+            drives, self.discovered_drives = self.discovered_drives, None
+            self.plot_manager.update_drive_list(drives)
+            self.mark_startup('drive discovery')
+            self.drives_listed = True
+        if self.mount_watcher is not None and self.mount_watcher.consume():
+            self.start_drive_discovery()
+        batch = self.store.drain('disk')
+        container_batch = self.store.drain('containers')
+        remote_batch = []
+        if self.collector_client is not None:
+            hosts = self.collector_client.take_hosts()
+            if hosts is not None:
+                self.remote_drives.update(host['key'] for host in hosts)
+                self.plot_manager.update_remote_drives([(host['key'], host['connected']) for host in hosts])
+            remote_batch = self.collector_client.drain()
+        if self.paused:
+            profile.cancel()
+            return
+
+        for timestamp, sizes in container_batch:
+            self.record_container_sizes(timestamp, sizes)
+        for key, records in remote_batch:
+            self.record_remote(key, records)
+        if not batch and not remote_batch:
+            profile.cancel()
+            return
+
+        docker = self.docker_values
+        for timestamp, usages in batch:
+            self.record_sample(timestamp, usages, docker)
+        profile.mark('append')
+        docker_age = self.store.age('docker')
+        if docker_age is not None:
+            profile.record('docker_age', docker_age)
+        if self.exporter is not None and batch:
+            self.publish_metrics(timestamp, docker)
+            profile.mark('metrics')
+
+        history = self.selected_history
+        if history.latest is not None:
+            if history.latest_docker is not None:
+                docker = history.latest_docker  # A remote host's own
+            self.latest_sample = (history.latest, docker)
             self.plot_manager.update()
+            if not self.first_sample_drawn:
+                self.first_sample_drawn = True
+                self.mark_startup('first sample drawn')
+        profile.end()
+        if self.profiler is not None and self.first_sample_drawn and self.drives_listed:
+            self.finish_startup_profile()
     
+    def publish_metrics(self, timestamp, docker_values):
+        """Hand the metrics endpoint a snapshot of what has just been recorded"""
+        from utils.metrics_exporter import (MetricsSnapshot, add_drive, add_docker, add_containers, add_sampler,
+                                            add_sources)
+        snapshot = MetricsSnapshot()
+        for drive, history in self.drive_histories.items():
+            if history.latest is None:
+                continue
+            growth = history.growth['usage']
+            fit = growth.fit()
+            add_drive(snapshot, drive, history.latest, fit[1] if fit is not None else None,
+                      growth.time_to(history.latest[0]))
+        fit = self.selected_history.growth['docker_usage'].fit()
+        add_docker(snapshot, docker_values, fit[1] if fit is not None and docker_values[1] is not None else None)
+        add_containers(snapshot, self.latest_container_sizes)
+        add_sampler(snapshot, self.scheduler.stats('disk'), timestamp)
+        add_sources(snapshot, {name: self.scheduler.stats(name) for name in self.scheduler.sources})
+        self.exporter.publish(snapshot)
+
+    def dump_tick_profile(self, path):
+        """Write the frame timings, with the intervals they were taken at, as JSON"""
+        scheduler = self.scheduler
+        self.tick_profile.dump(path, frame_interval_ms=self.frame_interval,
+                               sample_interval_ms=scheduler.sources['disk'].interval * 1000,
+                               sampler=scheduler.stats('disk'),
+                               sources={name: scheduler.stats(name) for name in scheduler.sources})
+
     def reset_plot(self):
         self.plot_manager.reset()
     
     def run(self):
-        self.start_async_tasks()
-        
-        # Run event loop in separate thread
-        thread = threading.Thread(target=self._run_event_loop, daemon=True)
-        thread.start()
-        
         # Start Qt event loop
         sys.exit(self.app.exec())
     
-    def _run_event_loop(self):
-        asyncio.set_event_loop(self.loop)
-        self.loop.run_forever()
-    
     def pause(self):
         self.paused = True
+        self.scheduler.paused = True
         self.timer.stop()
+        self.last_tick = None  # The pause is not timer drift
     
     def resume(self):
         self.paused = False
-        self.timer.start(self.update_interval)
+        for name in self.scheduler.sources:
+            self.store.drain(name)  # Discard anything sampled while pausing
+        self.scheduler.paused = False
+        self.scheduler.sample_soon()
+        self.timer.start(self.frame_interval)
     
+    def scan_drive(self):
+        """Start measuring the selected drive's directories in the background; returns the ScanJob, or None"""
+        if not self.is_local(self.selected_drive):
+            return None  # Folders can only be scanned on this machine
+        scanner = self.dir_scanners.get(self.selected_drive)
+        if scanner is None:
+            scanner = self.dir_scanners[self.selected_drive] = DirectoryScanner(self.selected_drive)
+        return ScanJob(scanner)
+
+    def start_write_attribution(self):
+        """Start counting bytes written per directory under the watch roots"""
+        from utils.write_attribution import WriteAttributor
+        self.stop_write_attribution()
+        self.write_attributor = WriteAttributor(self.watch_roots or [self.selected_drive])
+        self.write_attributor.start()
+
+    def stop_write_attribution(self):
+        if self.write_attributor is not None:
+            self.write_attributor.stop()
+            self.write_attributor = None
+
     def set_drive(self, drive):
+        """Switch the view to another drive; every drive keeps being recorded"""
         if drive != self.selected_drive:
+            if drive not in self.drive_histories:
+                if drive in self.remote_drives:
+                    self.add_remote_drive(drive)
+                else:
+                    self.set_drives(self.drives + [drive])
             self.selected_drive = drive
-            self.reset_plot()
\ No newline at end of file
+            if self.write_attributor is not None and self.watch_roots is None and self.is_local(drive):
+                self.start_write_attribution()  # Follow the newly selected drive
+            history = self.selected_history
+            docker = history.latest_docker if history.latest_docker is not None else self.docker_values
+            self.latest_sample = (history.latest, docker) if history.latest is not None else None
+            self.plot_manager.show_drive()
\ No newline at end of file
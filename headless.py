@@ -0,0 +1,93 @@
+"""Headless collector: samples disk and Docker usage without Qt.
+
+Only the samplers in utils/ and the chosen sink are imported, so this runs on
+servers without a display and without PyQt6/pyqtgraph installed.
+"""
+import sys
+
+from utils.forecast import GrowthEstimator
+from utils.scheduler import Scheduler, SampleStore
+from utils.sources import DiskSource, DockerSource
+
+RESOLUTION_GB = 0.01  # Change in usage worth one sample, see AdaptiveInterval
+WAIT_TIMEOUT = 1.0  # Seconds between checks for Ctrl+C while no readings arrive
+
+
+class HeadlessCollector:
+    def __init__(self, sink, drive='/', interval=0.1, max_interval=10.0, docker_interval=1.0, docker=True,
+                 exporter=None):
+        self.sink = sink
+        self.exporter = exporter  # MetricsExporter to publish every sample to, if any
+        self.drive = drive
+        # The same scheduler and sources as the GUI; this thread only drains the store
+        self.store = SampleStore()
+        self.scheduler = Scheduler(self.store)
+        self.scheduler.add(DiskSource(lambda: [drive], interval, max_interval, RESOLUTION_GB))
+        if docker:
+            self.scheduler.add(DockerSource(docker_interval))
+        self.growth = {'usage': GrowthEstimator(), 'docker_usage': GrowthEstimator()}
+
+    def publish_metrics(self, timestamp, usage, docker_values):
+        from utils.metrics_exporter import MetricsSnapshot, add_drive, add_docker, add_sampler, add_sources
+        minutes = timestamp / 60
+        self.growth['usage'].update(minutes, usage[1])
+        fit = self.growth['usage'].fit()
+        snapshot = MetricsSnapshot()
+        add_drive(snapshot, self.drive, usage, fit[1] if fit is not None else None,
+                  self.growth['usage'].time_to(usage[0]))
+        fit = None
+        if docker_values[1] is not None:
+            self.growth['docker_usage'].update(minutes, docker_values[1])
+            fit = self.growth['docker_usage'].fit()
+        add_docker(snapshot, docker_values, fit[1] if fit is not None else None)
+        add_sampler(snapshot, self.scheduler.stats('disk'), timestamp)
+        add_sources(snapshot, {name: self.scheduler.stats(name) for name in self.scheduler.sources})
+        self.exporter.publish(snapshot)
+
+    def write_samples(self):
+        for timestamp, usages in self.store.drain('disk'):
+            usage = usages.get(self.drive)
+            if usage is None:
+                continue  # The drive did not answer in time
+            total_gb, used_gb, available_gb, percent = usage
+            docker_total_gb, docker_used_gb = self.store.latest('docker', (None, None))
+            self.sink.write({
+                'time': timestamp,
+                'drive': self.drive,
+                'total_gb': total_gb,
+                'used_gb': used_gb,
+                'available_gb': available_gb,
+                'percent': percent,
+                'docker_total_gb': docker_total_gb,
+                'docker_used_gb': docker_used_gb,
+            })
+            if self.exporter is not None:
+                self.publish_metrics(timestamp, usage, (docker_total_gb, docker_used_gb))
+
+    def run(self):
+        self.scheduler.start()
+        try:
+            while True:
+                if self.store.wait(WAIT_TIMEOUT):
+                    self.write_samples()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.scheduler.stop()
+            self.sink.close()
+            if self.exporter is not None:
+                self.exporter.stop()
+
+
+def start_headless(sink_spec='stdout', drive='/', interval=0.1, max_interval=10.0, docker=True, metrics=None):
+    from utils.sinks import make_sink, StdoutSink
+
+    sink = make_sink(sink_spec)
+    if isinstance(sink, StdoutSink):
+        # Keep stdout clean for samples; diagnostics printed by the samplers go to stderr
+        sys.stdout = sys.stderr
+    collector = HeadlessCollector(sink, drive=drive, interval=interval, max_interval=max_interval, docker=docker)
+    if metrics is not None:
+        from utils.metrics_exporter import start_exporter, add_freshness
+        collector.exporter = start_exporter(metrics, lambda snapshot: add_freshness(snapshot, collector.store))
+    collector.run()
@@ -1,14 +1,91 @@
+"""Apply source changes while developing, in one of two modes.
+
+--hot-reload runs main.py in a subprocess and restarts it after each change,
+losing the samples collected so far. --live-reload keeps the app running: it
+re-imports the changed modules of ui/ and utils/ and rebuilds the window
+around the existing DiskMonitor, so samples, reference points and the view
+survive. Changes to other files (main.py, disk_monitor.py, ...) still need a
+restart, which it points out.
+
+Both watch the project root itself and ui/ and utils/ below it, ignore .git,
+virtualenvs and __pycache__, and wait until changes have been quiet for
+DEBOUNCE seconds, so the several events of one save cause one reload.
+"""
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
+import importlib
 import sys
 import os
 import subprocess
+import threading
 import time
+import traceback
+import types
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PACKAGES = ('utils', 'ui')  # Watched recursively and reloadable, in this order: ui imports from utils
+IGNORED_DIRS = {'.git', '__pycache__', 'venv', '.venv', 'env', '.tox', 'site-packages', 'node_modules'}
+CHANGE_EVENTS = {'created', 'modified', 'moved'}  # Not opened/closed: reloading reads the files too
+DEBOUNCE = 0.3  # Seconds without events before changes are applied
+POLL_INTERVAL = 0.1
+
+
+def is_source(path):
+    """Whether `path` is a Python file of the project, outside ignored directories"""
+    if not path.endswith('.py'):
+        return False
+    directories = os.path.relpath(path, ROOT).split(os.sep)[:-1]
+    return not any(part in IGNORED_DIRS or part == '..' for part in directories)
+
+
+def module_name(path):
+    """Dotted name of a reloadable module (in ui/ or utils/), None for any other file"""
+    parts = os.path.relpath(path, ROOT)[:-len('.py')].split(os.sep)
+    if len(parts) < 2 or parts[0] not in PACKAGES:
+        return None
+    if parts[-1] == '__init__':
+        parts.pop()
+    return '.'.join(parts)
+
+
+class SourceChanges(FileSystemEventHandler):
+    """Changed source files, collected on watchdog's thread until they have been quiet for DEBOUNCE seconds"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.paths = set()
+        self.last_event = 0.0
+
+    def on_any_event(self, event):
+        if event.is_directory or event.event_type not in CHANGE_EVENTS:
+            return
+        for path in (event.src_path, getattr(event, 'dest_path', None)):  # Editors often save by renaming
+            if path and is_source(path):
+                with self.lock:
+                    self.paths.add(os.path.abspath(path))
+                    self.last_event = time.monotonic()
+
+    def take(self):
+        """The changed paths once they have been quiet long enough, otherwise an empty set"""
+        with self.lock:
+            if not self.paths or time.monotonic() - self.last_event < DEBOUNCE:
+                return set()
+            paths, self.paths = self.paths, set()
+            return paths
+
+
+def watch(handler):
+    observer = Observer()
+    observer.schedule(handler, ROOT, recursive=False)
+    for package in PACKAGES:
+        observer.schedule(handler, os.path.join(ROOT, package), recursive=True)
+    observer.start()
+    return observer
+
 
-class CodeChangeHandler(FileSystemEventHandler):
+class CodeChangeHandler(SourceChanges):
     def __init__(self):
-        self.last_reload = time.time()
-        self.reload_delay = 5 # Minimum seconds between reloads
+        super().__init__()
         self.process = None
         self.start_app()
 
@@ -16,29 +93,128 @@ class CodeChangeHandler(FileSystemEventHandler):
         if self.process:
             self.process.terminate()
             self.process.wait()
-        
+
         # Start the application in a new process
         self.process = subprocess.Popen([sys.executable, 'main.py'])
 
-    def on_modified(self, event):
-        if event.src_path.endswith('.py'):
-            current_time = time.time()
-            if current_time - self.last_reload > self.reload_delay:
-                print(f"\nReloading due to changes in {os.path.basename(event.src_path)}...")
-                self.last_reload = current_time
-                self.start_app()
-
 def start_hot_reload():
     event_handler = CodeChangeHandler()
-    observer = Observer()
-    observer.schedule(event_handler, path='.', recursive=True)
-    observer.start()
+    observer = watch(event_handler)
 
     try:
         while True:
-            time.sleep(1)
+            time.sleep(POLL_INTERVAL)
+            paths = event_handler.take()
+            if paths:
+                names = ', '.join(sorted(os.path.basename(path) for path in paths))
+                print(f"\nReloading due to changes in {names}...")
+                event_handler.start_app()
     except KeyboardInterrupt:
         if event_handler.process:
             event_handler.process.terminate()
         observer.stop()
-    observer.join()
\ No newline at end of file
+    observer.join()
+
+
+def project_modules():
+    """Loaded modules whose source is in this project"""
+    for module in list(sys.modules.values()):
+        path = getattr(module, '__file__', None)
+        if path and os.path.abspath(path).startswith(ROOT + os.sep) and is_source(os.path.abspath(path)):
+            yield module
+
+
+def reload_modules(names):
+    """importlib.reload() each module, then rebind the classes and functions other modules imported from them.
+
+    `from utils.x import f` copies f into the importing module, which a reload
+    of utils.x does not update; those names are pointed at the new objects.
+    Only classes and functions are rebound, since equal constants may be one
+    shared object. A module holding threads or sockets in its globals, which
+    a reload would reset and leak, releases them in a `_before_reload()`
+    function.
+    """
+    replaced = {}  # id(old object) -> (old object, new object)
+    for name in names:
+        module = sys.modules[name]
+        old = dict(vars(module))
+        before_reload = old.get('_before_reload')
+        if before_reload is not None:
+            before_reload()
+        importlib.reload(module)
+        new = vars(module)
+        for attr, value in old.items():
+            if isinstance(value, (type, types.FunctionType)) and new.get(attr) is not value and attr in new:
+                replaced[id(value)] = (value, new[attr])
+    for module in project_modules():
+        namespace = vars(module)
+        for attr, value in list(namespace.items()):
+            entry = replaced.get(id(value))
+            if entry is not None and entry[0] is value:
+                namespace[attr] = entry[1]
+
+
+class LiveReloader:
+    """Applies changes to ui/ and utils/ to a running DiskMonitor without restarting it"""
+
+    def __init__(self, monitor):
+        from PyQt6.QtCore import QTimer
+        self.monitor = monitor
+        self.changes = SourceChanges()
+        self.observer = watch(self.changes)
+        self.timer = QTimer()
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(int(POLL_INTERVAL * 1000))
+        monitor.app.aboutToQuit.connect(self.stop)
+
+    def poll(self):
+        paths = self.changes.take()
+        if paths:
+            self.reload(paths)
+
+    def reload(self, paths):
+        start = time.perf_counter()
+        names = set()
+        for path in sorted(paths):
+            name = module_name(path)
+            if name is None:
+                print(f"{os.path.relpath(path, ROOT)} changed; restart to apply it", file=sys.stderr)
+            elif name in sys.modules:  # Modules not imported yet load the new code when they are
+                names.add(name)
+        if not names:
+            return
+        names.add('ui.plot_manager')  # The window is rebuilt from it, so it must see the other new code
+        names = sorted(names, key=lambda name: (PACKAGES.index(name.split('.')[0]), name))
+        try:
+            reload_modules(names)
+            self.rebuild()
+        except Exception:
+            traceback.print_exc()
+            print("Reload failed; fix the error and save again", file=sys.stderr)
+            return
+        print(f"Reloaded {', '.join(names)} in {(time.perf_counter() - start) * 1000:.0f} ms", file=sys.stderr)
+
+    def rebuild(self):
+        """Replace the monitor's PlotManager with one of the reloaded class, showing the same data and view"""
+        monitor = self.monitor
+        old = monitor.plot_manager
+        state = old.view_state()
+        plot_manager = sys.modules['ui.plot_manager'].PlotManager(monitor)
+        # Past the first frame already: the deferred startup work must not run again
+        plot_manager.win.viewport().removeEventFilter(plot_manager.first_paint)
+        try:
+            plot_manager.restore_view_state(state)
+        except Exception:
+            plot_manager.close()
+            raise
+        monitor.plot_manager = plot_manager
+        old.close()  # Only now, or closing the last window would quit the app
+
+    def stop(self):
+        self.timer.stop()
+        self.observer.stop()
+
+
+def start_live_reload(monitor):
+    """Watch the sources and apply changes to `monitor` until the app quits"""
+    return LiveReloader(monitor)
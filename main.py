@@ -1,10 +1,107 @@
-import sys
-from disk_monitor import DiskMonitor
+import time
+STARTED = time.perf_counter()  # Before any other import, for --profile-startup
+
+import argparse
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Disk space visualizer')
+    parser.add_argument('--hot-reload', action='store_true', help='restart the app when source files change')
+    parser.add_argument('--live-reload', action='store_true',
+                        help='apply changes to ui/ and utils/ to the running app, keeping its data')
+    parser.add_argument('--no-history', action='store_true', help='do not persist samples to disk')
+    parser.add_argument('--headless', action='store_true', help='collect samples without a window (no Qt needed)')
+    parser.add_argument('--sink', default='stdout',
+                        help='headless output: stdout, none, file:PATH, tcp:HOST:PORT, unix:PATH or '
+                             'collector:HOST:PORT (default: stdout)')
+    parser.add_argument('--drive', default='/', help='headless mountpoint to sample (default: /)')
+    parser.add_argument('--interval', type=float, default=0.1,
+                        help='fastest sample interval in seconds, used while usage changes (default: 0.1, minimum: 0.01)')
+    parser.add_argument('--max-interval', type=float, default=10.0,
+                        help='slowest sample interval in seconds, reached while usage is flat '
+                             '(default: 10; set it to --interval for a fixed rate)')
+    parser.add_argument('--no-docker', action='store_true', help='headless: skip Docker sampling')
+    parser.add_argument('--containers', metavar='PATTERNS',
+                        help="plot each container's writable-layer size; comma-separated name patterns or 'all'")
+    parser.add_argument('--container-concurrency', type=int, default=8,
+                        help='maximum concurrent per-container queries (default: 8)')
+    parser.add_argument('--container-timeout', type=float, default=5.0,
+                        help='seconds before a per-container query is abandoned (default: 5)')
+    parser.add_argument('--forecast-threshold', type=float, default=90, metavar='PERCENT',
+                        help='also show when usage will reach this percentage (default: 90)')
+    parser.add_argument('--watch', metavar='PATHS',
+                        help='comma-separated directories for live write attribution (default: the selected drive)')
+    parser.add_argument('--metrics', metavar='[HOST:]PORT',
+                        help='serve OpenMetrics/Prometheus metrics at http://HOST:PORT/metrics (host default: 127.0.0.1)')
+    parser.add_argument('--agent', metavar='HOST:PORT',
+                        help='run headless and stream samples to the collector at HOST:PORT')
+    parser.add_argument('--collector', nargs='?', const='', metavar='[HOST:]PORT',
+                        help='receive samples from agents and serve them to GUIs (default: 0.0.0.0:9840)')
+    parser.add_argument('--connect', metavar='HOST:PORT',
+                        help="list the hosts of the collector at HOST:PORT alongside this machine's drives")
+    parser.add_argument('--tick-profile', metavar='PATH',
+                        help='on exit, write how long each phase of a frame took (histograms, JSON) to PATH')
+    parser.add_argument('--profile-startup', nargs='?', const='-', metavar='PATH',
+                        help='print how long each startup phase took (or write JSON to PATH), then exit')
+    # Qt consumes its own options (e.g. -platform), so ignore anything unknown
+    args, _ = parser.parse_known_args()
+    if args.agent:
+        args.headless = True
+        args.sink = f'collector:{args.agent}'
+    if args.headless:
+        from utils.sinks import parse_sink
+        try:
+            parse_sink(args.sink)
+        except ValueError as e:
+            parser.error(f"argument {'--agent' if args.agent else '--sink'}: {e}")
+    return args
+
 
 if __name__ == "__main__":
-    if "--hot-reload" in sys.argv:
+    args = parse_args()
+    if args.collector is not None:
+        from collector import start_collector
+        start_collector(args.collector)
+    elif args.headless:
+        from headless import start_headless
+        start_headless(args.sink, drive=args.drive, interval=args.interval,
+                       max_interval=args.max_interval, docker=not args.no_docker, metrics=args.metrics)
+    elif args.hot_reload:
         from hot_reload import start_hot_reload
         start_hot_reload()
     else:
-        monitor = DiskMonitor()
-        monitor.run()
\ No newline at end of file
+        profiler = None
+        if args.profile_startup:
+            from utils.startup_profile import StartupProfiler, interpreter_startup_ms
+            interpreter_ms = interpreter_startup_ms() - (time.perf_counter() - STARTED) * 1000
+            profiler = StartupProfiler(STARTED, interpreter_ms, args.profile_startup)
+            profiler.mark('main')
+        from disk_monitor import DiskMonitor
+        if profiler is not None:
+            profiler.mark('imports')
+        options = {
+            'profiler': profiler,
+            'sample_interval': max(10, int(args.interval * 1000)),
+            'max_sample_interval': int(args.max_interval * 1000),
+            'container_concurrency': args.container_concurrency,
+            'container_timeout': args.container_timeout,
+            'forecast_threshold': args.forecast_threshold,
+        }
+        if args.no_history:
+            options['history_dir'] = None
+        if args.metrics:
+            options['metrics_address'] = args.metrics
+        if args.connect:
+            host, _, port = args.connect.rpartition(':')
+            options['collector_address'] = (host or 'localhost', int(port))
+        if args.tick_profile:
+            options['tick_profile_path'] = args.tick_profile
+        if args.watch:
+            options['watch_roots'] = args.watch.split(',')
+        if args.containers:
+            options['containers'] = [] if args.containers == 'all' else args.containers.split(',')
+        monitor = DiskMonitor(**options)
+        if args.live_reload:
+            from hot_reload import start_live_reload
+            monitor.live_reloader = start_live_reload(monitor)  # Kept so its timer and observer live on
+        monitor.run()
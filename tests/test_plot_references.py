@@ -0,0 +1,81 @@
+"""Reference points placed on a stretch of history only the rollups still hold.
+
+Run from the repository root:
+
+    QT_QPA_PLATFORM=offscreen python -m pytest -q tests
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+pytest.importorskip('PyQt6')
+
+from utils.history_store import RECORD_DTYPE  # noqa: E402
+from utils.rollups import RAW_RETENTION  # noqa: E402
+
+DAYS = 5
+SPACING = 30  # Seconds between samples
+
+
+class FakeEvent:
+    def __init__(self, pos):
+        self.pos = pos
+
+    def scenePos(self):
+        return self.pos
+
+
+@pytest.fixture(scope='module')
+def monitor():
+    from disk_monitor import DiskMonitor
+    monitor = DiskMonitor(history_capacity=1000, history_dir=None)
+    monitor.timer.stop()
+    monitor.scheduler.stop()
+    monitor.plot_manager.main_widget.resize(1200, 800)
+    monitor.app.processEvents()
+
+    now = time.time()
+    size = DAYS * 24 * 3600 // SPACING
+    records = np.zeros(size, dtype=RECORD_DTYPE)
+    records['time'] = now - (size - np.arange(size)) * SPACING
+    records['usage'] = np.linspace(100, 110, size)
+    records['docker_usage'] = 12.5
+    history = monitor.selected_history
+    monitor.start_time = records['time'][0]
+    history.fill([records], monitor.start_time)
+    history._restore_thread.join()
+    history._collect_restore()
+    usage = (500.0, float(history.buffer.last('usage')), 400.0, 20.0)
+    history.latest = usage
+    monitor.latest_sample = (usage, (None, None))
+    monitor.plot_manager.update()
+    return monitor
+
+
+def click(monitor, x):
+    from PyQt6.QtCore import QPointF
+    plot_manager = monitor.plot_manager
+    plot_manager.mouse_clicked(FakeEvent(plot_manager.plot.vb.mapViewToScene(QPointF(x, 100))))
+
+
+@pytest.mark.parametrize('window', [5, 24 * 60])
+def test_click_on_rolled_up_history_adds_then_removes_reference(monitor, window):
+    plot_manager = monitor.plot_manager
+    plot_manager.clear_references()
+    # A stretch older than the raw samples kept, so only the rollups cover it
+    end = monitor.times[-1] - RAW_RETENTION - window
+    plot_manager.plot.vb.setXRange(end - window, end, padding=0)
+    x = end - window * 0.37  # Off the bucket boundaries
+
+    click(monitor, x)
+    assert len(plot_manager.reference_lines) == 1
+    x_val = plot_manager.reference_data[0][0]
+    assert end - window <= x_val <= end
+    assert abs(x_val - x) < window / 100
+
+    click(monitor, x)
+    assert plot_manager.reference_lines == []
+    assert plot_manager.reference_data == []
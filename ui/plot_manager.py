@@ -1,10 +1,116 @@
 import pyqtgraph as pg
-from PyQt6.QtCore import Qt
+from PyQt6.QtCore import Qt, QObject, QEvent, QTimer
 import numpy as np
 import time
-from PyQt6.QtWidgets import QPushButton, QVBoxLayout, QWidget, QComboBox, QHBoxLayout, QSlider, QLabel
+from PyQt6.QtGui import QFont
+from PyQt6.QtWidgets import (QPushButton, QVBoxLayout, QWidget, QComboBox, QHBoxLayout, QSlider, QLabel, QCheckBox,
+                             QMessageBox, QFileDialog, QGraphicsTextItem)
+import functools
+import html
 import math
-from utils.disk_utils import get_available_drives
+import os
+
+from utils.dir_scanner import top_growers
+from utils.disk_utils import BYTES_TO_GB
+from utils.session_file import have_pyarrow
+
+# Zoom slider stops: visible window in minutes, from 5 minutes to 30 days
+ZOOM_WINDOWS = (5, 10, 20, 60, 3 * 60, 6 * 60, 12 * 60, 24 * 60, 3 * 24 * 60, 7 * 24 * 60, 14 * 24 * 60, 30 * 24 * 60)
+# (widest visible range, major x tick spacing), in minutes
+X_TICK_SPACINGS = ((5, 0.5), (15, 1), (30, 2), (90, 5), (180, 15), (360, 30), (12 * 60, 60), (24 * 60, 120),
+                   (3 * 24 * 60, 6 * 60))
+# (widest visible range, unit label, minutes per unit) of the time axis
+X_AXIS_UNITS = ((3 * 60, 'minutes', 1), (3 * 24 * 60, 'hours', 60))
+TIME_SLIDER_STEPS = 1000
+REFERENCE_HIT_PIXELS = 5  # A click this close to a reference point removes it
+PROJECTION_FRACTION = 0.2  # Share of the window left after the newest sample for the projected usage
+MIN_FILL_RATE = 0.01  # GB/hour; slower than this counts as steady
+HUD_REFRESH_MS = 500
+
+
+def format_duration(minutes):
+    if minutes < 60:
+        return f"{minutes:.0f} min"
+    if minutes < 48 * 60:
+        return f"{minutes / 60:.1f} h"
+    if minutes < 365 * 24 * 60:
+        return f"{minutes / (24 * 60):.1f} d"
+    return "over a year"
+
+
+def format_window(minutes):
+    if minutes >= 24 * 60:
+        return f"{minutes // (24 * 60):g} d"
+    if minutes >= 60:
+        return f"{minutes // 60:g} h"
+    return f"{minutes:g} min"
+
+
+def format_bytes(count):
+    if abs(count) >= BYTES_TO_GB / 10:
+        return f"{count / BYTES_TO_GB:+.2f}GB"
+    return f"{count / 1e6:+.1f}MB"
+
+
+def x_tick_spacing(x_range):
+    """Major tick spacing for a visible range, both in minutes"""
+    for widest, spacing in X_TICK_SPACINGS:
+        if x_range <= widest:
+            return spacing
+    return 24 * 60
+
+
+def x_axis_unit(x_range):
+    """(label, minutes per unit) of the time axis for a visible range in minutes"""
+    for widest, label, minutes in X_AXIS_UNITS:
+        if x_range <= widest:
+            return label, minutes
+    return 'days', 24 * 60
+
+
+@functools.lru_cache(maxsize=64)
+def y_ticks(total_gb):
+    """Major ticks of the usage axis, from 0 in round steps with the disk size on top.
+
+    Cached so an unchanged disk size yields the same tuple, which the plot
+    then recognises as already drawn.
+    """
+    if total_gb > 500:
+        major_y = 100  # Use 100GB intervals for large disks
+    elif total_gb > 100:
+        major_y = 50   # Use 50GB intervals for medium disks
+    else:
+        major_y = 10   # Use 10GB intervals for small disks
+    ticks = [(value, f"{value}GB") for value in range(0, int(total_gb) + 1, major_y)]
+    if ticks[-1][0] != total_gb:
+        ticks.append((total_gb, f"{int(total_gb)}GB"))
+    return tuple(ticks)
+
+class FirstPaintFilter(QObject):
+    """Calls `callback` once, right after `widget` is painted for the first time"""
+
+    def __init__(self, widget, callback):
+        super().__init__(widget)
+        self.callback = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            QTimer.singleShot(0, self.callback)  # Once this paint has been delivered
+        return False
+
+class TimedGraphicsLayoutWidget(pg.GraphicsLayoutWidget):
+    """GraphicsLayoutWidget that reports how long each paint of its viewport takes to `on_paint(seconds)`"""
+
+    def __init__(self, on_paint):
+        super().__init__()
+        self.on_paint = on_paint
+
+    def paintEvent(self, event):
+        start = time.perf_counter()
+        super().paintEvent(event)
+        self.on_paint(time.perf_counter() - start)
 
 class PlotManager:
     def __init__(self, monitor):
@@ -15,7 +121,8 @@ class PlotManager:
         layout = QVBoxLayout()
         
         # Create plot widget
-        self.win = pg.GraphicsLayoutWidget()
+        self.profile = self.monitor.tick_profile
+        self.win = TimedGraphicsLayoutWidget(lambda seconds: self.profile.record('paint', seconds))
         self.win.setBackground('w')
         self.win.ci.setSpacing(0)  # Remove spacing between items
         
@@ -41,10 +148,32 @@ class PlotManager:
         # Add menu items for zoom control
         self.plot.getViewBox().menu.addSeparator()
         self.plot.getViewBox().menu.addAction('Reset View').triggered.connect(self.reset_view)
-        
-        # Create curves
+        self.hud_action = self.plot.getViewBox().menu.addAction('Performance HUD')
+        self.hud_action.setCheckable(True)
+        self.hud_action.toggled.connect(self.on_hud_toggled)
+        self.plot.getViewBox().menu.addAction('Save Performance Profile...').triggered.connect(self.save_tick_profile)
+        self.plot.getViewBox().menu.addSeparator()
+        self.plot.getViewBox().menu.addAction('Export Session...').triggered.connect(self.export_session)
+        self.plot.getViewBox().menu.addAction('Open Session...').triggered.connect(self.open_session)
+        
+        # Create curves (with a legend when per-container curves will be added)
+        if self.monitor.container_filters is not None:
+            self.plot.addLegend(offset=(10, 10))
+        self.container_curves = {}
+        self.overlay_curves = {}  # Mountpoint -> usage curve of another drive
+        self.show_overlay = False
         self.system_curve = self.plot.plot(pen=pg.mkPen('b', width=2), name='System')
         self.docker_curve = self.plot.plot(pen=pg.mkPen('r', width=2), name='Docker')
+        # Where the fill-rate forecast says usage is heading
+        self.system_projection = self.plot.plot(pen=pg.mkPen('b', width=2, style=Qt.PenStyle.DashLine))
+        self.docker_projection = self.plot.plot(pen=pg.mkPen('r', width=2, style=Qt.PenStyle.DashLine))
+        self._suppress_render = False
+        self.drawn = {}  # Element -> the inputs it was last set with
+        self.pending = []  # (apply, args, profile phase) staged this frame
+        self.drawn_curves = {}  # Curve -> copies of the (x, y) it was last given
+        self.default_render_width = 1000  # Used until the view box has been laid out
+        self.plot.getViewBox().sigXRangeChanged.connect(self.render_curves)
+        self.plot.getViewBox().sigResized.connect(self.render_curves)
         self.docker_capacity_line = pg.InfiniteLine(angle=0, pen=pg.mkPen('r', style=Qt.PenStyle.DashLine))
         self.plot.addItem(self.docker_capacity_line)
         
@@ -54,13 +183,37 @@ class PlotManager:
         self.tooltip = pg.TextItem(text='', anchor=(0, 1))
         self.plot.addItem(self.tooltip)
         
+        # Per-phase frame timings, drawn over the top-left of the plot in view box (not data) coordinates
+        self.hud = QGraphicsTextItem()
+        self.hud.setParentItem(self.plot.getViewBox())
+        self.hud.setPos(5, 5)
+        self.hud.setZValue(1000)
+        self.hud.setFont(QFont('monospace', 8))
+        self.hud.setDefaultTextColor(pg.mkColor('#404040'))
+        self.hud.hide()
+        self.hud_timer = QTimer()
+        self.hud_timer.timeout.connect(self.refresh_hud)
+        
         # Create info label widget
         self.info_label = pg.LabelItem(justify='center')
         self.win.addItem(self.info_label, row=1, col=0)
         self.info_label.setText('Initializing...')
-        
-        # Add plot widget to layout first
-        layout.addWidget(self.win)
+        self.sampler_label = pg.LabelItem(justify='center', size='7pt', color='#808080')
+        self.win.addItem(self.sampler_label, row=2, col=0)
+        self.last_stats_update = 0
+        
+        # Add plot widget to layout first, with the live writes panel beside it
+        plot_layout = QHBoxLayout()
+        plot_layout.addWidget(self.win, stretch=1)
+        self.writes_panel = QLabel()
+        self.writes_panel.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
+        self.writes_panel.setWordWrap(True)
+        self.writes_panel.setFixedWidth(280)
+        self.writes_panel.hide()
+        plot_layout.addWidget(self.writes_panel)
+        layout.addLayout(plot_layout)
+        self.writes_timer = QTimer()
+        self.writes_timer.timeout.connect(self.refresh_writes_panel)
         
         # Create bottom controls container
         bottom_layout = QHBoxLayout()
@@ -82,23 +235,46 @@ class PlotManager:
         # Create drive selection combo box
         self.drive_combo = QComboBox()
         self.drive_combo.setMinimumWidth(200)  # Make dropdown wider
-        self.update_drive_list()
+        # Only the selected drive until discovery finishes, after the window is up
+        self.local_drives = [(self.monitor.selected_drive, None)]  # (mountpoint, device name)
+        self.remote_drives = []  # (host key, connected) from the fleet collector, listed after the local drives
+        self.imported_drives = []  # (key, file name) of sessions opened from files, listed last
+        self.drive_combo.addItem(self.monitor.selected_drive, self.monitor.selected_drive)
         self.drive_combo.currentIndexChanged.connect(self.on_drive_changed)
         bottom_layout.addWidget(self.drive_combo)
         
-        # Create zoom slider
+        # Overlay the other drives' usage on the selected one
+        self.overlay_checkbox = QCheckBox('Compare drives')
+        self.overlay_checkbox.toggled.connect(self.on_overlay_toggled)
+        bottom_layout.addWidget(self.overlay_checkbox)
+        
+        # Measure folders at each reference point, to see where space went between two of them
+        self.scan_checkbox = QCheckBox('Scan folders at references')
+        bottom_layout.addWidget(self.scan_checkbox)
+        self.growers_button = QPushButton('Top growers')
+        self.growers_button.clicked.connect(self.show_growers)
+        bottom_layout.addWidget(self.growers_button)
+        
+        # Live per-directory writes from filesystem events, shown beside the plot
+        self.writes_checkbox = QCheckBox('Live writes')
+        self.writes_checkbox.toggled.connect(self.on_live_writes_toggled)
+        bottom_layout.addWidget(self.writes_checkbox)
+        
+        # Create zoom slider, one step per entry of ZOOM_WINDOWS
         self.zoom_slider = QSlider(Qt.Orientation.Horizontal)
-        self.zoom_slider.setMinimum(5)  # 5 minutes minimum
-        self.zoom_slider.setMaximum(20)  # 20 minutes maximum
-        self.zoom_slider.setValue(10)  # Default 10 minute view
+        self.zoom_slider.setMinimum(0)
+        self.zoom_slider.setMaximum(len(ZOOM_WINDOWS) - 1)
+        self.zoom_slider.setValue(ZOOM_WINDOWS.index(self.default_window))
         self.zoom_slider.setTickPosition(QSlider.TickPosition.TicksBelow)
-        self.zoom_slider.setTickInterval(5)
+        self.zoom_slider.setTickInterval(1)
         self.zoom_slider.valueChanged.connect(self.on_zoom_changed)
+        self.zoom_label = QLabel(format_window(self.default_window))
         
         # Add zoom controls to bottom layout
         zoom_layout = QHBoxLayout()
-        zoom_layout.addWidget(QLabel("Zoom (minutes):"))
+        zoom_layout.addWidget(QLabel("Zoom:"))
         zoom_layout.addWidget(self.zoom_slider)
+        zoom_layout.addWidget(self.zoom_label)
         bottom_layout.addLayout(zoom_layout)
         
         # Create time navigation slider
@@ -106,10 +282,10 @@ class PlotManager:
         time_layout.addWidget(QLabel("Time Navigation:"))
         self.time_slider = QSlider(Qt.Orientation.Horizontal)
         self.time_slider.setMinimum(0)
-        self.time_slider.setMaximum(100)  # We'll update this dynamically
-        self.time_slider.setValue(100)  # Start at latest time
+        self.time_slider.setMaximum(TIME_SLIDER_STEPS)
+        self.time_slider.setValue(TIME_SLIDER_STEPS)  # Start at latest time
         self.time_slider.setTickPosition(QSlider.TickPosition.TicksBelow)
-        self.time_slider.setTickInterval(10)
+        self.time_slider.setTickInterval(TIME_SLIDER_STEPS // 10)
         self.time_slider.valueChanged.connect(self.on_time_changed)
         time_layout.addWidget(self.time_slider)
         
@@ -127,6 +303,10 @@ class PlotManager:
         self.reference_lines = []
         self.reference_labels = []
         self.reference_data = []
+        self.reference_scans = []  # ScanJob per reference point, None when it was added without scanning
+        self.pending_scans = []  # (label, label text, ScanJob) until the scan finishes
+        self.scan_timer = QTimer()
+        self.scan_timer.timeout.connect(self.check_scans)
         
         # Connect mouse events
         self.plot.scene().sigMouseMoved.connect(self.mouse_moved)
@@ -135,13 +315,46 @@ class PlotManager:
         # After creating self.plot
         self.plot.getViewBox().setDefaultPadding(0)  # Remove default padding
         self.plot.setContentsMargins(10, 10, 10, 50)  # Add bottom margin for labels
+        
+        # Everything that can wait (drive discovery, Docker) starts after the first frame
+        self.first_paint = FirstPaintFilter(self.win.viewport(), self.monitor.on_first_paint)
 
-    def update_drive_list(self):
-        """Update the drive selection dropdown"""
+    def populate_drive_combo(self):
+        """Fill the drive selection dropdown; returns the index of the selected drive, -1 if it is gone"""
+        self.drive_combo.blockSignals(True)  # Repopulating must not look like a selection
         self.drive_combo.clear()
-        drives = get_available_drives()
-        for mountpoint, device in drives:
-            self.drive_combo.addItem(f"{mountpoint} ({device})", mountpoint)
+        for mountpoint, device in self.local_drives:
+            self.drive_combo.addItem(mountpoint if device is None else f"{mountpoint} ({device})", mountpoint)
+        for key, connected in self.remote_drives:
+            self.drive_combo.addItem(key if connected else f"{key} (disconnected)", key)
+        for key, name in self.imported_drives:
+            self.drive_combo.addItem(f"{name} (imported)", key)
+        index = self.drive_combo.findData(self.monitor.selected_drive)
+        if index >= 0:
+            self.drive_combo.setCurrentIndex(index)
+        self.drive_combo.blockSignals(False)
+        return index
+
+    def update_drive_list(self, drives):
+        """Fill the drive selection dropdown with discovered (mountpoint, name) pairs"""
+        self.local_drives = drives
+        index = self.populate_drive_combo()
+        # Record every drive from now on so switching between them loses nothing
+        self.monitor.set_drives([mountpoint for mountpoint, _ in drives])
+        if index < 0 and drives:
+            # The selected drive was unmounted: show the first one and stop sampling it
+            self.on_drive_changed(0)
+            self.monitor.set_drives([mountpoint for mountpoint, _ in drives])
+        else:
+            self.update_title()
+
+    def update_remote_drives(self, hosts):
+        """List the collector's hosts, as (key, connected) pairs, after the local drives"""
+        selected = self.monitor.selected_drive
+        if selected in self.monitor.remote_drives and all(key != selected for key, _ in hosts):
+            hosts = hosts + [(selected, False)]  # Keep showing a host the collector forgot, e.g. after a restart
+        self.remote_drives = hosts
+        self.populate_drive_combo()
 
     def on_drive_changed(self, index):
         """Handle drive selection change"""
@@ -150,98 +363,90 @@ class PlotManager:
             self.monitor.set_drive(new_drive)
             self.update_title()
 
+    def on_overlay_toggled(self, checked):
+        self.show_overlay = checked
+        if not checked:
+            self.remove_overlay_curves()
+        self.render_curves()
+        if self.monitor.latest_sample is not None:
+            self.update()
+
+    def remove_overlay_curves(self):
+        for curve in self.overlay_curves.values():
+            self.plot.removeItem(curve)
+            self.drawn_curves.pop(curve, None)
+        self.overlay_curves.clear()
+
+    def show_drive(self):
+        """Show the newly selected drive's history; called by the monitor after switching"""
+        self.clear_references()
+        self.tooltip.hide()
+        self.cursor_line.hide()
+        self.remove_overlay_curves()  # The drive now shown as the main one must not be overlaid too
+        self.clear_projections()
+        self.reset_view()
+        self.render_curves()
+        if self.monitor.latest_sample is not None:
+            self.update()
+        else:
+            self.info_label.setText('Waiting for data...')
+            self.drawn.pop('info', None)
+
     def update_title(self):
         """Update plot title with selected drive info"""
         drive_name = self.drive_combo.currentText().split(' (')[0]  # Get just the name part
         self.plot.setTitle(f'Disk Space Monitor - {drive_name}')
 
     def update(self):
-        if self.monitor.start_time is None:
-            self.monitor.start_time = time.time()
-            current_time = 0
-        else:
-            current_time = (time.time() - self.monitor.start_time) / 60
+        """Redraw after new samples have been recorded.
 
-        # Get system usage
-        total_gb, used_gb, available_gb, percent = self.monitor.get_disk_usage()
-        
-        # Get Docker usage
-        docker_total_gb, docker_used_gb = self.monitor.get_docker_usage()
+        Each element is staged with the inputs it should show and only set
+        when those differ from what it already shows; the changes are then
+        applied together, so a frame without news invalidates nothing.
+        """
+        (total_gb, used_gb, available_gb, percent), (docker_total_gb, docker_used_gb) = self.monitor.latest_sample
         
         # Update Docker capacity line
-        if docker_total_gb is not None:
-            self.docker_capacity_line.setValue(docker_total_gb)
-            self.docker_capacity_line.show()
-        else:
-            self.docker_capacity_line.hide()
-        
-        # Append new data
-        self.monitor.times.append(current_time)
-        self.monitor.usage.append(used_gb)
-        self.monitor.docker_usage.append(docker_used_gb if docker_used_gb is not None else 0)
+        self.stage('docker_capacity', self.show_docker_capacity, docker_total_gb)
         
-        # Update plot data
-        times_array = np.array(list(self.monitor.times))
-        self.system_curve.setData(times_array, np.array(list(self.monitor.usage)))
-        self.docker_curve.setData(times_array, np.array(list(self.monitor.docker_usage)))
+        current_time = self.monitor.times[-1]
 
         # Get current view range
-        view_range = self.plot.getViewBox().viewRange()
+        view_box = self.plot.getViewBox()
+        view_range = view_box.viewRange()
         current_max_x = view_range[0][1]
 
-        # Auto-scroll if viewing the latest data
-        if current_max_x >= max(times_array) - 0.1 or current_max_x == self.default_window:
-            self.plot.getViewBox().setXRange(
-                max(0, current_time - self.default_window),
-                max(self.default_window, current_time),
-                padding=0
-            )
+        # Auto-scroll if viewing the latest data, unless by less than a pixel, which would look the same
+        if current_max_x >= self.monitor.times[-1] - 0.1 or current_max_x == self.default_window:
+            x_min, x_max = self.follow_range(current_time)
+            pixel = (x_max - x_min) / (view_box.width() or self.default_render_width)
+            if abs(x_max - current_max_x) >= pixel:
+                self._suppress_render = True
+                view_box.setXRange(x_min, x_max, padding=0)
+                self._suppress_render = False
+        self.profile.mark('axes')
 
-        # Ensure minimum x is always 0
-        self.plot.getViewBox().setLimits(xMin=0)
+        # Update plot data for the visible window only
+        self.render_curves()
+        view_range = view_box.viewRange()
 
-        # Update y-axis
-        padding = total_gb * 0.05
-        self.plot.getViewBox().setYRange(0, total_gb + padding, padding=0)
-        
-        # Calculate nice round number for tick intervals
-        if total_gb > 500:
-            major_y = 100  # Use 100GB intervals for large disks
-        elif total_gb > 100:
-            major_y = 50   # Use 50GB intervals for medium disks
-        else:
-            major_y = 10   # Use 10GB intervals for small disks
-        
-        # Calculate regular tick values
-        tick_values = []
-        
-        # Add ticks from 0 up to total_gb
-        current = 0
-        while current <= total_gb:
-            tick_values.append((current, f"{int(current)}GB"))
-            current += major_y
-        
-        # Add the total as final tick if it's not already included
-        if current - major_y != total_gb:
-            tick_values.append((total_gb, f"{int(total_gb)}GB"))
-        
-        # Set custom ticks
-        self.plot.getAxis('left').setTicks([tick_values, []])
+        # Update y-axis, tall enough for any overlaid drive
+        y_max = total_gb
+        if self.show_overlay:
+            for history in self.monitor.drive_histories.values():
+                if history.latest is not None:
+                    y_max = max(y_max, history.latest[0])
+        padding = y_max * 0.05
+        self.stage('y_range', view_box.setYRange, 0, y_max + padding, 0)
+        # Size of a pixel in data units, below which a change does not show
+        x_span = view_range[0][1] - view_range[0][0]
+        self.pixel = (x_span / (view_box.width() or self.default_render_width),
+                      (y_max + padding) / (view_box.height() or self.default_render_width) or 1)
+        self.stage('y_ticks', self.set_y_ticks, y_ticks(total_gb))
         
         # Set x-axis ticks based on zoom level
-        x_range = view_range[0][1] - view_range[0][0]  # Current visible range
-
-        # Calculate appropriate tick spacing based on zoom level
-        if x_range <= 5:  # 5 minutes or less
-            major_x = 0.5  # 30 second intervals
-        elif x_range <= 15:
-            major_x = 1.0  # 1 minute intervals
-        elif x_range <= 30:
-            major_x = 2.0  # 2 minute intervals
-        else:
-            major_x = 5.0  # 5 minute intervals
-
-        self.plot.getAxis('bottom').setTickSpacing(major_x, major_x/2)
+        self.stage('x_ticks', self.set_x_ticks, x_tick_spacing(x_span), x_axis_unit(x_span))
+        self.profile.mark('axes')
         
         # Update info text
         if docker_total_gb is not None and docker_used_gb is not None:
@@ -257,33 +462,179 @@ class PlotManager:
                 f'System Used: {used_gb:.1f}GB ({percent:.1f}%)  •  '
                 f'Docker Used: Not Available'
             )
-        self.info_label.setText(info_str)
+        forecast = [self.update_forecast('usage', self.system_projection, 'System', total_gb)]
+        if docker_total_gb is not None:
+            forecast.append(self.update_forecast('docker_usage', self.docker_projection, 'Docker', docker_total_gb))
+        else:
+            self.stage('docker_usage projection', self.docker_projection.setData, [], [], phase='setData')
+        self.stage('info', self.info_label.setText, info_str + '<br>' + '  •  '.join(forecast), phase='label')
+
+        # Sampler health, refreshed about once a second
+        now = time.monotonic()
+        if now - self.last_stats_update >= 1:
+            self.last_stats_update = now
+            stats = self.monitor.scheduler.stats('disk')
+            self.stage('sampler', self.sampler_label.setText,
+                       f"Sampling every {stats['interval_ms']:.0f}ms  •  "
+                       f"jitter p50 {stats['jitter_p50_ms']:.1f}ms / p99 {stats['jitter_p99_ms']:.1f}ms  •  "
+                       f"late {stats['late_ticks']}  •  dropped {stats['dropped_ticks'] + stats['overflowed']}",
+                       phase='label')
+        self.profile.mark('label')
 
         # Update time slider range if viewing latest data
         if len(self.monitor.times) > 0:
             current_value = self.time_slider.value()
             if current_value == self.time_slider.maximum():  # If slider was at the end
-                self.time_slider.setValue(100)  # Keep it at the end
+                self.time_slider.setValue(TIME_SLIDER_STEPS)  # Keep it at the end
             self.time_slider.setEnabled(True)
         else:
             self.time_slider.setEnabled(False)
+        self.profile.mark('axes')
+        self.flush()
+
+    def stage(self, element, apply, *args, phase='axes', key=None):
+        """Queue apply(*args) for the end of the frame, unless `element` already shows `args`.
+
+        `key`, if given, stands for the args in that comparison, e.g. coordinates rounded to pixels.
+        """
+        key = args if key is None else key
+        if self.drawn.get(element) != key:
+            self.drawn[element] = key
+            self.pending.append((apply, args, phase))
+
+    def flush(self):
+        """Apply the staged changes, in one go"""
+        for apply, args, phase in self.pending:
+            apply(*args)
+            self.profile.mark(phase)
+        self.pending.clear()
+
+    def show_docker_capacity(self, docker_total_gb):
+        if docker_total_gb is not None:
+            self.docker_capacity_line.setValue(docker_total_gb)
+            self.docker_capacity_line.show()
+        else:
+            self.docker_capacity_line.hide()
+
+    def set_y_ticks(self, ticks):
+        self.plot.getAxis('left').setTicks([list(ticks), []])
+
+    def set_x_ticks(self, major_x, unit):
+        """Tick the time axis every major_x minutes, labelled in `unit` ((label, minutes per unit))"""
+        label, minutes = unit
+        axis = self.plot.getAxis('bottom')
+        axis.setTickSpacing(major_x, major_x/2)
+        axis.setScale(1 / minutes)
+        self.plot.setLabel('bottom', f'Time ({label})')
+
+    def update_forecast(self, column, projection, label, capacity_gb):
+        """Draw the projected usage of one column and describe when it fills up"""
+        estimator = self.monitor.selected_history.growth[column]
+        fit = estimator.fit()
+        if fit is None:
+            self.stage(f'{column} projection', projection.setData, [], [], phase='setData')
+            return f'{label}: estimating fill rate...'
+        value, rate = fit
+
+        # Project to the end of the view, stopping where the disk would be full
+        horizon = self.default_window * PROJECTION_FRACTION
+        to_full = estimator.time_to(capacity_gb)
+        if to_full is not None:
+            horizon = min(horizon, to_full)
+        x, y = [estimator.t, estimator.t + horizon], [value, value + rate * horizon]
+        pixel_x, pixel_y = self.pixel
+        self.stage(f'{column} projection', projection.setData, x, y, phase='setData',
+                   key=tuple(round(v / pixel_x) for v in x) + tuple(round(v / pixel_y) for v in y))
+
+        per_hour = rate * 60
+        if abs(per_hour) < MIN_FILL_RATE:
+            return f'{label}: steady'
+        text = f'{label}: {per_hour:+.2f}GB/h'
+        if to_full is not None:
+            text += ', full now' if to_full == 0 else f', full in {format_duration(to_full)}'
+            threshold = self.monitor.forecast_threshold
+            to_threshold = estimator.time_to(capacity_gb * threshold / 100)
+            if threshold < 100 and to_threshold is not None:
+                reached = 'reached' if to_threshold == 0 else f'in {format_duration(to_threshold)}'
+                text += f' ({threshold:g}% {reached})'
+        return text
+
+    def clear_projections(self):
+        self.system_projection.setData([], [])
+        self.docker_projection.setData([], [])
+        self.drawn.pop('usage projection', None)
+        self.drawn.pop('docker_usage projection', None)
+
+    def set_curve_data(self, curve, x, y, pixel):
+        """setData() unless the curve would look the same, as an idle disk's does.
+
+        That is when the points are those it shows, or those followed by a
+        flat tail shorter than `pixel`, the width of a pixel in x.
+        """
+        drawn = self.drawn_curves.get(curve)
+        if drawn is not None:
+            drawn_x, drawn_y = drawn
+            n = len(drawn_x)
+            if n == 0:
+                if len(x) == 0:
+                    return
+            elif (len(x) >= n and x[-1] - drawn_x[-1] < pixel and np.array_equal(x[:n], drawn_x)
+                  and np.array_equal(y[:n], drawn_y, equal_nan=True) and np.all(y[n:] == drawn_y[-1])):
+                return
+        self.drawn_curves[curve] = (np.array(x), np.array(y))  # Copies: x and y may be views of a ring buffer
+        curve.setData(x, y)
+
+    def render_curves(self, *args):
+        """Draw the visible x-range at roughly one min/max pair per pixel"""
+        if self._suppress_render:
+            return
+        view_box = self.plot.getViewBox()
+        (x_min, x_max), _ = view_box.viewRange()
+        width = view_box.width() or self.default_render_width
+        pixel = (x_max - x_min) / width
+        profile = self.profile
+        profile.mark('axes')  # Whatever led here, e.g. a range change
+        x, ys = self.monitor.selected_history.visible(x_min, x_max, width)
+        profile.mark('decimate')
+        self.set_curve_data(self.system_curve, x, ys['usage'], pixel)
+        self.set_curve_data(self.docker_curve, x, ys['docker_usage'], pixel)
+        profile.mark('setData')
+
+        for name, pyramid in self.monitor.container_histories.items():
+            curve = self.container_curves.get(name)
+            if curve is None:
+                color = pg.intColor(len(self.container_curves), hues=12)
+                curve = self.container_curves[name] = self.plot.plot(pen=pg.mkPen(color, width=1), name=name)
+            x, ys = pyramid.visible(x_min, x_max, width)
+            profile.mark('decimate')
+            self.set_curve_data(curve, x, ys['size'], pixel)
+            profile.mark('setData')
+
+        if self.show_overlay:
+            if self.plot.legend is None:
+                self.plot.addLegend(offset=(10, 10))
+            for drive, history in self.monitor.drive_histories.items():
+                if drive == self.monitor.selected_drive:
+                    continue
+                curve = self.overlay_curves.get(drive)
+                if curve is None:
+                    color = pg.intColor(len(self.overlay_curves), hues=8, minValue=120)
+                    curve = self.overlay_curves[drive] = self.plot.plot(
+                        pen=pg.mkPen(color, width=1, style=Qt.PenStyle.DashDotLine), name=drive)
+                x, ys = history.visible(x_min, x_max, width)
+                profile.mark('decimate')
+                self.set_curve_data(curve, x, ys['usage'], pixel)
+                profile.mark('setData')
 
     def reset(self):
-        self.monitor.times.clear()
-        self.monitor.usage.clear()
-        self.monitor.docker_usage.clear()
-        self.monitor.start_time = None
-        
-        # Clear reference points and their visual elements
-        for line in self.reference_lines:
-            self.plot.removeItem(line)
-        for label in self.reference_labels:
-            self.plot.removeItem(label)
-        
-        # Clear stored references
-        self.reference_lines.clear()
-        self.reference_labels.clear()
-        self.reference_data.clear()
+        self.monitor.clear_history()
+        for curve in self.container_curves.values():
+            self.plot.removeItem(curve)
+            self.drawn_curves.pop(curve, None)
+        self.container_curves.clear()
+        self.remove_overlay_curves()
+        self.clear_references()
+        self.clear_projections()
         
         # Reset tooltip and cursor line
         self.tooltip.hide()
@@ -295,18 +646,33 @@ class PlotManager:
         self.monitor.resume()
         
         # Reset zoom slider
-        self.zoom_slider.setValue(5)
+        self.zoom_slider.setValue(0)
         
         # Reset to default 5-minute view starting at 0
         self.plot.getViewBox().setXRange(0, self.default_window, padding=0)
         self.plot.getViewBox().setLimits(xMin=0)
         
         # Reset time slider
-        self.time_slider.setValue(100)
+        self.time_slider.setValue(TIME_SLIDER_STEPS)
         
         # Force a redraw
         self.plot.replot()
 
+    def clear_references(self):
+        """Remove the reference points and their visual elements"""
+        for line in self.reference_lines:
+            self.plot.removeItem(line)
+        for label in self.reference_labels:
+            self.plot.removeItem(label)
+        
+        # Clear stored references
+        self.reference_lines.clear()
+        self.reference_labels.clear()
+        self.reference_data.clear()
+        self.reference_scans.clear()
+        self.pending_scans.clear()
+        self.scan_timer.stop()
+
     def mouse_moved(self, event):
         pos = event  # event is already a QPointF, no need for indexing
         if not self.plot.sceneBoundingRect().contains(pos):
@@ -317,12 +683,12 @@ class PlotManager:
         mouse_point = self.plot.vb.mapSceneToView(pos)
         x = mouse_point.x()
         
-        if len(self.monitor.times) > 0:
-            times_array = np.array(list(self.monitor.times))
-            idx = np.abs(times_array - x).argmin()
-            x_val = times_array[idx]
-            sys_val = list(self.monitor.usage)[idx]
-            docker_val = list(self.monitor.docker_usage)[idx]
+        sample = self.monitor.selected_history.nearest(x)
+        if sample is not None:
+            x_val, values = sample
+            x_val = self.clamp_to_view(x_val)
+            sys_val = values['usage']
+            docker_val = values['docker_usage']
             
             self.cursor_line.setPos(x_val)
             self.cursor_line.show()
@@ -344,51 +710,241 @@ class PlotManager:
         x = mouse_point.x()
         
         # Check if click is near any reference line
+        x_range = self.plot.vb.viewRange()[0]
+        threshold = max(0.1, REFERENCE_HIT_PIXELS * (x_range[1] - x_range[0])
+                        / (self.plot.vb.width() or self.default_render_width))
         for i, line in enumerate(self.reference_lines):
-            if abs(x - line.value()) < 0.1:  # 0.1 minute threshold
+            if abs(x - line.value()) < threshold:
                 self.plot.removeItem(line)
                 if i < len(self.reference_labels):
                     self.plot.removeItem(self.reference_labels[i])
                 self.reference_lines.pop(i)
                 self.reference_labels.pop(i)
                 self.reference_data.pop(i)
+                self.reference_scans.pop(i)
                 return
         
         # Add new reference line if under limit
         if len(self.reference_lines) >= 5:  # max 5 reference points
             return
         
-        if len(self.monitor.times) > 0:
-            times_array = np.array(list(self.monitor.times))
-            idx = np.abs(times_array - x).argmin()
-            x_val = times_array[idx]
-            
-            # Get data first
-            sys_val = list(self.monitor.usage)[idx]
-            docker_val = list(self.monitor.docker_usage)[idx]
-            
-            # Create line with unique color
-            readable_colors = ['#2E86C1', '#28B463', '#8E44AD', '#D35400', '#273746']  # Blue, Green, Purple, Orange, Dark Gray
-            color = pg.mkColor(readable_colors[len(self.reference_lines)])
-            ref_line = pg.InfiniteLine(angle=90, movable=False, 
-                                     pen=pg.mkPen(color, style=Qt.PenStyle.DashLine))
-            ref_line.setValue(x_val)
-            self.plot.addItem(ref_line)
-            
-            # Create label with same color
-            stats_text = f'T{len(self.reference_lines)+1}\n{x_val:.1f}m\nSys:{sys_val:.1f}GB'
-            if docker_val > 0:
-                stats_text += f'\nDoc:{docker_val:.1f}GB'
-            label = pg.TextItem(text=stats_text, anchor=(0, 1), color=color)  # Anchor to top-left
-            # Position label below axis in the margin area
-            label.setParentItem(self.plot.getAxis('bottom'))  # Attach to x-axis
-            label.setPos(x_val, 0)  # Position below axis
-            self.plot.addItem(label)
-            
-            # Store reference data
-            self.reference_lines.append(ref_line)
-            self.reference_labels.append(label)
-            self.reference_data.append((x_val, sys_val, docker_val))
+        sample = self.monitor.selected_history.nearest(x)
+        if sample is not None:
+            x_val, values = sample
+            x_val = self.clamp_to_view(x_val)
+            # Snapshot folder sizes as they are now (not as of x_val; no history of folders is kept)
+            job = self.monitor.scan_drive() if self.scan_checkbox.isChecked() else None
+            self.add_reference(x_val, values['usage'], values['docker_usage'], job)
+
+    def clamp_to_view(self, x):
+        """x moved into the visible time range, so what marks it stays on screen"""
+        x_min, x_max = self.plot.vb.viewRange()[0]
+        return min(max(x, x_min), x_max)
+
+    def add_reference(self, x_val, sys_val, docker_val, job=None):
+        """Mark a reference point, with its folder scan if one was started"""
+        # Create line with unique color
+        readable_colors = ['#2E86C1', '#28B463', '#8E44AD', '#D35400', '#273746']  # Blue, Green, Purple, Orange, Dark Gray
+        color = pg.mkColor(readable_colors[len(self.reference_lines)])
+        ref_line = pg.InfiniteLine(angle=90, movable=False, 
+                                 pen=pg.mkPen(color, style=Qt.PenStyle.DashLine))
+        ref_line.setValue(x_val)
+        self.plot.addItem(ref_line)
+        
+        # Create label with same color
+        stats_text = f'T{len(self.reference_lines)+1}\n{x_val:.1f}m\nSys:{sys_val:.1f}GB'
+        if docker_val > 0:
+            stats_text += f'\nDoc:{docker_val:.1f}GB'
+        label = pg.TextItem(text=stats_text, anchor=(0, 1), color=color)  # Anchor to top-left
+        # Position label below axis in the margin area
+        label.setParentItem(self.plot.getAxis('bottom'))  # Attach to x-axis
+        label.setPos(x_val, 0)  # Position below axis
+        self.plot.addItem(label)
+        
+        # Store reference data
+        self.reference_lines.append(ref_line)
+        self.reference_labels.append(label)
+        self.reference_data.append((x_val, sys_val, docker_val))
+        self.reference_scans.append(job)
+        if job is not None:
+            label.setText(stats_text + '\nScanning...')
+            self.pending_scans.append((label, stats_text, job))
+            self.scan_timer.start(250)
+            self.check_scans()  # A scan carried over from a rebuilt window may be done already
+
+    def check_scans(self):
+        """Show on their labels which reference scans have finished"""
+        for entry in list(self.pending_scans):
+            label, stats_text, job = entry
+            if job.done:
+                self.pending_scans.remove(entry)
+                if job.snapshot is not None:
+                    label.setText(stats_text + f'\n{job.snapshot.files:,} files')
+                else:
+                    label.setText(stats_text + '\nScan failed')
+        if not self.pending_scans:
+            self.scan_timer.stop()
+
+    def on_live_writes_toggled(self, checked):
+        if checked:
+            self.monitor.start_write_attribution()
+            self.writes_panel.setText('Watching for writes...')
+            self.writes_panel.show()
+            self.writes_timer.start(1000)  # The panel is read from running totals, so once a second is plenty
+        else:
+            self.writes_timer.stop()
+            self.writes_panel.hide()
+            self.monitor.stop_write_attribution()
+
+    def refresh_writes_panel(self):
+        attributor = self.monitor.write_attributor
+        if attributor is None:
+            return
+        lines = [f'<b>Written in the last {attributor.window:.0f}s</b>', '']
+        top = attributor.top(10)
+        lines += [f'{format_bytes(count)}&nbsp;&nbsp;{html.escape(path)}' for path, count in top] or ['Nothing yet']
+        stats = attributor.stats()
+        lines += ['', f"<small>{stats['watched_dirs']:,} folders watched  •  {stats['events_per_s']:.0f} events/s"]
+        if stats['unwatched_trees']:
+            lines[-1] += f"  •  {stats['unwatched_trees']} folders over the watch limit"
+        if stats['dropped']:
+            lines[-1] += f"  •  {stats['dropped']:,} events dropped"
+        lines[-1] += '</small>'
+        self.writes_panel.setText('<br>'.join(lines))
+
+    def on_hud_toggled(self, checked):
+        if checked:
+            self.refresh_hud()
+            self.hud.show()
+            self.hud_timer.start(HUD_REFRESH_MS)  # On its own timer, since ticks stop while usage is flat
+        else:
+            self.hud_timer.stop()
+            self.hud.hide()
+
+    def refresh_hud(self):
+        monitor = self.monitor
+        lines = [f'frame timer {monitor.frame_interval}ms']
+        for name in monitor.scheduler.sources:
+            stats = monitor.scheduler.stats(name)
+            line = f"{name} every {stats['interval_ms']:.0f}ms"
+            if stats['age_s'] is not None:
+                line += f", {stats['age_s']:.1f}s old"
+            if stats['stale']:
+                line += ' (stale)'
+            if stats['timeouts'] or stats['errors']:
+                line += f", {stats['timeouts']} timeouts, {stats['errors']} errors"
+            lines.append(line)
+        lines.append(self.profile.table())
+        self.hud.setPlainText('\n'.join(lines))
+
+    def save_tick_profile(self):
+        path, _ = QFileDialog.getSaveFileName(self.main_widget, 'Save Performance Profile', 'tick-profile.json',
+                                              'JSON (*.json)')
+        if path:
+            try:
+                self.monitor.dump_tick_profile(path)
+            except OSError as e:
+                QMessageBox.warning(self.main_widget, 'Save Performance Profile', f'Could not save {path}: {e}')
+
+    def session_file_filters(self):
+        filters = ['NumPy (*.npy)', 'CSV (*.csv)']
+        if have_pyarrow():
+            filters = ['Arrow (*.arrow)', 'Parquet (*.parquet)'] + filters
+        return ';;'.join(filters)
+
+    def export_session(self):
+        """Save the shown drive's samples to a file, for analysis elsewhere or to open later"""
+        default = 'session.arrow' if have_pyarrow() else 'session.npy'
+        path, _ = QFileDialog.getSaveFileName(self.main_widget, 'Export Session', default, self.session_file_filters())
+        if path:
+            try:
+                self.monitor.export_session(path)
+            except (OSError, ValueError) as e:
+                QMessageBox.warning(self.main_widget, 'Export Session', f'Could not export to {path}: {e}')
+
+    def open_session(self):
+        """Load an exported session and show it, as an extra entry in the drive list"""
+        path, _ = QFileDialog.getOpenFileName(self.main_widget, 'Open Session', '', self.session_file_filters())
+        if not path:
+            return
+        try:
+            key = self.monitor.import_session(path)
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self.main_widget, 'Open Session', f'Could not open {path}: {e}')
+            return
+        if all(existing != key for existing, _ in self.imported_drives):
+            self.imported_drives.append((key, os.path.basename(path)))
+            self.populate_drive_combo()
+        self.drive_combo.setCurrentIndex(self.drive_combo.findData(key))  # Switches to it
+
+    def show_growers(self):
+        """List the folders that grew most between the last two scanned reference points"""
+        scanned = [(i, job.snapshot) for i, job in enumerate(self.reference_scans)
+                   if job is not None and job.done and job.snapshot is not None]
+        if len(scanned) < 2:
+            QMessageBox.information(self.main_widget, 'Top growers',
+                                    'Tick "Scan folders at references" and add two reference points first.')
+            return
+        (i, before), (j, after) = sorted(scanned[-2:], key=lambda s: s[1].time)
+        lines = [f'{format_bytes(delta)}  {path}' for path, delta in top_growers(before, after)]
+        minutes = (after.time - before.time) / 60
+        QMessageBox.information(
+            self.main_widget, 'Top growers',
+            f'Folders on {after.root} that grew between T{i + 1} and T{j + 1} ({minutes:.1f} minutes apart):\n\n'
+            + ('\n'.join(lines) or 'Nothing grew'))
+
+    def view_state(self):
+        """What a replacement PlotManager needs to pick up where this one is; see restore_view_state()"""
+        return {
+            'drives': (self.local_drives, self.remote_drives, self.imported_drives),
+            'zoom': self.zoom_slider.value(),
+            'x_range': self.plot.getViewBox().viewRange()[0],
+            'time_slider': self.time_slider.value(),
+            'overlay': self.overlay_checkbox.isChecked(),
+            'scan': self.scan_checkbox.isChecked(),
+            'live_writes': self.writes_checkbox.isChecked(),
+            'hud': self.hud_action.isChecked(),
+            'references': list(zip(self.reference_data, self.reference_scans)),
+            'geometry': self.main_widget.saveGeometry(),
+        }
+
+    def restore_view_state(self, state):
+        """Show the monitor's existing data the way another PlotManager did, e.g. after a live reload"""
+        self.main_widget.restoreGeometry(state['geometry'])
+        self.local_drives, self.remote_drives, self.imported_drives = state['drives']
+        self.populate_drive_combo()
+        self.update_title()
+        self.zoom_slider.setValue(state['zoom'])
+        self.overlay_checkbox.setChecked(state['overlay'])
+        self.scan_checkbox.setChecked(state['scan'])
+        self.hud_action.setChecked(state['hud'])
+        if state['live_writes']:
+            # The monitor's write attribution is still running; only the panel needs showing
+            self.writes_checkbox.blockSignals(True)
+            self.writes_checkbox.setChecked(True)
+            self.writes_checkbox.blockSignals(False)
+            self.writes_panel.show()
+            self.refresh_writes_panel()
+            self.writes_timer.start(1000)
+        if self.monitor.paused:
+            self.pause_button.setChecked(True)
+            self.pause_button.setText('Resume')
+        for (x_val, sys_val, docker_val), job in state['references']:
+            self.add_reference(x_val, sys_val, docker_val, job)
+        self.time_slider.blockSignals(True)
+        self.time_slider.setValue(state['time_slider'])
+        self.time_slider.blockSignals(False)
+        self.plot.getViewBox().setXRange(*state['x_range'], padding=0)
+        self.render_curves()
+        if self.monitor.latest_sample is not None:
+            self.update()
+
+    def close(self):
+        """Stop this window's timers and close it, e.g. once a rebuilt one has replaced it"""
+        for timer in (self.hud_timer, self.writes_timer, self.scan_timer):
+            timer.stop()
+        self.main_widget.close()
+        self.main_widget.deleteLater()
 
     def toggle_pause(self):
         if self.pause_button.isChecked():
@@ -415,54 +971,39 @@ class PlotManager:
         except Exception as e:
             print(f"Error refreshing plot: {e}")
 
+    def follow_range(self, latest_time):
+        """X range of the current zoom ending a little past latest_time, leaving room for the projection"""
+        end = max(self.default_window, latest_time + self.default_window * PROJECTION_FRACTION)
+        return end - self.default_window, end
+
     def reset_view(self):
         """Reset view to show last 5 minutes"""
         if len(self.monitor.times) > 0:
-            latest_time = max(self.monitor.times)
-            self.plot.getViewBox().setXRange(
-                max(0, latest_time - self.default_window),
-                latest_time,
-                padding=0
-            )
+            latest_time = self.monitor.times[-1]
+            self.plot.getViewBox().setXRange(*self.follow_range(latest_time), padding=0)
 
     def on_zoom_changed(self, value):
         """Handle zoom slider change"""
-        self.default_window = value
+        self.default_window = ZOOM_WINDOWS[value]
+        self.zoom_label.setText(format_window(self.default_window))
         if len(self.monitor.times) > 0:
-            latest_time = max(self.monitor.times)
-            self.plot.getViewBox().setXRange(
-                max(0, latest_time - self.default_window),
-                latest_time,
-                padding=0
-            )
+            latest_time = self.monitor.times[-1]
+            self.plot.getViewBox().setXRange(*self.follow_range(latest_time), padding=0)
             
             # Update x-axis ticks immediately
-            if value <= 5:  # 5 minutes or less
-                major_x = 0.5  # 30 second intervals
-            elif value <= 15:
-                major_x = 1.0  # 1 minute intervals
-            elif value <= 30:
-                major_x = 2.0  # 2 minute intervals
-            else:
-                major_x = 5.0  # 5 minute intervals
-            
-            self.plot.getAxis('bottom').setTickSpacing(major_x, major_x/2)
+            self.stage('x_ticks', self.set_x_ticks, x_tick_spacing(self.default_window),
+                       x_axis_unit(self.default_window))
+            self.flush()
 
     def on_time_changed(self, value):
         """Handle time slider change"""
         if len(self.monitor.times) == 0:
             return
         
-        # Convert percentage to time
-        latest_time = max(self.monitor.times)
-        earliest_time = max(0, latest_time - self.default_window)
-        total_time = max(self.monitor.times)
-        
-        # Calculate target time based on slider percentage
-        target_time = (value / 100.0) * total_time
-        
-        # Ensure we stay within bounds
-        target_time = max(self.default_window, min(total_time, target_time))
+        # Slider steps span the end positions of the window, from the first full window to the latest time
+        latest_time = self.monitor.times[-1]
+        span = max(0, latest_time - self.default_window)
+        target_time = self.default_window + (value / TIME_SLIDER_STEPS) * span
         
         # Update view range while maintaining zoom level
         self.plot.getViewBox().setXRange(
@@ -0,0 +1,55 @@
+import math
+
+
+class AdaptiveInterval:
+    """Picks a source's next sampling interval from how fast its values change.
+
+    Each update() takes the latest value of every series the source produces
+    (e.g. one per mountpoint) and keeps an exponentially weighted mean and
+    variance of each series' rate of change. Activity is |mean| plus one
+    standard deviation, so both a steady climb and noisy churn count. The
+    interval that would see a change of `resolution` per sample is adopted at
+    once when it is shorter than the current one; otherwise the interval grows
+    by `backoff` per sample, so a flat source slows down exponentially until
+    `max_interval`. The most active series sets the pace.
+    """
+
+    def __init__(self, min_interval, max_interval, resolution, backoff=2.0, smoothing=0.3):
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval)
+        self.resolution = resolution
+        self.backoff = backoff
+        self.smoothing = smoothing
+        self.interval = self.min_interval
+        self._series = {}  # Key -> [last timestamp, last value, rate mean, rate variance]
+
+    def update(self, timestamp, values):
+        """Record `values` ({key: value}) sampled at `timestamp` seconds; return the next interval"""
+        activity = 0.0
+        alpha = self.smoothing
+        for key, value in values.items():
+            if value is None:
+                continue
+            state = self._series.get(key)
+            if state is None:
+                self._series[key] = [timestamp, value, 0.0, 0.0]
+                continue
+            dt = timestamp - state[0]
+            if dt <= 0:
+                continue
+            rate = (value - state[1]) / dt
+            deviation = rate - state[2]
+            state[2] += alpha * deviation
+            state[3] = (1 - alpha) * (state[3] + alpha * deviation * deviation)
+            state[0], state[1] = timestamp, value
+            activity = max(activity, abs(state[2]) + math.sqrt(state[3]))
+
+        target = self.resolution / activity if activity > 0 else self.max_interval
+        self.interval = min(self.interval * self.backoff, target, self.max_interval)
+        self.interval = max(self.interval, self.min_interval)
+        return self.interval
+
+    def reset(self):
+        """Forget all history and sample at the fastest rate again"""
+        self._series.clear()
+        self.interval = self.min_interval
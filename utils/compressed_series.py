@@ -0,0 +1,216 @@
+import bisect
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+from utils.ring_buffer import DEFAULT_COLUMNS
+
+DEFAULT_CHUNK_SIZE = 4096
+# Timestamps are kept to 10 ms (series store time in minutes, like the ring buffers).
+# Coarser than timer jitter, so evenly spaced samples encode to all-zero deltas of deltas.
+DEFAULT_TIME_RESOLUTION = 1e-2 / 60
+DECODE_CACHE_SIZE = 8  # Decoded chunks kept, so redrawing the same range does not decode again
+
+# A sealed, immutable run of samples; `payload` is the zlib-compressed encoding
+Chunk = namedtuple('Chunk', 'first_time last_time count payload')
+
+
+def _shuffle(array):
+    """Byte planes of an array (all first bytes, then all second bytes, ...), so zlib sees long zero runs"""
+    return array.view(np.uint8).reshape(-1, array.itemsize).T.tobytes()
+
+
+def _unshuffle(data, dtype, count):
+    itemsize = np.dtype(dtype).itemsize
+    return np.frombuffer(data, dtype=np.uint8).reshape(itemsize, count).T.copy().view(dtype).ravel()
+
+
+def encode_chunk(times, columns, resolution=DEFAULT_TIME_RESOLUTION, level=6):
+    """Compress one chunk of samples, Gorilla style.
+
+    Timestamps become integer ticks of `resolution` since the first sample and
+    are stored as deltas of deltas, which are zero for evenly spaced samples.
+    Each value is stored as the XOR of its bit pattern with the previous one,
+    which is zero when the value did not change and has only low mantissa bits
+    set when it changed a little. Instead of Gorilla's variable-length bit
+    packing, the streams are byte-shuffled and zlib does the entropy coding,
+    which keeps both directions vectorized.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    ticks = np.rint((times - times[0]) / resolution).astype(np.int64)
+    deltas = np.diff(ticks, prepend=ticks[:1])
+    parts = [_shuffle(np.diff(deltas, prepend=deltas[:1]))]
+    for values in columns:
+        bits = np.ascontiguousarray(values).view(f'u{values.dtype.itemsize}')
+        xor = bits.copy()
+        xor[1:] ^= bits[:-1]
+        parts.append(_shuffle(xor))
+    return Chunk(float(times[0]), float(times[-1]), len(times), zlib.compress(b''.join(parts), level))
+
+
+def decode_chunk(chunk, dtypes, resolution=DEFAULT_TIME_RESOLUTION):
+    """Inverse of encode_chunk: (times, [column arrays]) with prefix sums and XOR scans"""
+    data = zlib.decompress(chunk.payload)
+    n = chunk.count
+    ticks = np.cumsum(np.cumsum(_unshuffle(data[:8 * n], np.int64, n)))
+    times = chunk.first_time + ticks * resolution
+    columns = []
+    offset = 8 * n
+    for dtype in dtypes:
+        itemsize = np.dtype(dtype).itemsize
+        xor = _unshuffle(data[offset:offset + itemsize * n], f'u{itemsize}', n)
+        columns.append(np.bitwise_xor.accumulate(xor).view(dtype))
+        offset += itemsize * n
+    return times, columns
+
+
+class CompressedSeries:
+    """Append-only columnar time series held as compressed chunks.
+
+    Samples are appended to an uncompressed head chunk; once it holds
+    `chunk_size` samples it is sealed into an immutable Chunk (see
+    encode_chunk), typically a few bits per sample for slowly changing disk
+    usage. Reads decode only the chunks overlapping the requested range.
+    `level` is the zlib level: 1 encodes about three times faster, for bulk
+    loads, at roughly 40% more bytes.
+    """
+
+    def __init__(self, columns=DEFAULT_COLUMNS, chunk_size=DEFAULT_CHUNK_SIZE, resolution=DEFAULT_TIME_RESOLUTION,
+                 level=6):
+        self.column_names = tuple(name for name, _ in columns)
+        self.dtypes = tuple(np.dtype(dtype) for _, dtype in columns)
+        self.chunk_size = chunk_size
+        self.resolution = resolution
+        self.level = level
+        self.chunks = []
+        self._cache = {}  # Chunk index -> decoded (times, columns)
+        self._first_times = []  # first_time of every sealed chunk, for bisect
+        self._head_times = np.empty(chunk_size, dtype=np.float64)
+        self._head_columns = [np.empty(chunk_size, dtype=dtype) for dtype in self.dtypes]
+        self._head_count = 0
+        self._sealed_count = 0
+
+    def __len__(self):
+        return self._sealed_count + self._head_count
+
+    @property
+    def nbytes(self):
+        """Memory held by samples: compressed chunks plus the preallocated head"""
+        return sum(len(c.payload) for c in self.chunks) + self._head_times.nbytes + sum(
+            c.nbytes for c in self._head_columns)
+
+    @property
+    def first_time(self):
+        """Time of the oldest sample held; None if empty"""
+        if self.chunks:
+            return self.chunks[0].first_time
+        return self._head_times[0] if self._head_count else None
+
+    def append(self, t, *values):
+        i = self._head_count
+        self._head_times[i] = t
+        for column, value in zip(self._head_columns, values):
+            column[i] = value
+        self._head_count += 1
+        if self._head_count == self.chunk_size:
+            self._seal(self._head_times, self._head_columns)
+            self._head_count = 0
+
+    def extend(self, times, *columns):
+        """Append many samples; full chunks are encoded straight from the input arrays"""
+        times = np.asarray(times, dtype=np.float64)
+        columns = [np.asarray(c, dtype=dtype) for c, dtype in zip(columns, self.dtypes)]
+        start = 0
+        n = len(times)
+        while start < n:
+            if self._head_count == 0 and n - start >= self.chunk_size:
+                end = start + self.chunk_size
+                self._seal(times[start:end], [c[start:end] for c in columns])
+            else:
+                end = min(n, start + self.chunk_size - self._head_count)
+                h0, h1 = self._head_count, self._head_count + end - start
+                self._head_times[h0:h1] = times[start:end]
+                for head, column in zip(self._head_columns, columns):
+                    head[h0:h1] = column[start:end]
+                self._head_count = h1
+                if h1 == self.chunk_size:
+                    self._seal(self._head_times, self._head_columns)
+                    self._head_count = 0
+            start = end
+
+    def _seal(self, times, columns):
+        chunk = encode_chunk(times, columns, self.resolution, self.level)
+        self.chunks.append(chunk)
+        self._first_times.append(chunk.first_time)
+        self._sealed_count += chunk.count
+
+    def _decode(self, index):
+        """Samples of sealed chunk `index`, or of the head when index == len(chunks)"""
+        if index == len(self.chunks):
+            n = self._head_count
+            return self._head_times[:n], [c[:n] for c in self._head_columns]
+        decoded = self._cache.get(index)
+        if decoded is None:
+            decoded = decode_chunk(self.chunks[index], self.dtypes, self.resolution)
+            if len(self._cache) >= DECODE_CACHE_SIZE:
+                del self._cache[next(iter(self._cache))]
+            self._cache[index] = decoded
+        return decoded
+
+    def range(self, t0, t1):
+        """(times, {column: values}) for [t0, t1], plus one sample past each edge"""
+        first = max(0, bisect.bisect_right(self._first_times, t0) - 1)
+        # Chunk `last` is the first to start after t1 (or the head); it supplies the sample past t1
+        last = min(bisect.bisect_right(self._first_times, t1), len(self.chunks))
+        parts = [self._decode(i) for i in range(first, last + 1)]
+        times = np.concatenate([p[0] for p in parts])
+        i0 = max(0, int(np.searchsorted(times, t0, side='left')) - 1)
+        i1 = min(len(times), int(np.searchsorted(times, t1, side='right')) + 1)
+        values = {name: np.concatenate([p[1][k] for p in parts])[i0:i1]
+                  for k, name in enumerate(self.column_names)}
+        return times[i0:i1], values
+
+    def iter_chunks(self):
+        """(times, [column arrays]) of each chunk, oldest first, decoded one at a time and not cached"""
+        for chunk in self.chunks:
+            yield decode_chunk(chunk, self.dtypes, self.resolution)
+        n = self._head_count
+        if n:
+            yield self._head_times[:n], [c[:n] for c in self._head_columns]
+
+    def nearest(self, t):
+        """(time, {column: value}) of the sample closest to t; None if empty"""
+        if len(self) == 0:
+            return None
+        times, values = self.range(t, t)
+        i = int(np.searchsorted(times, t))
+        if i == len(times) or (i > 0 and t - times[i - 1] <= times[i] - t):
+            i -= 1
+        return times[i], {name: column[i] for name, column in values.items()}
+
+    def shift_times(self, delta):
+        """Add `delta` to every timestamp; only chunk headers change"""
+        self.chunks = [c._replace(first_time=c.first_time + delta, last_time=c.last_time + delta)
+                       for c in self.chunks]
+        self._first_times = [c.first_time for c in self.chunks]
+        self._head_times[:self._head_count] += delta
+        self._cache.clear()
+
+    def trim_before(self, t):
+        """Drop the sealed chunks that end before t; the head is never dropped"""
+        drop = 0
+        while drop < len(self.chunks) and self.chunks[drop].last_time < t:
+            drop += 1
+        if drop:
+            self._sealed_count -= sum(c.count for c in self.chunks[:drop])
+            del self.chunks[:drop]
+            del self._first_times[:drop]
+            self._cache.clear()  # Keyed by chunk index
+
+    def clear(self):
+        self.chunks = []
+        self._cache.clear()
+        self._first_times = []
+        self._head_count = 0
+        self._sealed_count = 0
@@ -0,0 +1,141 @@
+import numpy as np
+
+from utils.ring_buffer import RingBuffer
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max summary of every value column of a RingBuffer.
+
+    Level k holds one bucket per `factor ** (k + 1)` consecutive samples, aligned
+    to absolute sample indices, with the time of the bucket's first sample and
+    the min and max of each column. Buckets are updated as samples arrive, so
+    a redraw only touches about two points per horizontal pixel and spikes
+    shorter than a pixel are never averaged away.
+    """
+
+    def __init__(self, source, factor=4):
+        self.source = source
+        self.sizes = []
+        self.levels = []
+        self._offsets = []  # Absolute bucket number of each level's first stored bucket
+        columns = []
+        for name in source.column_names:
+            dtype = source.column(name).dtype
+            columns += [(f'{name}_min', dtype), (f'{name}_max', dtype)]
+
+        size = factor
+        while size <= source.capacity:
+            self.sizes.append(size)
+            self.levels.append(RingBuffer(source.capacity // size + 2, columns))
+            self._offsets.append(0)
+            size *= factor
+
+    def append(self, t, *values):
+        """Append a sample to the source buffer and fold it into every level"""
+        self.source.append(t, *values)
+        index = self.source.total - 1
+        names = self.source.column_names
+        for k, (size, level) in enumerate(zip(self.sizes, self.levels)):
+            if index % size == 0 or len(level) == 0:
+                if len(level) == 0:
+                    self._offsets[k] = index // size - level.total
+                bucket = []
+                for value in values:
+                    bucket += [value, value]
+                level.append(t, *bucket)
+            else:
+                for name, value in zip(names, values):
+                    if value < level.last(f'{name}_min'):
+                        level.set_last(f'{name}_min', value)
+                    if value > level.last(f'{name}_max'):
+                        level.set_last(f'{name}_max', value)
+
+    def clear(self):
+        self.source.clear()
+        for k, level in enumerate(self.levels):
+            level.clear()
+            self._offsets[k] = 0
+
+    def shift_times(self, delta):
+        self.source.shift_times(delta)
+        for level in self.levels:
+            level.shift_times(delta)
+
+    def rebuild(self):
+        """Recompute every level from the source buffer in vectorized passes"""
+        first = self.source.first_index
+        times = self.source.times
+        n = len(times)
+        for k, (size, level) in enumerate(zip(self.sizes, self.levels)):
+            level.clear()
+            if n == 0:
+                self._offsets[k] = 0
+                continue
+            first_bucket = first // size
+            starts = np.arange(first_bucket * size, first + n, size) - first
+            starts[0] = 0
+            bucket = []
+            for name in self.source.column_names:
+                values = self.source.column(name)
+                bucket += [np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts)]
+            level.extend(times[starts], *bucket)
+            self._offsets[k] = first_bucket + len(starts) - level.total
+
+    def visible(self, t0, t1, width):
+        """Points to draw for the time range [t0, t1] on a plot `width` pixels wide.
+
+        Returns (x, {column: y}). Small ranges are returned as zero-copy views of
+        the raw samples; larger ones as min/max pairs from the finest level that
+        gives at most one bucket per pixel.
+        """
+        times = self.source.times
+        # Include one sample past each edge so lines reach the plot border
+        i0 = max(0, int(np.searchsorted(times, t0, side='left')) - 1)
+        i1 = min(len(times), int(np.searchsorted(times, t1, side='right')) + 1)
+        names = self.source.column_names
+        width = max(1, int(width))
+
+        count = i1 - i0
+        if count <= 2 * width:
+            return times[i0:i1], {name: self.source.column(name)[i0:i1] for name in names}
+
+        k = 0
+        while k + 1 < len(self.sizes) and self.sizes[k] * width < count:
+            k += 1
+        size, level = self.sizes[k], self.levels[k]
+
+        a0 = self.source.first_index + i0
+        a1 = self.source.first_index + i1
+        base = self._offsets[k] + level.first_index
+        j0 = max(0, a0 // size - base)
+        j1 = min(len(level), (a1 - 1) // size - base + 1)
+
+        x = np.repeat(level.times[j0:j1], 2)
+        ys = {}
+        for name in names:
+            y = np.empty(2 * (j1 - j0), dtype=level.column(f'{name}_min').dtype)
+            y[0::2] = level.column(f'{name}_min')[j0:j1]
+            y[1::2] = level.column(f'{name}_max')[j0:j1]
+            ys[name] = y
+        return x, ys
+
+
+def decimate(times, columns, width):
+    """Min/max pairs of decoded samples, about one pair per pixel, like MinMaxPyramid.visible()
+
+    For ranges outside the pyramid's ring buffer; `columns` maps names to
+    arrays aligned with `times`.
+    """
+    width = max(1, int(width))
+    n = len(times)
+    if n <= 2 * width:
+        return times, columns
+    size = -(-n // width)
+    starts = np.arange(0, n, size)
+    ys = {}
+    for name, values in columns.items():
+        y = np.empty(2 * len(starts), dtype=values.dtype)
+        y[0::2] = np.minimum.reduceat(values, starts)
+        y[1::2] = np.maximum.reduceat(values, starts)
+        ys[name] = y
+    return np.repeat(times[starts], 2), ys
@@ -0,0 +1,169 @@
+import os
+import stat
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+DEFAULT_WORKERS = 8
+DEFAULT_DEPTH = 4  # Levels below the root whose totals a snapshot keeps
+QUEUED_PER_WORKER = 4  # Directories handed to the pool ahead of the workers
+CONCENTRATION = 0.9  # A directory is reported in place of its parent once it holds this share of the growth
+
+# Totals of one scan: `sizes` maps every directory down to the snapshot depth to
+# the bytes allocated beneath it; deeper directories count towards their ancestor
+Snapshot = namedtuple('Snapshot', 'root time sizes files seconds')
+# What a directory held when last listed, reused while its mtime stays the same.
+# `own_bytes` includes the directory itself; `links` are the (inode, bytes) of
+# files with several hard links, which a scan counts once.
+Listing = namedtuple('Listing', 'mtime own_bytes files subdirs links')
+
+
+def allocated_bytes(st):
+    """Space a file takes on disk, like du; falls back to its length where st_blocks is missing"""
+    blocks = getattr(st, 'st_blocks', None)
+    return blocks * 512 if blocks is not None else st.st_size
+
+
+class DirectoryScanner:
+    """Measures the directory tree of one mount with a pool of os.scandir workers.
+
+    Stays on the root's device and counts each hard-linked inode once. Every
+    directory's listing (the bytes of its files, and its subdirectories) is
+    cached against its mtime, so a repeat scan only lists and stats the files
+    of directories whose entries changed; unchanged ones cost one stat. Like
+    any mtime cache this misses files that grew in place (a log being
+    appended to) until something is added to or removed from their directory;
+    clear_cache() forces a full rescan. Memory grows with the number of
+    directories, never with the number of files.
+    """
+
+    def __init__(self, root, workers=DEFAULT_WORKERS, depth=DEFAULT_DEPTH):
+        self.root = root
+        self.workers = workers
+        self.depth = depth
+        self.cache = {}  # Path -> Listing
+        self._lock = threading.Lock()  # One scan at a time per scanner
+
+    def clear_cache(self):
+        self.cache = {}
+
+    def _list(self, path, device):
+        """Listing of one directory, or None when it is on another device or unreadable"""
+        try:
+            st = os.stat(path, follow_symlinks=False)
+            if st.st_dev != device:
+                return None  # A mountpoint below the root
+            cached = self.cache.get(path)
+            if cached is not None and cached.mtime == st.st_mtime_ns:
+                return cached
+            own_bytes = allocated_bytes(st)  # The directory's own blocks, as du counts them
+            files = 0
+            subdirs = []
+            links = []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.name)
+                            continue
+                        entry_st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    files += 1
+                    size = allocated_bytes(entry_st)
+                    if entry_st.st_nlink > 1 and not stat.S_ISDIR(entry_st.st_mode):
+                        links.append((entry_st.st_ino, size))
+                    else:
+                        own_bytes += size
+        except OSError:
+            return None
+        listing = Listing(st.st_mtime_ns, own_bytes, files, tuple(subdirs), tuple(links))
+        self.cache[path] = listing
+        return listing
+
+    def scan(self):
+        """Walk the tree once and return a Snapshot"""
+        with self._lock:
+            started = time.monotonic()
+            device = os.stat(self.root).st_dev
+            sizes = {}
+            depths = {}
+            seen_links = set()
+            visited = set()
+            files = 0
+            # (path, depth, path of the snapshot entry its bytes count towards)
+            pending = deque([(self.root, 0, self.root)])
+            in_flight = {}
+            with ThreadPoolExecutor(self.workers) as pool:
+                while pending or in_flight:
+                    while pending and len(in_flight) < self.workers * QUEUED_PER_WORKER:
+                        path, depth, key = pending.popleft()
+                        in_flight[pool.submit(self._list, path, device)] = (path, depth, key)
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path, depth, key = in_flight.pop(future)
+                        listing = future.result()
+                        if listing is None:
+                            continue
+                        visited.add(path)
+                        files += listing.files
+                        own_bytes = listing.own_bytes
+                        for inode, size in listing.links:
+                            if inode not in seen_links:
+                                seen_links.add(inode)
+                                own_bytes += size
+                        sizes[key] = sizes.get(key, 0) + own_bytes
+                        depths[key] = min(depth, self.depth)
+                        for name in listing.subdirs:
+                            child = os.path.join(path, name)
+                            pending.append((child, depth + 1, child if depth < self.depth else key))
+
+            # Drop listings of directories that are gone, then roll totals up to the root
+            self.cache = {path: self.cache[path] for path in visited if path in self.cache}
+            for path in sorted(sizes, key=depths.get, reverse=True):
+                if path != self.root:
+                    parent = os.path.dirname(path)
+                    if parent in sizes:
+                        sizes[parent] += sizes[path]
+            return Snapshot(self.root, time.time(), sizes, files, time.monotonic() - started)
+
+
+class ScanJob:
+    """Runs scanner.scan() on a background thread; poll `done`, then read `snapshot` (None if it failed)"""
+
+    def __init__(self, scanner):
+        self.snapshot = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run, args=(scanner,), daemon=True)
+        self._thread.start()
+
+    def _run(self, scanner):
+        try:
+            self.snapshot = scanner.scan()
+        except OSError as e:
+            self.error = e
+            print(f"Error scanning {scanner.root}: {e}")
+
+    @property
+    def done(self):
+        return not self._thread.is_alive()
+
+
+def top_growers(before, after, n=10):
+    """The n directories that grew most from snapshot `before` to `after`, as (path, bytes) pairs.
+
+    A parent is left out when one child accounts for CONCENTRATION of its
+    growth, so the list points at where the bytes landed rather than at
+    every ancestor of it.
+    """
+    deltas = {path: after.sizes.get(path, 0) - before.sizes.get(path, 0)
+              for path in after.sizes.keys() | before.sizes.keys()}
+    largest_child = {}
+    for path, delta in deltas.items():
+        if path != after.root:
+            parent = os.path.dirname(path)
+            largest_child[parent] = max(largest_child.get(parent, 0), delta)
+    growers = [(path, delta) for path, delta in deltas.items()
+               if delta > 0 and largest_child.get(path, 0) < CONCENTRATION * delta]
+    return sorted(growers, key=lambda g: g[1], reverse=True)[:n]
@@ -1,23 +1,188 @@
+import os
 import psutil
+import re
+import select
 import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+BYTES_TO_GB = 1000 * 1000 * 1000
+MOUNTINFO_PATH = '/proc/self/mountinfo'
+LABELS_DIR = '/dev/disk/by-label'
+ESCAPE_RE = re.compile(r'\\(?:([0-7]{3})|x([0-9a-fA-F]{2}))')
+# Kernel, virtual and container-internal filesystems that never hold user data
+PSEUDO_FILESYSTEMS = frozenset((
+    'autofs', 'binfmt_misc', 'bpf', 'cgroup', 'cgroup2', 'configfs', 'debugfs', 'devpts', 'devtmpfs',
+    'efivarfs', 'fusectl', 'hugetlbfs', 'mqueue', 'nsfs', 'overlay', 'proc', 'pstore', 'ramfs',
+    'rpc_pipefs', 'securityfs', 'selinuxfs', 'squashfs', 'sysfs', 'tmpfs', 'tracefs',
+    'fuse.gvfsd-fuse', 'fuse.portal', 'fuse.snapfuse',
+))
+
+def read_disk_usage(path):
+    """(total_gb, used_gb, available_gb, percent) of a mountpoint; raises on failure"""
+    root_usage = psutil.disk_usage(path)
+    
+    total_gb = root_usage.total / BYTES_TO_GB
+    available_gb = root_usage.free / BYTES_TO_GB
+    used_gb = total_gb - available_gb
+    percent = (used_gb / total_gb) * 100
+    
+    return total_gb, used_gb, available_gb, percent
 
 def get_disk_usage(path='/'):
     try:
-        root_usage = psutil.disk_usage(path)
-        BYTES_TO_GB = 1000 * 1000 * 1000
-        
-        total_gb = root_usage.total / BYTES_TO_GB
-        available_gb = root_usage.free / BYTES_TO_GB
-        used_gb = total_gb - available_gb
-        percent = (used_gb / total_gb) * 100
-        
-        return total_gb, used_gb, available_gb, percent
+        return read_disk_usage(path)
     except Exception as e:
         print(f"Error reading disk usage for {path}: {e}")
         return 0, 0, 0, 0
 
+class BatchDiskSampler:
+    """Reads the usage of many mountpoints per tick on a small thread pool.
+
+    A mount that has not answered within `timeout` seconds is left out of that
+    tick and is not queried again until its stuck call returns, so a hung
+    network mount holds one worker instead of stalling every tick.
+    """
+
+    def __init__(self, timeout=0.25, max_workers=8):
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = {}  # Mountpoint -> future that missed its deadline
+        self._failing = set()  # Mountpoints whose last error was already reported
+
+    def sample(self, paths):
+        """{mountpoint: (total_gb, used_gb, available_gb, percent)} for the mounts that answered"""
+        futures = {}
+        for path in paths:
+            stuck = self._pending.get(path)
+            if stuck is not None and not stuck.done():
+                continue
+            futures[path] = self._executor.submit(read_disk_usage, path)
+        done, _ = wait(futures.values(), timeout=self.timeout)
+
+        results = {}
+        for path, future in futures.items():
+            if future not in done:
+                self._pending[path] = future
+                continue
+            self._pending.pop(path, None)
+            try:
+                results[path] = future.result()
+                self._failing.discard(path)
+            except Exception as e:
+                if path not in self._failing:
+                    print(f"Error reading disk usage for {path}: {e}")
+                    self._failing.add(path)
+        return results
+
+def _unescape(field):
+    """Undo the escapes used for unsafe characters: \\040 in mountinfo, \\x20 in udev link names"""
+    if '\\' not in field:
+        return field
+    return ESCAPE_RE.sub(lambda m: chr(int(m.group(1), 8) if m.group(1) else int(m.group(2), 16)), field)
+
+def read_mountinfo(path=MOUNTINFO_PATH):
+    """[(mountpoint, source, fstype)] of real filesystems, one entry per filesystem.
+
+    Bind mounts and btrfs subvolumes report the same usage as the filesystem
+    they belong to, so only the first mount of each device number is kept.
+    """
+    with open(path, 'rb') as f:
+        data = f.read().decode('utf-8', 'replace')
+    mounts = []
+    seen = set()
+    for line in data.splitlines():
+        # id parent major:minor root mountpoint options [optional fields...] - fstype source super_options
+        head, _, tail = line.partition(' - ')
+        fstype, _, rest = tail.partition(' ')
+        if fstype in PSEUDO_FILESYSTEMS:
+            continue  # Checked first: most lines on a Docker host are overlay/nsfs mounts
+        fields = head.split(' ', 5)
+        if len(fields) < 5 or not rest or fields[2] in seen:
+            continue
+        seen.add(fields[2])
+        mounts.append((_unescape(fields[4]), _unescape(rest.partition(' ')[0]), fstype))
+    return mounts
+
+def read_labels(directory=LABELS_DIR):
+    """{device path: volume label} from udev's by-label symlinks"""
+    labels = {}
+    try:
+        entries = os.listdir(directory)
+    except OSError:
+        return labels
+    for name in entries:
+        try:
+            target = os.readlink(os.path.join(directory, name))
+        except OSError:
+            continue
+        labels[os.path.normpath(os.path.join(directory, target))] = _unescape(name)
+    return labels
+
+def get_linux_drives():
+    """Mounted filesystems from /proc/self/mountinfo, without running any subprocess"""
+    labels = read_labels()
+    drives = []
+    for mountpoint, source, fstype in read_mountinfo():
+        device = source
+        if labels and source.startswith('/dev/'):
+            device = os.path.realpath(source)  # /dev/mapper/* and /dev/root are symlinks
+        label = labels.get(device)
+        if label:
+            drives.append((mountpoint, label))
+        else:
+            name = mountpoint.rstrip('/').split('/')[-1] or "Root"
+            drives.append((mountpoint, f"{name} ({source})"))
+    return drives
+
+class MountWatcher(threading.Thread):
+    """Sets `changed` whenever something is mounted or unmounted.
+
+    The kernel flags /proc/self/mountinfo with POLLPRI/POLLERR on every change
+    to the mount table, so this blocks in poll() instead of re-reading it.
+    """
+
+    def __init__(self, path=MOUNTINFO_PATH):
+        super().__init__(daemon=True)
+        self.path = path
+        self.changed = threading.Event()
+        self._stopped = threading.Event()
+
+    def run(self):
+        try:
+            with open(self.path, 'rb') as f:
+                f.read()
+                poller = select.poll()
+                poller.register(f.fileno(), select.POLLPRI | select.POLLERR)
+                while not self._stopped.is_set():
+                    if poller.poll(1000):
+                        f.seek(0)
+                        f.read()  # Re-arm the notification
+                        self.changed.set()
+        except (OSError, ValueError) as e:
+            print(f"Error watching {self.path}: {e}")
+
+    def consume(self):
+        """True once per batch of mount table changes"""
+        if self.changed.is_set():
+            self.changed.clear()
+            return True
+        return False
+
+    def stop(self):
+        self._stopped.set()
+
 def get_available_drives():
     """Get list of available disk partitions with friendly names"""
+    if sys.platform.startswith('linux'):
+        try:
+            drives = get_linux_drives()
+            if drives:
+                return drives
+        except OSError as e:
+            print(f"Error reading {MOUNTINFO_PATH}: {e}")
+        return [('/', 'Root (/)')]
     try:
         partitions = psutil.disk_partitions()
         drives = []
@@ -0,0 +1,309 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+DEFAULT_SOCKET_PATHS = (
+    '/var/run/docker.sock',
+    os.path.join(os.path.expanduser('~'), '.docker', 'run', 'docker.sock'),  # Docker Desktop for Mac
+)
+# Storage drivers whose container root shares the filesystem of DockerRootDir
+OVERLAY_DRIVERS = ('overlay2', 'overlay', 'fuse-overlayfs')
+_MISSING = object()  # Cache marker for "not looked up yet"; None means no such container
+
+
+class DockerAPIError(Exception):
+    pass
+
+
+def find_docker_socket():
+    """Path of the Docker Engine Unix socket, or None if there isn't one"""
+    host = os.environ.get('DOCKER_HOST')
+    if host:
+        return host[len('unix://'):] if host.startswith('unix://') else None
+    for path in DEFAULT_SOCKET_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+class _Connection:
+    """One HTTP/1.1 connection to the daemon's Unix socket"""
+
+    def __init__(self, socket_path, timeout):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path)
+        self.reader = self.sock.makefile('rb')
+
+    def send(self, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else b''
+        head = f'{method} {path} HTTP/1.1\r\nHost: docker\r\n'
+        if body is not None:
+            head += 'Content-Type: application/json\r\n'
+        head += f'Content-Length: {len(payload)}\r\n\r\n'
+        self.sock.sendall(head.encode() + payload)
+
+    def read_head(self):
+        status_line = self.reader.readline()
+        if not status_line:
+            raise DockerAPIError('connection closed by daemon')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return status, headers
+
+    def read_body(self, headers):
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            return b''.join(self.read_chunks())
+        if 'content-length' in headers:
+            return self.reader.read(int(headers['content-length']))
+        return self.reader.read()  # Body runs until the daemon closes the connection
+
+    def read_chunks(self):
+        while True:
+            size = int(self.reader.readline().split(b';')[0], 16)
+            if size == 0:
+                self.reader.readline()
+                return
+            yield self.reader.read(size)
+            self.reader.readline()
+
+    def shutdown(self):
+        """End a read blocked on another thread, which then closes the connection"""
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+class DockerClient:
+    """Minimal Docker Engine API client over the daemon's Unix socket.
+
+    Each calling thread gets its own keep-alive connection, so the client can
+    be shared by a pool of workers. Container lookups are cached and
+    invalidated by a background thread following the daemon's event stream;
+    while that stream is down, lookups are not cached.
+    """
+
+    def __init__(self, socket_path, timeout=5):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = set()
+        self._lock = threading.Lock()
+        self._containers = {}  # Name pattern -> container id (or None)
+        self._generation = 0  # Bumped by the events thread whenever it clears _containers
+        self._host_paths = {}  # Container id -> host path to statvfs, '' to exec df instead
+        self._docker_root = None
+        self._events_connected = False
+        self._events_thread = None
+        self._events_conn = None
+        self._closed = False
+
+    # HTTP
+
+    def request(self, method, path, body=None):
+        """Send a request on this thread's keep-alive connection; reconnect once if it went stale"""
+        for attempt in range(2):
+            try:
+                conn = getattr(self._local, 'conn', None)
+                if conn is None:
+                    conn = self._local.conn = _Connection(self.socket_path, self.timeout)
+                    with self._lock:
+                        self._connections.add(conn)
+                conn.send(method, path, body)
+                status, headers = conn.read_head()
+                data = conn.read_body(headers)
+                if headers.get('connection', '').lower() == 'close':
+                    self._close_local()
+                break
+            except (OSError, DockerAPIError):
+                self._close_local()
+                if attempt:
+                    raise
+        if status >= 400:
+            raise DockerAPIError(f'{method} {path} returned {status}: {data[:200]!r}')
+        return json.loads(data) if data else None
+
+    def _close_local(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            with self._lock:
+                self._connections.discard(conn)
+            conn.close()
+
+    def close(self):
+        """Close the keep-alive connections of every thread and stop following events"""
+        self._closed = True
+        with self._lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            conn.close()
+        events_conn = self._events_conn
+        if events_conn is not None:
+            events_conn.shutdown()
+
+    # Containers
+
+    def find_container(self, name_pattern):
+        """Id of the first running container whose name matches (case-insensitive)"""
+        cached = self._containers.get(name_pattern, _MISSING)  # One lookup: the events thread may clear it
+        if self._events_connected and cached is not _MISSING:
+            return cached
+        generation = self._generation
+        filters = quote(json.dumps({'name': [f'(?i){name_pattern}'], 'status': ['running']}))
+        containers = self.request('GET', f'/containers/json?filters={filters}')
+        container_id = containers[0]['Id'] if containers else None
+        with self._lock:
+            if self._generation == generation:  # Else an event arrived meanwhile and the answer may be stale
+                self._containers[name_pattern] = container_id
+        return container_id
+
+    def list_containers(self, name_patterns=None):
+        """{name: id} of running containers, optionally filtered by name patterns"""
+        filters = {'status': ['running']}
+        if name_patterns:
+            filters['name'] = [f'(?i){p}' for p in name_patterns]
+        containers = self.request('GET', f'/containers/json?filters={quote(json.dumps(filters))}')
+        return {c['Names'][0].lstrip('/'): c['Id'] for c in containers}
+
+    def container_size(self, container_id):
+        """Bytes in a container's writable layer; the daemon computes this on request"""
+        return self.request('GET', f'/containers/{container_id}/json?size=1').get('SizeRw') or 0
+
+    def container_fs_usage(self, container_id):
+        """(total_kb, used_kb) of a container's root filesystem, like `df -k /` inside it.
+
+        Read with statvfs on the host when the container's filesystem is
+        reachable from here (Linux, overlay storage); otherwise via the exec API.
+        """
+        path = self._host_paths.get(container_id)
+        if path is None:
+            path = self._find_host_path(container_id)
+            self._host_paths[container_id] = path
+        if path:
+            try:
+                st = os.statvfs(path)
+                return st.f_blocks * st.f_frsize / 1024, (st.f_blocks - st.f_bfree) * st.f_frsize / 1024
+            except OSError:
+                self._host_paths[container_id] = ''
+        return self._exec_df(container_id)
+
+    def _find_host_path(self, container_id):
+        if not sys.platform.startswith('linux'):
+            return ''  # Docker Desktop keeps container filesystems inside its VM
+        info = self.request('GET', f'/containers/{container_id}/json')
+        driver = info.get('GraphDriver') or {}
+        candidates = [(driver.get('Data') or {}).get('MergedDir')]
+        if driver.get('Name') in OVERLAY_DRIVERS:
+            if self._docker_root is None:
+                self._docker_root = self.request('GET', '/info').get('DockerRootDir', '')
+            candidates.append(self._docker_root)
+        for path in candidates:
+            if path:
+                try:
+                    os.statvfs(path)
+                    return path
+                except OSError:
+                    continue
+        return ''
+
+    def _exec_df(self, container_id):
+        created = self.request('POST', f'/containers/{container_id}/exec', {
+            'AttachStdout': True, 'AttachStderr': True, 'Cmd': ['df', '-k', '/'],
+        })
+        # The daemon hijacks the connection for the output, so use a separate one
+        conn = _Connection(self.socket_path, self.timeout)
+        try:
+            conn.send('POST', f"/exec/{created['Id']}/start", {'Detach': False, 'Tty': False})
+            status, headers = conn.read_head()
+            if status >= 400:
+                raise DockerAPIError(f'exec start returned {status}')
+            raw = conn.read_body(headers)
+        finally:
+            conn.close()
+
+        output = _demultiplex(raw).decode(errors='replace').strip().splitlines()
+        parts = output[-1].split() if output else []
+        if len(parts) < 4:
+            raise DockerAPIError(f'unexpected df output: {output!r}')
+        return float(parts[1]), float(parts[2])
+
+    # Events
+
+    def start_events(self):
+        """Follow container events in the background to keep the lookup cache valid"""
+        if self._events_thread is None:
+            self._events_thread = threading.Thread(target=self._follow_events, daemon=True)
+            self._events_thread.start()
+
+    def _follow_events(self):
+        filters = quote(json.dumps({'type': ['container'], 'event': ['start', 'die', 'destroy', 'rename']}))
+        backoff = 1
+        while not self._closed:
+            conn = None
+            try:
+                conn = self._events_conn = _Connection(self.socket_path, None)
+                if self._closed:
+                    break
+                conn.send('GET', f'/events?filters={filters}')
+                status, headers = conn.read_head()
+                if status >= 400:
+                    raise DockerAPIError(f'events returned {status}')
+                self._invalidate()
+                self._events_connected = True
+                backoff = 1
+                for chunk in conn.read_chunks():
+                    for line in chunk.splitlines():
+                        if line.strip():
+                            self._on_event(json.loads(line))
+            except (OSError, ValueError, DockerAPIError):
+                pass
+            finally:
+                self._events_connected = False
+                self._events_conn = None
+                if conn is not None:
+                    conn.close()
+            if self._closed:
+                break
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+
+    def _invalidate(self):
+        with self._lock:
+            self._generation += 1
+            self._containers.clear()
+
+    def _on_event(self, event):
+        self._invalidate()
+        if event.get('Action') == 'destroy':
+            self._host_paths.pop(event.get('id') or event.get('Actor', {}).get('ID'), None)
+
+
+def _demultiplex(raw):
+    """Join the stdout frames of a non-TTY attach/exec stream"""
+    if not raw or raw[0] not in (0, 1, 2) or raw[1:4] != b'\0\0\0':
+        return raw  # Not multiplexed
+    out = []
+    i = 0
+    while i + 8 <= len(raw):
+        stream = raw[i]
+        size = int.from_bytes(raw[i + 4:i + 8], 'big')
+        if stream == 1:
+            out.append(raw[i + 8:i + 8 + size])
+        i += 8 + size
+    return b''.join(out)
@@ -1,28 +1,66 @@
 import subprocess
 import asyncio
+import re
 from concurrent.futures import ThreadPoolExecutor
 
-_executor = ThreadPoolExecutor(max_workers=1)
+from utils.docker_api import DockerClient, DockerAPIError, find_docker_socket
+
+_fanout_executors = {}  # Concurrency limit -> executor for per-container queries
+
+CONTAINER_FILTER = 'prokit_database'
+KB_TO_GB = 1000 * 1000
+BYTES_TO_GB = 1000 * 1000 * 1000
+
+_client = None  # DockerClient, False when no socket is available
+
+def get_docker_client():
+    """Shared API client, or None if the daemon has no Unix socket (fall back to the CLI)"""
+    global _client
+    if _client is None:
+        socket_path = find_docker_socket()
+        if socket_path:
+            _client = DockerClient(socket_path)
+            _client.start_events()
+        else:
+            _client = False
+    return _client or None
+
+def close_docker_client():
+    """Close the shared client, stopping its events thread; the next call to get_docker_client() opens a new one"""
+    global _client
+    if _client:
+        _client.close()
+    _client = None
+
+def _before_reload():
+    # hot_reload.py: reloading resets _client, which would leak the old client's thread and sockets
+    close_docker_client()
 
 def get_docker_container_name():
     try:
-        cmd = "docker ps --format '{{.Names}}' | grep -i prokit_database"
+        cmd = f"docker ps --format '{{{{.Names}}}}' | grep -i {CONTAINER_FILTER}"
         container_name = subprocess.check_output(cmd, shell=True, text=True).strip()
         return container_name
     except Exception as e:
         print(f"Error finding Docker container: {e}")
         return None
 
-async def get_docker_usage_async():
+def get_docker_usage():
+    client = get_docker_client()
+    if client is None:
+        return get_docker_usage_cli()
     try:
-        # Run Docker operations in a separate thread
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(_executor, get_docker_usage)
-    except Exception as e:
-        print(f"Error in async Docker usage check: {e}")
+        container_id = client.find_container(CONTAINER_FILTER)
+        if not container_id:
+            return None, None
+        total_kb, used_kb = client.container_fs_usage(container_id)
+        return total_kb / KB_TO_GB, used_kb / KB_TO_GB
+    except (OSError, ValueError, DockerAPIError) as e:
+        print(f"Error reading Docker disk usage: {e}")
         return None, None
 
-def get_docker_usage():
+def get_docker_usage_cli():
+    """Fallback that shells out to the docker CLI"""
     try:
         container_name = get_docker_container_name()
         if not container_name:
@@ -36,7 +74,6 @@ def get_docker_usage():
             total_kb = float(parts[1])
             used_kb = float(parts[2])
             
-            KB_TO_GB = 1000 * 1000
             total_gb = total_kb / KB_TO_GB
             used_gb = used_kb / KB_TO_GB
             
@@ -45,4 +82,55 @@ def get_docker_usage():
         return None, None
     except Exception as e:
         print(f"Error reading Docker disk usage: {e}")
-        return None, None
\ No newline at end of file
+        return None, None
+
+def list_containers(patterns=None):
+    """{name: id} of running containers whose name matches any pattern (all if None)"""
+    client = get_docker_client()
+    if client is not None:
+        return client.list_containers(patterns)
+    names = subprocess.check_output(['docker', 'ps', '--format', '{{.Names}}'], text=True).split()
+    if patterns:
+        names = [n for n in names if any(re.search(p, n, re.IGNORECASE) for p in patterns)]
+    return {name: name for name in names}
+
+def get_container_size(container):
+    """Size of a container's writable layer in GB"""
+    client = get_docker_client()
+    if client is not None:
+        return client.container_size(container) / BYTES_TO_GB
+    size = subprocess.check_output(['docker', 'inspect', '--size', '--format', '{{.SizeRw}}', container], text=True)
+    return float(size.strip() or 0) / BYTES_TO_GB
+
+async def get_container_sizes_async(patterns=None, concurrency=8, timeout=5.0):
+    """Writable-layer size (GB) of every running container matching `patterns`.
+
+    Containers are queried in parallel, at most `concurrency` at a time, and a
+    query still running after `timeout` seconds is abandoned with a value of
+    None, so one slow container never holds up the others.
+    """
+    loop = asyncio.get_running_loop()
+    executor = _fanout_executors.get(concurrency)
+    if executor is None:
+        # Headroom for workers still blocked on queries that already timed out
+        executor = _fanout_executors[concurrency] = ThreadPoolExecutor(max_workers=2 * concurrency)
+
+    try:
+        containers = await asyncio.wait_for(loop.run_in_executor(executor, list_containers, patterns), timeout)
+    except Exception as e:
+        print(f"Error listing Docker containers: {e!r}")
+        return {}
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def query(name, container):
+        async with semaphore:
+            try:
+                return name, await asyncio.wait_for(loop.run_in_executor(executor, get_container_size, container), timeout)
+            except asyncio.TimeoutError:
+                return name, None
+            except Exception as e:
+                print(f"Error reading size of container {name}: {e}")
+                return name, None
+
+    return dict(await asyncio.gather(*(query(name, container) for name, container in containers.items())))
\ No newline at end of file
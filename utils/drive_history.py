@@ -0,0 +1,195 @@
+import threading
+
+import numpy as np
+
+from utils.compressed_series import CompressedSeries
+from utils.decimation import MinMaxPyramid, decimate
+from utils.forecast import GrowthEstimator
+from utils.history_store import HistoryStore, history_dir_for_drive
+from utils.ring_buffer import RingBuffer
+from utils.rollups import Rollups, RAW_RETENTION, RAW_VIEW_LIMIT
+
+
+class DriveHistory:
+    """Everything recorded for one mountpoint.
+
+    The newest samples live in a ring buffer with its min/max pyramid, which
+    every redraw reads. The last RAW_RETENTION minutes are also kept
+    compressed: this session's samples in `archive`, and the samples restored
+    from the store in `restored` once a background thread has encoded them.
+    Everything, however old, is folded into `rollups`. Views older than the ring
+    are decoded from the raw samples when narrow enough, and drawn from the
+    rollup tier matching the zoom otherwise.
+    """
+
+    def __init__(self, drive, capacity):
+        self.drive = drive
+        self.buffer = RingBuffer(capacity)
+        self.pyramid = MinMaxPyramid(self.buffer)
+        self.archive = CompressedSeries()
+        self.restored = None
+        self.rollups = Rollups()
+        # Fill rate of each column, for the time-to-full forecast
+        self.growth = {name: GrowthEstimator() for name in self.buffer.column_names}
+        self.store = None
+        self.latest = None  # Most recent (total_gb, used_gb, available_gb, percent)
+        self.latest_docker = None  # (total_gb, used_gb) of a remote host's Docker; local drives share the monitor's
+        self._restore_result = None  # Set by the restore thread, picked up by the GUI thread
+        self._restore_generation = 0  # Bumped by clear() so a late restore is discarded
+        self._pending_shift = 0.0  # Time shifts that happened while a restore was running
+        self._restore_thread = None
+
+    def open_store(self, history_dir):
+        """Open the drive's store and return all its records as memmaps, oldest first.
+
+        Pass them to fill() once the session start time is known.
+        """
+        try:
+            self.store = HistoryStore(history_dir_for_drive(history_dir, self.drive))
+            return self.store.load()
+        except OSError as e:
+            print(f"Error opening history store for {self.drive}: {e}")
+            self.store = None
+            return []
+
+    def fill(self, parts, start_time):
+        """Copy the newest stored records into the ring buffer, as minutes since start_time.
+
+        The stored samples are compressed into `restored` and rolled up on a
+        background thread, since a month of samples takes about a second.
+        """
+        for part in HistoryStore.tail(parts, self.buffer.capacity):
+            self.buffer.extend((part['time'] - start_time) / 60, part['usage'], part['docker_usage'])
+        self.pyramid.rebuild()
+        for name, estimator in self.growth.items():
+            estimator.extend(self.buffer.times, self.buffer.column(name))
+        if any(len(part) for part in parts):
+            self._pending_shift = 0.0
+            self._restore_thread = threading.Thread(target=self._restore,
+                                                    args=(parts, start_time, self._restore_generation), daemon=True)
+            self._restore_thread.start()
+
+    def _restore(self, parts, start_time, generation):
+        series = CompressedSeries(level=1)
+        rollups = Rollups()
+        cutoff = max(part['time'][-1] for part in parts if len(part)) - RAW_RETENTION * 60
+        for part in parts:
+            times = (part['time'] - start_time) / 60
+            rollups.extend(times, part['usage'], part['docker_usage'])
+            i = int(np.searchsorted(part['time'], cutoff))
+            series.extend(times[i:], part['usage'][i:], part['docker_usage'][i:])
+        self._restore_result = (generation, series, rollups)
+
+    def _collect_restore(self):
+        result = self._restore_result
+        if result is not None:
+            self._restore_result = None
+            generation, series, rollups = result
+            if generation == self._restore_generation:
+                if self._pending_shift:
+                    series.shift_times(self._pending_shift)
+                    rollups.shift_times(self._pending_shift)
+                # Fold this session's samples in after the stored ones
+                if len(self.archive) > 0:
+                    times, values = self.archive.range(self.archive.first_time, np.inf)
+                    rollups.extend(times, *(values[name] for name in self.archive.column_names))
+                self.restored = series
+                self.rollups = rollups
+
+    def append(self, timestamp, t, used_gb, docker_used_gb):
+        self.pyramid.append(t, used_gb, docker_used_gb)
+        self.archive.append(t, used_gb, docker_used_gb)
+        self.rollups.append(t, used_gb, docker_used_gb)
+        self.growth['usage'].update(t, used_gb)
+        self.growth['docker_usage'].update(t, docker_used_gb)
+        self.archive.trim_before(t - RAW_RETENTION)
+        if self.restored is not None:
+            self.restored.trim_before(t - RAW_RETENTION)
+        if self.store is not None:
+            try:
+                self.store.append(timestamp, used_gb, docker_used_gb)
+            except OSError as e:
+                print(f"Error writing history for {self.drive}: {e}")
+
+    def _raw_series(self):
+        return [series for series in (self.restored, self.archive) if series is not None and len(series) > 0]
+
+    def visible(self, t0, t1, width):
+        """Points to draw for [t0, t1] at about one min/max pair per pixel; see MinMaxPyramid.visible"""
+        self._collect_restore()
+        times = self.buffer.times
+        raw = self._raw_series()
+        older = len(self.archive) > len(self.buffer) or self.restored in raw
+        if not older or (len(times) > 0 and t0 >= times[0]):
+            return self.pyramid.visible(t0, t1, width)
+        if t1 - t0 > RAW_VIEW_LIMIT or t0 < min(series.first_time for series in raw):
+            return self.rollups.visible(t0, t1, width)
+
+        parts = [series.range(t0, t1) for series in raw]
+        times = np.concatenate([p[0] for p in parts])
+        columns = {name: np.concatenate([p[1][name] for p in parts]) for name in self.buffer.column_names}
+        return decimate(times, columns, width)
+
+    def raw_samples(self):
+        """(count, chunks) of every raw sample held, oldest first: each chunk is (times, {column: values}).
+
+        Waits for a running restore, so restored samples are included. Chunks
+        are decoded one at a time as they are consumed.
+        """
+        if self._restore_thread is not None:
+            self._restore_thread.join()
+        self._collect_restore()
+        raw = self._raw_series()
+
+        def chunks():
+            for series in raw:
+                for times, columns in series.iter_chunks():
+                    yield times, dict(zip(series.column_names, columns))
+        return sum(len(series) for series in raw), chunks()
+
+    def nearest(self, t):
+        """(time, {column: value}) of the sample closest to t, wherever it is held; None if empty"""
+        self._collect_restore()
+        buffer = self.buffer
+        if len(buffer) > 0 and t >= buffer.times[0]:
+            i = buffer.nearest_index(t)
+            return buffer.time_at(i), {name: buffer.value_at(name, i) for name in buffer.column_names}
+        raw = self._raw_series()
+        candidates = [series.nearest(t) for series in raw]
+        if not raw or t < min(series.first_time for series in raw):
+            candidates.append(self.rollups.nearest(t))  # Last value of the rollup bucket
+        candidates = [c for c in candidates if c is not None]
+        if len(buffer) > 0:
+            candidates.append((buffer.time_at(0), {name: buffer.value_at(name, 0) for name in buffer.column_names}))
+        return min(candidates, key=lambda c: abs(c[0] - t), default=None)
+
+    def shift_times(self, delta):
+        """Move every timestamp by `delta` minutes, when the shared time origin moves"""
+        self._collect_restore()
+        self.pyramid.shift_times(delta)
+        self.archive.shift_times(delta)
+        if self.restored is not None:
+            self.restored.shift_times(delta)
+        self.rollups.shift_times(delta)
+        for estimator in self.growth.values():
+            estimator.shift_times(delta)
+        self._pending_shift += delta
+
+    def clear(self):
+        """Drop the samples in memory and on disk"""
+        self.pyramid.clear()
+        self.archive.clear()
+        self.restored = None
+        self.rollups.clear()
+        for estimator in self.growth.values():
+            estimator.reset()
+        self._restore_generation += 1
+        self.latest = None
+        self.latest_docker = None
+        if self.store is not None:
+            self.store.clear()
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
@@ -0,0 +1,168 @@
+import os
+import socket
+import sys
+import threading
+import time
+from collections import deque, OrderedDict
+
+import numpy as np
+
+from utils.fleet_protocol import (HELLO, ACK, WIRE_DTYPE, FrameBuffer, ProtocolError, batch_frame, json_frame,
+                                  parse_seq, sample_record)
+
+BATCH_SIZE = 500  # Samples per batch at most
+BATCH_INTERVAL = 1.0  # Seconds a sample may wait for its batch to fill up
+MAX_IN_FLIGHT = 8  # Unacknowledged batches before sending pauses
+BUFFER_SIZE = 200_000  # Samples kept while the collector is unreachable; the oldest are dropped beyond this
+POLL_INTERVAL = 0.05  # Seconds between checks for a full batch while waiting for acknowledgements
+SEND_TIMEOUT = 5.0
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 30.0
+
+
+class AgentSink:
+    """Streams samples to a collector in acknowledged binary batches (see utils/fleet_protocol.py).
+
+    write() only queues the sample. A sender thread packs what is queued into
+    a numbered batch every `batch_interval` seconds, or as soon as
+    `batch_size` samples wait, and keeps each batch until the collector
+    acknowledges it; at most `max_in_flight` are outstanding. While the
+    collector is unreachable samples pile up in the buffer, the oldest dropped
+    (and counted) beyond `buffer_size`. After reconnecting, unacknowledged
+    batches are sent again first; the collector discards those it already
+    stored, by sequence number within this agent's session.
+    """
+
+    def __init__(self, address, host=None, batch_size=BATCH_SIZE, batch_interval=BATCH_INTERVAL,
+                 buffer_size=BUFFER_SIZE, max_in_flight=MAX_IN_FLIGHT):
+        self.address = address  # (host, port) of the collector
+        self.host = host or socket.gethostname()
+        self.session = int.from_bytes(os.urandom(7), 'little')  # Sequence numbers restart with every process
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.max_in_flight = max_in_flight
+        self.buffer = deque(maxlen=buffer_size)  # Record tuples; appended by write(), popped by the sender
+        self.unacked = OrderedDict()  # Sequence number -> encoded BATCH frame
+        self.seq = 0
+        self.drive = None
+        self.sock = None
+        self.failing = False
+
+        # Statistics
+        self.dropped = 0
+        self.sent_batches = 0
+        self.acked_samples = 0
+        self._batch_sizes = {}  # Sequence number -> samples, until acknowledged
+
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, sample):
+        if self.drive is None:
+            self.drive = sample['drive']
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(sample_record(sample))
+
+    def _connect(self):
+        self.sock = socket.create_connection(self.address, timeout=SEND_TIMEOUT)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.frames = FrameBuffer()
+        self.sock.sendall(json_frame(HELLO, {'role': 'agent', 'session': self.session, 'host': self.host,
+                                             'drive': self.drive}))
+        for data in self.unacked.values():
+            self.sock.sendall(data)
+
+    def _disconnect(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def _send_batch(self):
+        count = min(len(self.buffer), self.batch_size)
+        records = np.array([self.buffer.popleft() for _ in range(count)], dtype=WIRE_DTYPE)
+        self.seq += 1
+        data = self.unacked[self.seq] = batch_frame(self.seq, records)
+        self._batch_sizes[self.seq] = count
+        self.sent_batches += 1
+        self.sock.settimeout(SEND_TIMEOUT)
+        self.sock.sendall(data)
+
+    def _receive(self, timeout):
+        """Wait up to `timeout` seconds for acknowledgements and apply them"""
+        self.sock.settimeout(timeout)
+        try:
+            data = self.sock.recv(65536)
+        except (socket.timeout, BlockingIOError):
+            return
+        if not data:
+            raise ConnectionResetError("collector closed the connection")
+        for kind, payload in self.frames.feed(data):
+            if kind != ACK:
+                raise ProtocolError(f"Unexpected frame type {kind}")
+            seq = parse_seq(payload)
+            while self.unacked and next(iter(self.unacked)) <= seq:
+                acked, _ = self.unacked.popitem(last=False)
+                self.acked_samples += self._batch_sizes.pop(acked)
+
+    def _run(self):
+        delay = RECONNECT_MIN
+        last_send = time.monotonic()
+        while True:
+            stopping = self._stopping.is_set()
+            if stopping and not self.buffer and not self.unacked:
+                break
+            if self.sock is None:
+                if self.drive is None:  # Nothing written yet
+                    if stopping:
+                        break
+                    time.sleep(POLL_INTERVAL)
+                    continue
+                try:
+                    self._connect()
+                    delay = RECONNECT_MIN
+                    if self.failing:
+                        print(f"Reconnected to collector {self.address}", file=sys.stderr)
+                    self.failing = False
+                except OSError as e:
+                    self._disconnect()
+                    if not self.failing:  # Only report the first failure of an outage
+                        print(f"Error connecting to collector {self.address}: {e}; buffering samples",
+                              file=sys.stderr)
+                        self.failing = True
+                    if self._stopping.wait(delay):
+                        break
+                    delay = min(delay * 2, RECONNECT_MAX)
+                    continue
+
+            try:
+                now = time.monotonic()
+                due = self.buffer and (len(self.buffer) >= self.batch_size or stopping
+                                       or now - last_send >= self.batch_interval)
+                if due and len(self.unacked) < self.max_in_flight:
+                    self._send_batch()
+                    last_send = now
+                    self._receive(0)
+                else:
+                    self._receive(POLL_INTERVAL)
+            except (OSError, ProtocolError) as e:
+                if not self.failing:
+                    print(f"Error sending to collector {self.address}: {e}; buffering samples", file=sys.stderr)
+                    self.failing = True
+                self._disconnect()
+
+    def stats(self):
+        return {
+            'buffered': len(self.buffer),
+            'unacked_batches': len(self.unacked),
+            'sent_batches': self.sent_batches,
+            'acked_samples': self.acked_samples,
+            'dropped': self.dropped,
+        }
+
+    def close(self, timeout=5.0):
+        """Send what is buffered, waiting up to `timeout` seconds for it to be acknowledged"""
+        self._stopping.set()
+        self._thread.join(timeout)
+        self._disconnect()
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import sys
+from collections import deque
+
+from utils.fleet_protocol import (HELLO, HOSTS, SUBSCRIBE, SAMPLES, ProtocolError, frame, json_frame, parse_samples,
+                                  read_frame)
+
+RECONNECT_MIN = 0.5
+RECONNECT_MAX = 30.0
+
+
+class CollectorClient:
+    """The GUI's connection to a collector: its host list and the samples of the hosts shown.
+
+    run() is a coroutine for the monitor's asyncio loop and reconnects until
+    stop(). The GUI thread calls subscribe() for each host it selects, then
+    takes the host list and drains received samples on every frame, like the
+    sampler's queue. A reconnect subscribes again and so resends every
+    backlog; samples no newer than those already queued are dropped here.
+    """
+
+    def __init__(self, address):
+        self.address = address  # (host, port)
+        self.hosts = None  # Latest host list from the collector, until the GUI takes it
+        self.samples = deque()  # (host key, WIRE_DTYPE records); appended here, popped by the GUI thread
+        self.subscriptions = set()
+        self.running = True
+        self._last_time = {}  # Host key -> time of the newest sample queued
+        self._loop = None
+        self._writer = None
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        delay = RECONNECT_MIN
+        failing = False
+        while self.running:
+            try:
+                reader, writer = await asyncio.open_connection(*self.address)
+            except OSError as e:
+                if not failing:
+                    print(f"Error connecting to collector {self.address}: {e}", file=sys.stderr)
+                    failing = True
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, RECONNECT_MAX)
+                continue
+            failing = False
+            delay = RECONNECT_MIN
+            self._writer = writer
+            writer.write(json_frame(HELLO, {'role': 'viewer'}))
+            for key in list(self.subscriptions):  # subscribe() may add to it meanwhile
+                writer.write(frame(SUBSCRIBE, key.encode()))
+            try:
+                while True:
+                    kind, payload = await read_frame(reader)
+                    if kind == HOSTS:
+                        self.hosts = json.loads(payload)
+                    elif kind == SAMPLES:
+                        self._queue(*parse_samples(payload))
+                    else:
+                        raise ProtocolError(f"Unexpected frame type {kind}")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                if self.running:
+                    print(f"Lost connection to collector {self.address}", file=sys.stderr)
+            except (ProtocolError, ValueError) as e:
+                print(f"Error reading from collector {self.address}: {e}", file=sys.stderr)
+            finally:
+                self._writer = None
+                writer.close()
+            await asyncio.sleep(delay)
+
+    def _queue(self, key, records):
+        last = self._last_time.get(key)
+        if last is not None:
+            records = records[records['time'] > last]
+        if len(records):
+            self._last_time[key] = float(records['time'][-1])
+            self.samples.append((key, records))
+
+    def _send_subscribe(self, key):
+        if self._writer is not None:
+            self._writer.write(frame(SUBSCRIBE, key.encode()))
+
+    def subscribe(self, key):
+        """Start receiving a host's samples, its backlog first; call from any thread"""
+        if key in self.subscriptions:
+            return
+        self.subscriptions.add(key)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._send_subscribe, key)
+
+    def take_hosts(self):
+        """The host list if it changed since the last call, else None"""
+        hosts, self.hosts = self.hosts, None
+        return hosts
+
+    def drain(self):
+        batch = []
+        samples = self.samples
+        while samples:
+            batch.append(samples.popleft())
+        return batch
+
+    def stop(self):
+        self.running = False
+        if self._writer is not None and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._writer.close)
@@ -0,0 +1,129 @@
+"""Binary frames exchanged by agents, the collector and viewers.
+
+Every frame is a 4-byte big-endian length, then a 1-byte type and the
+payload; the length covers both. Samples travel as packed WIRE_DTYPE records
+(28 bytes each, little-endian), so a batch is encoded with one tobytes() and
+decoded with one np.frombuffer().
+
+    HELLO      JSON: {"role": "agent", "session", "host", "drive"} or {"role": "viewer"}
+    BATCH      agent -> collector: u64 sequence number, then records
+    ACK        collector -> agent: u64 sequence number, acknowledging that batch and all before it
+    HOSTS      collector -> viewer: JSON list of {"key", "host", "drive", "connected"}
+    SUBSCRIBE  viewer -> collector: UTF-8 host key; the collector answers with that host's recent
+               samples, then forwards every new batch
+    SAMPLES    collector -> viewer: u16 key length, UTF-8 key, then records
+"""
+import json
+import struct
+
+import numpy as np
+
+HELLO, BATCH, ACK, HOSTS, SUBSCRIBE, SAMPLES = range(1, 7)
+MAX_FRAME = 16 * 1024 * 1024  # Larger frames mean a corrupt stream, not a big batch
+
+WIRE_DTYPE = np.dtype([
+    ('time', '<f8'),          # Wall-clock seconds since the epoch, on the agent
+    ('total', '<f4'),         # GB
+    ('used', '<f4'),
+    ('available', '<f4'),
+    ('percent', '<f4'),
+    ('docker_total', '<f4'),  # GB, NaN when Docker is unavailable
+    ('docker_used', '<f4'),
+])
+
+_HEADER = struct.Struct('>IB')
+_SEQ = struct.Struct('<Q')
+_KEY_LENGTH = struct.Struct('<H')
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def frame(kind, payload=b''):
+    return _HEADER.pack(len(payload) + 1, kind) + payload
+
+
+def json_frame(kind, value):
+    return frame(kind, json.dumps(value).encode())
+
+
+def batch_frame(seq, records):
+    return frame(BATCH, _SEQ.pack(seq) + records.tobytes())
+
+
+def ack_frame(seq):
+    return frame(ACK, _SEQ.pack(seq))
+
+
+def samples_frame(key, record_bytes):
+    key = key.encode()
+    return frame(SAMPLES, _KEY_LENGTH.pack(len(key)) + key + record_bytes)
+
+
+def parse_seq(payload):
+    return _SEQ.unpack_from(payload)[0]
+
+
+def parse_batch(payload):
+    """(sequence number, raw record bytes) of a BATCH payload"""
+    return _SEQ.unpack_from(payload)[0], payload[_SEQ.size:]
+
+
+def parse_samples(payload):
+    """(host key, records) of a SAMPLES payload"""
+    (length,) = _KEY_LENGTH.unpack_from(payload)
+    start = _KEY_LENGTH.size
+    return payload[start:start + length].decode(), decode_records(payload[start + length:])
+
+
+def decode_records(data):
+    if len(data) % WIRE_DTYPE.itemsize:
+        raise ProtocolError(f"{len(data)} bytes is not a whole number of records")
+    return np.frombuffer(data, dtype=WIRE_DTYPE)
+
+
+def sample_record(sample):
+    """WIRE_DTYPE field values for one headless sample dict"""
+    nan = float('nan')
+    docker_total, docker_used = sample['docker_total_gb'], sample['docker_used_gb']
+    return (sample['time'], sample['total_gb'], sample['used_gb'], sample['available_gb'], sample['percent'],
+            nan if docker_total is None else docker_total, nan if docker_used is None else docker_used)
+
+
+def host_key(host, drive):
+    """How a host's drive is named in the collector and the GUI's drive list"""
+    return f'{host}:{drive}'
+
+
+def _check_length(length):
+    if not 1 <= length <= MAX_FRAME:
+        raise ProtocolError(f"Bad frame length {length}")
+
+
+async def read_frame(reader):
+    """(type, payload) of the next frame from an asyncio StreamReader; raises IncompleteReadError at EOF"""
+    length, kind = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    _check_length(length)
+    return kind, await reader.readexactly(length - 1)
+
+
+class FrameBuffer:
+    """Splits bytes received on a blocking socket into frames"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def feed(self, data):
+        """Add received bytes and return the (type, payload) of every frame now complete"""
+        self.data += data
+        frames = []
+        while len(self.data) >= _HEADER.size:
+            length, kind = _HEADER.unpack_from(self.data)
+            _check_length(length)
+            end = 4 + length
+            if len(self.data) < end:
+                break
+            frames.append((kind, bytes(self.data[_HEADER.size:end])))
+            del self.data[:end]
+        return frames
@@ -0,0 +1,90 @@
+import math
+
+import numpy as np
+
+DEFAULT_HALF_LIFE = 30  # Minutes for a sample's weight in the fit to halve
+MIN_SPAN = 1  # Minutes of (weighted) history needed before the slope is trusted
+
+
+class GrowthEstimator:
+    """Streaming exponentially weighted linear regression of one series over time.
+
+    Keeps the running weighted sums of 1, t, y, t*t and t*y, with times taken
+    relative to the newest sample. Each update decays the sums by how much
+    time passed and re-centres them on the new sample, so the cost per sample
+    is constant however long the series is, and the sums stay small enough to
+    keep their precision. Times are in minutes, like the ring buffers; rate()
+    is per minute.
+    """
+
+    def __init__(self, half_life=DEFAULT_HALF_LIFE):
+        self.decay = math.log(2) / half_life
+        self.reset()
+
+    def reset(self):
+        self.t = None  # Time of the newest sample, which the sums are centred on
+        self.s0 = self.st = self.sy = self.stt = self.sty = 0.0
+
+    def _advance(self, t):
+        """Decay and re-centre the sums on time t"""
+        if self.t is None:
+            self.t = t
+            return
+        d = t - self.t
+        w = math.exp(-self.decay * d)
+        s0, st = self.s0 * w, self.st * w
+        self.stt = (self.stt * w) - 2 * d * st + d * d * s0
+        self.sty = (self.sty * w) - d * (self.sy * w)
+        self.st = st - d * s0
+        self.s0 = s0
+        self.sy *= w
+        self.t = t
+
+    def update(self, t, y):
+        if self.t is not None and t < self.t:
+            return
+        self._advance(t)
+        self.s0 += 1.0
+        self.sy += y  # The new sample sits at relative time 0
+
+    def extend(self, times, values):
+        """Feed many samples at once, e.g. the history restored at startup"""
+        times = np.asarray(times, dtype=np.float64)
+        if len(times) == 0:
+            return
+        self._advance(float(times[-1]))
+        rel = times - self.t
+        w = np.exp(self.decay * rel)
+        values = np.asarray(values, dtype=np.float64)
+        self.s0 += w.sum()
+        self.st += (w * rel).sum()
+        self.sy += (w * values).sum()
+        self.stt += (w * rel * rel).sum()
+        self.sty += (w * rel * values).sum()
+
+    def shift_times(self, delta):
+        if self.t is not None:
+            self.t += delta
+
+    def fit(self):
+        """(value now, rate per minute) of the weighted fit, or None until there is enough history"""
+        if self.s0 <= 0:
+            return None
+        mean_t = self.st / self.s0
+        variance = self.stt / self.s0 - mean_t * mean_t
+        if variance < (MIN_SPAN / 2) ** 2 / 3:  # Variance of evenly spread samples over MIN_SPAN
+            return None
+        rate = (self.sty / self.s0 - mean_t * self.sy / self.s0) / variance
+        return self.sy / self.s0 - rate * mean_t, rate
+
+    def time_to(self, level):
+        """Minutes from the newest sample until the fit reaches `level`; None if it is not heading there"""
+        fit = self.fit()
+        if fit is None:
+            return None
+        value, rate = fit
+        if value >= level:
+            return 0.0
+        if rate <= 0:
+            return None
+        return (level - value) / rate
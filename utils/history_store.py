@@ -0,0 +1,165 @@
+import os
+import time
+import zlib
+from urllib.parse import quote
+
+import numpy as np
+
+DEFAULT_HISTORY_DIR = os.path.join(os.path.expanduser('~'), '.disk-space-visualizer', 'history')
+
+SEGMENT_MAGIC = b'DSVSEG01'
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),          # Wall-clock seconds since the epoch
+    ('usage', '<f4'),         # System used GB
+    ('docker_usage', '<f4'),  # Docker used GB (0 when unavailable)
+    ('crc', '<u4'),           # CRC32 of the three fields above
+    ('pad', '<u4'),
+])
+RECORD_SIZE = RECORD_DTYPE.itemsize
+HEADER_SIZE = RECORD_SIZE  # Magic, zero padded to one record
+PAYLOAD_SIZE = 16
+TAIL_CHECK_RECORDS = 64  # Records at the end of the newest segment checked for torn writes
+
+
+def history_dir_for_drive(base_dir, drive):
+    """Directory holding the segments of one mountpoint"""
+    return os.path.join(base_dir, quote(drive, safe=''))
+
+
+class HistoryStore:
+    """Append-only history of fixed-size records split into segment files.
+
+    Records are written unbuffered, so they survive the process being killed,
+    and fsynced every `fsync_interval` seconds. Each record carries a CRC32;
+    on open, a partially written or corrupt tail in the newest segment is cut
+    off. Existing segments are exposed as read-only memory maps.
+    """
+
+    def __init__(self, directory, segment_records=1_000_000, max_segments=16, fsync_interval=5.0):
+        self.directory = directory
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.fsync_interval = fsync_interval
+        self._file = None
+        self._file_records = 0
+        self._last_fsync = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _segment_paths(self):
+        names = sorted(n for n in os.listdir(self.directory) if n.startswith('segment-') and n.endswith('.dat'))
+        return [os.path.join(self.directory, n) for n in names]
+
+    def load(self):
+        """Repair the newest segment and return every segment as a memmap record array"""
+        paths = self._segment_paths()
+        if paths:
+            self._repair(paths[-1])
+
+        segments = []
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+                        print(f"Skipping unrecognized history segment {path}")
+                        continue
+                records = (os.path.getsize(path) - HEADER_SIZE) // RECORD_SIZE
+                if records > 0:
+                    segments.append(np.memmap(path, dtype=RECORD_DTYPE, mode='r',
+                                              offset=HEADER_SIZE, shape=(records,)))
+            except OSError as e:
+                print(f"Error opening history segment {path}: {e}")
+        return segments
+
+    @staticmethod
+    def tail(segments, count):
+        """Slices of `segments` covering the newest `count` records, oldest first"""
+        parts = []
+        for segment in reversed(segments):
+            if count == 0:
+                break
+            part = segment[-count:]
+            parts.append(part)
+            count -= len(part)
+        parts.reverse()
+        return parts
+
+    def _repair(self, path):
+        """Truncate a torn or corrupt tail left behind by a crash"""
+        size = os.path.getsize(path)
+        if size < HEADER_SIZE:
+            os.remove(path)
+            return
+        records = (size - HEADER_SIZE) // RECORD_SIZE
+        valid = records
+        check = min(records, TAIL_CHECK_RECORDS)
+        with open(path, 'rb') as f:
+            f.seek(HEADER_SIZE + (records - check) * RECORD_SIZE)
+            tail = f.read(check * RECORD_SIZE)
+        for i in range(check):
+            record = tail[i * RECORD_SIZE:(i + 1) * RECORD_SIZE]
+            crc = int.from_bytes(record[PAYLOAD_SIZE:PAYLOAD_SIZE + 4], 'little')
+            if zlib.crc32(record[:PAYLOAD_SIZE]) != crc:
+                valid = records - check + i
+                break
+
+        expected = HEADER_SIZE + valid * RECORD_SIZE
+        if expected != size:
+            print(f"Truncating torn history tail in {path} ({size - expected} bytes)")
+            with open(path, 'r+b') as f:
+                f.truncate(expected)
+
+    def append(self, timestamp, usage, docker_usage):
+        if self._file is None or self._file_records >= self.segment_records:
+            self._open_segment()
+
+        record = np.zeros(1, dtype=RECORD_DTYPE)
+        record['time'] = timestamp
+        record['usage'] = usage
+        record['docker_usage'] = docker_usage
+        data = record.tobytes()
+        record['crc'] = zlib.crc32(data[:PAYLOAD_SIZE])
+        self._file.write(record.tobytes())
+        self._file_records += 1
+
+        now = time.monotonic()
+        if now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def _open_segment(self):
+        """Reopen the newest segment if it has room, otherwise start a new one"""
+        self._close_file()
+        paths = self._segment_paths()
+        if paths:
+            records = (os.path.getsize(paths[-1]) - HEADER_SIZE) // RECORD_SIZE
+            if records < self.segment_records:
+                self._file = open(paths[-1], 'ab', buffering=0)
+                self._file_records = records
+                return
+            number = int(os.path.basename(paths[-1])[len('segment-'):-len('.dat')]) + 1
+        else:
+            number = 1
+
+        path = os.path.join(self.directory, f'segment-{number:06d}.dat')
+        self._file = open(path, 'ab', buffering=0)
+        self._file.write(SEGMENT_MAGIC.ljust(HEADER_SIZE, b'\0'))
+        self._file_records = 0
+
+        # Drop the oldest segments beyond the retention limit
+        for old in self._segment_paths()[:-self.max_segments]:
+            os.remove(old)
+
+    def _close_file(self):
+        if self._file is not None:
+            os.fsync(self._file.fileno())
+            self._file.close()
+            self._file = None
+
+    def clear(self):
+        """Delete every stored segment"""
+        self._close_file()
+        for path in self._segment_paths():
+            os.remove(path)
+
+    def close(self):
+        self._close_file()
@@ -0,0 +1,256 @@
+"""OpenMetrics / Prometheus text endpoint for the latest collected sample.
+
+The collector (GUI or headless) builds a MetricsSnapshot after recording a
+sample and publish()es it; scrapes only encode a snapshot that already exists
+and never sample anything themselves. Each snapshot is encoded at most once
+per format, on the first scrape after it was published, and the bytes are
+served as they are to every scrape until the next one arrives. Only the
+freshness of each source (add_freshness()) is worked out per scrape, from the
+stored reading times, so it keeps ageing while nothing new is published.
+
+Standard library only, so it works in headless mode.
+"""
+import math
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9839
+PREFIX = 'disk_monitor_'
+BYTES_PER_GB = 1000 * 1000 * 1000
+
+OPENMETRICS_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if value == -math.inf:
+        return '-Inf'
+    if value != value:
+        return 'NaN'
+    return repr(float(value))
+
+
+class MetricsSnapshot:
+    """Metric families of one moment, in the order they were added"""
+
+    def __init__(self):
+        self.families = {}  # Name -> (kind, help, [(labels, value)])
+
+    def _add(self, kind, name, help_text, value, labels):
+        if value is None:
+            return  # Not known (yet), e.g. no Docker or no fill rate
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = (kind, help_text, [])
+        family[2].append((tuple(labels.items()), value))
+
+    def gauge(self, name, help_text, value, **labels):
+        self._add('gauge', PREFIX + name, help_text, value, labels)
+
+    def counter(self, name, help_text, value, **labels):
+        """`name` without the _total suffix, which encoding adds"""
+        self._add('counter', PREFIX + name, help_text, value, labels)
+
+    def encode(self, openmetrics=True, end=True):
+        """The text of every family; `end` closes an OpenMetrics exposition, leave it off to append more"""
+        lines = []
+        for name, (kind, help_text, samples) in self.families.items():
+            sample_name = name + '_total' if kind == 'counter' else name
+            # The Prometheus format names a counter family after its samples; OpenMetrics drops the suffix
+            family_name = name if openmetrics else sample_name
+            lines.append(f'# HELP {family_name} {help_text}')
+            lines.append(f'# TYPE {family_name} {kind}')
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{_escape(v)}"' for key, v in labels)
+                lines.append(f'{sample_name}{{{label_text}}} {_format_value(value)}' if label_text
+                             else f'{sample_name} {_format_value(value)}')
+        if openmetrics and end:
+            lines.append('# EOF')
+        return ('\n'.join(lines) + '\n').encode() if lines else b''
+
+
+def add_drive(snapshot, drive, usage, fill_rate=None, to_full=None):
+    """Gauges for one mountpoint: its usage tuple (GB), fill rate (GB/min) and minutes until full"""
+    total_gb, used_gb, available_gb, percent = usage
+    snapshot.gauge('disk_total_bytes', 'Size of the filesystem', total_gb * BYTES_PER_GB, mountpoint=drive)
+    snapshot.gauge('disk_used_bytes', 'Bytes used on the filesystem', used_gb * BYTES_PER_GB, mountpoint=drive)
+    snapshot.gauge('disk_available_bytes', 'Bytes available to unprivileged users',
+                   available_gb * BYTES_PER_GB, mountpoint=drive)
+    snapshot.gauge('disk_used_ratio', 'Share of the filesystem in use', percent / 100, mountpoint=drive)
+    if fill_rate is not None:
+        snapshot.gauge('disk_fill_rate_bytes_per_second', 'Recent growth of used bytes (weighted linear fit)',
+                       fill_rate * BYTES_PER_GB / 60, mountpoint=drive)
+    if to_full is not None:
+        snapshot.gauge('disk_seconds_to_full', 'Time until the filesystem is full at the current fill rate',
+                       to_full * 60, mountpoint=drive)
+
+
+def add_docker(snapshot, docker_values, fill_rate=None):
+    """(total, used) GB of the Docker disk and its fill rate (GB/min)"""
+    total_gb, used_gb = docker_values
+    if total_gb is not None:
+        snapshot.gauge('docker_total_bytes', 'Size of the Docker disk', total_gb * BYTES_PER_GB)
+    if used_gb is not None:
+        snapshot.gauge('docker_used_bytes', 'Bytes used on the Docker disk', used_gb * BYTES_PER_GB)
+    if fill_rate is not None:
+        snapshot.gauge('docker_fill_rate_bytes_per_second', 'Recent growth of the Docker disk (weighted linear fit)',
+                       fill_rate * BYTES_PER_GB / 60)
+
+
+def add_containers(snapshot, sizes):
+    """Writable-layer size (GB) per container name"""
+    for name, size in sizes.items():
+        if size is not None:
+            snapshot.gauge('container_writable_bytes', "Size of a container's writable layer",
+                           size * BYTES_PER_GB, container=name)
+
+
+def add_sampler(snapshot, stats, last_sample_time):
+    """Sampler.stats() (or the same keys, as far as they are known) and the wall-clock time of the last sample"""
+    snapshot.gauge('last_sample_timestamp_seconds', 'When the newest sample was taken', last_sample_time)
+    snapshot.gauge('sample_interval_seconds', 'Current sampling interval', stats['interval_ms'] / 1000)
+    snapshot.counter('sampler_ticks', 'Sampling ticks run', stats.get('ticks'))
+    snapshot.counter('sampler_late_ticks', 'Ticks that started over half an interval late', stats.get('late_ticks'))
+    snapshot.counter('sampler_dropped_ticks', 'Ticks skipped because a sample overran',
+                     stats.get('dropped_ticks'))
+    snapshot.counter('sampler_overflowed_samples', 'Samples lost to a full queue while the consumer stalled',
+                     stats.get('overflowed'))
+    jitter = stats.get('jitter_p99_ms')
+    snapshot.gauge('sampler_jitter_p99_seconds', 'Lateness of recent ticks, 99th percentile',
+                   jitter / 1000 if jitter is not None else None)
+
+
+def add_sources(snapshot, stats):
+    """Per-source health from Scheduler.stats(), as {source name: stats}; see add_freshness() for ages"""
+    for name, source in stats.items():
+        snapshot.gauge('source_interval_seconds', 'Current polling interval of a source',
+                       source['interval_ms'] / 1000, source=name)
+        snapshot.counter('source_dropped_ticks', 'Ticks skipped because earlier reads overran',
+                         source['dropped_ticks'], source=name)
+        snapshot.counter('source_timeouts', 'Reads abandoned after the timeout', source['timeouts'], source=name)
+        snapshot.counter('source_errors', 'Reads that raised', source['errors'], source=name)
+
+
+def add_freshness(snapshot, store):
+    """When each source of a SampleStore last answered, and how long ago that is now.
+
+    Meant for MetricsExporter's `live`: built on every scrape, so a source
+    that hangs, or a collector that stops publishing, shows up as growing
+    ages and a stale flag rather than the values of its last snapshot.
+    """
+    for name in list(store.stale_after):
+        reading = store.readings.get(name)
+        if reading is None:
+            continue  # No reading yet
+        age = store.age(name)
+        snapshot.gauge('source_last_reading_timestamp_seconds', "When a source's latest reading was taken",
+                       reading[0], source=name)
+        snapshot.gauge('source_age_seconds', "Time since a source's latest reading", age, source=name)
+        snapshot.gauge('source_stale', 'Whether the latest reading is too old to be used (1) or not (0)',
+                       int(store.is_stale(name)), source=name)
+        if name == 'docker':
+            snapshot.gauge('docker_sample_age_seconds', 'Time since Docker usage was last polled', age)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    exporter = None  # Set on the per-exporter subclass
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/metrics':
+            openmetrics = 'application/openmetrics-text' in self.headers.get('Accept', '')
+            body = self.exporter.encoded(openmetrics)
+            self._reply(200, OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE, body)
+        elif path == '/':
+            self._reply(200, 'text/plain; charset=utf-8', b'Disk Space Visualizer metrics: /metrics\n')
+        else:
+            self._reply(404, 'text/plain; charset=utf-8', b'Not found\n')
+
+    def _reply(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # A line per scrape would drown everything else
+
+
+class MetricsExporter:
+    """Serves the latest published MetricsSnapshot over HTTP on a background thread.
+
+    `port` 0 picks a free port; `address` has the one bound. Until the first
+    snapshot is published /metrics is empty (OpenMetrics: just '# EOF').
+    `live`, if set, is called on every scrape, from the server's threads, with
+    a fresh MetricsSnapshot to add time-dependent gauges to; they are served
+    after the published ones and never cached.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, live=None):
+        handler = type('Handler', (_Handler,), {'exporter': self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self._current = (0, MetricsSnapshot())  # (version, snapshot), replaced whole so publishing takes no lock
+        self._encoded = {}  # OpenMetrics or not -> (version, bytes)
+        self._lock = threading.Lock()  # One encoding at a time, shared by concurrent scrapes
+        self.scrapes = 0
+        self.encodings = 0
+        self.live = live
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def address(self):
+        return self.server.server_address[:2]
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def publish(self, snapshot):
+        """Make `snapshot` the one served; it must not be changed afterwards. Call from one thread only."""
+        self._current = (self._current[0] + 1, snapshot)
+
+    def encoded(self, openmetrics=True):
+        version, snapshot = self._current
+        with self._lock:
+            self.scrapes += 1
+            cached = self._encoded.get(openmetrics)
+            if cached is None or cached[0] != version:
+                cached = self._encoded[openmetrics] = (version, snapshot.encode(openmetrics, self.live is None))
+                self.encodings += 1
+        if self.live is None:
+            return cached[1]
+        live = MetricsSnapshot()
+        self.live(live)
+        return cached[1] + live.encode(openmetrics)
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def parse_address(spec):
+    """'PORT', 'HOST:PORT' or ':PORT' -> (host, port); the host defaults to localhost only"""
+    host, _, port = spec.rpartition(':')
+    return host or DEFAULT_HOST, int(port)
+
+
+def start_exporter(spec, live=None):
+    """MetricsExporter listening on `spec` (see parse_address), or None if the port can't be bound"""
+    host, port = parse_address(spec)
+    try:
+        exporter = MetricsExporter(host, port, live).start()
+    except OSError as e:
+        print(f"Error starting metrics endpoint on {host}:{port}: {e}", file=sys.stderr)
+        return None
+    print(f"Serving metrics on http://{host}:{exporter.address[1]}/metrics", file=sys.stderr)
+    return exporter
@@ -0,0 +1,128 @@
+import numpy as np
+
+# The widest zoom window (20 minutes) at the fastest default 100 ms interval; older
+# samples are kept compressed (see utils/compressed_series.py)
+DEFAULT_CAPACITY = 10 * 60 * 20
+
+DEFAULT_COLUMNS = (('usage', np.float32), ('docker_usage', np.float32))
+
+
+class RingBuffer:
+    """Fixed-capacity columnar sample history.
+
+    Timestamps are stored as float64 and every value column with its own dtype.
+    Each sample is written twice (at its slot and at slot + capacity), so the
+    live window is always a single contiguous slice and the views returned by
+    `times` and `column()` can be handed to pyqtgraph without copying.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, columns=DEFAULT_COLUMNS):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = int(capacity)
+        self.column_names = tuple(name for name, _ in columns)
+        self._times = np.zeros(2 * self.capacity, dtype=np.float64)
+        self._columns = {name: np.zeros(2 * self.capacity, dtype=dtype) for name, dtype in columns}
+        self._start = 0
+        self._count = 0
+        self.total = 0  # Samples appended since the last clear, including evicted ones
+
+    def __len__(self):
+        return self._count
+
+    def append(self, t, *values):
+        """Append one sample in O(1); values follow the column order"""
+        slot = (self._start + self._count) % self.capacity
+        mirror = slot + self.capacity
+        self._times[slot] = self._times[mirror] = t
+        for name, value in zip(self.column_names, values):
+            column = self._columns[name]
+            column[slot] = column[mirror] = value
+
+        if self._count < self.capacity:
+            self._count += 1
+        else:
+            self._start = (self._start + 1) % self.capacity
+        self.total += 1
+
+    def extend(self, times, *columns):
+        """Append many samples at once with vectorized copies"""
+        times = np.asarray(times, dtype=np.float64)
+        n = len(times)
+        if n == 0:
+            return
+        columns = [np.asarray(c) for c in columns]
+        if n > self.capacity:
+            # Only the newest `capacity` samples survive anyway
+            skipped = n - self.capacity
+            times = times[skipped:]
+            columns = [c[skipped:] for c in columns]
+            self.total += skipped
+            n = self.capacity
+
+        slots = (self._start + self._count + np.arange(n)) % self.capacity
+        self._times[slots] = self._times[slots + self.capacity] = times
+        for name, values in zip(self.column_names, columns):
+            column = self._columns[name]
+            column[slots] = column[slots + self.capacity] = values
+
+        overflow = max(0, self._count + n - self.capacity)
+        self._count = min(self.capacity, self._count + n)
+        self._start = (self._start + overflow) % self.capacity
+        self.total += n
+
+    def nearest_index(self, t):
+        """Index of the sample closest to time t, by binary search; None if empty"""
+        if self._count == 0:
+            return None
+        times = self.times
+        i = int(np.searchsorted(times, t))
+        if i == 0:
+            return 0
+        if i == self._count:
+            return i - 1
+        return i if times[i] - t < t - times[i - 1] else i - 1
+
+    def value_at(self, name, index):
+        """Value of one sample by direct index, without materializing the column"""
+        return self._columns[name][self._start + index]
+
+    def time_at(self, index):
+        return self._times[self._start + index]
+
+    def last(self, name):
+        """Value of the newest sample in a column"""
+        slot = (self._start + self._count - 1) % self.capacity
+        return self._columns[name][slot]
+
+    def set_last(self, name, value):
+        """Overwrite the newest sample of a column in place"""
+        slot = (self._start + self._count - 1) % self.capacity
+        column = self._columns[name]
+        column[slot] = column[slot + self.capacity] = value
+
+    def shift_times(self, delta):
+        """Add `delta` to every timestamp, e.g. when the time origin moves"""
+        self._times += delta
+
+    def clear(self):
+        self._start = 0
+        self._count = 0
+        self.total = 0
+
+    @property
+    def first_index(self):
+        """Absolute index of the oldest sample still held"""
+        return self.total - self._count
+
+    @property
+    def times(self):
+        return self._view(self._times)
+
+    def column(self, name):
+        return self._view(self._columns[name])
+
+    def _view(self, array):
+        view = array[self._start:self._start + self._count]
+        view.flags.writeable = False
+        return view
@@ -0,0 +1,183 @@
+import numpy as np
+
+from utils.decimation import decimate
+from utils.ring_buffer import RingBuffer, DEFAULT_COLUMNS
+
+MINUTES_PER_DAY = 24 * 60
+RAW_RETENTION = 2 * MINUTES_PER_DAY  # Raw (compressed) samples kept, in minutes; older data lives in the rollups
+RAW_VIEW_LIMIT = 60  # Widest view, in minutes, still drawn from raw samples
+# (bucket width, retention) in minutes; each tier is a fixed-size ring, so old
+# buckets are dropped as new ones arrive
+ROLLUP_TIERS = (
+    (10 / 60, 1 * MINUTES_PER_DAY),
+    (1, 14 * MINUTES_PER_DAY),
+    (60, 365 * MINUTES_PER_DAY),
+)
+AGGREGATES = ('min', 'max', 'mean', 'last')
+MAX_BUCKETS_PER_PIXEL = 8  # A finer tier is preferred up to this many buckets per pixel, then decimated
+
+
+class RollupTier:
+    """Fixed-width time buckets holding the min, max, mean and last of every column.
+
+    Buckets are aligned to multiples of `width` (plus any shift_times()
+    since) and timestamped with their start. The newest bucket stays open
+    and is updated in place until a sample falls into a later one.
+    """
+
+    def __init__(self, width, retention, columns=DEFAULT_COLUMNS):
+        self.width = width
+        self.retention = retention
+        self.names = tuple(name for name, _ in columns)
+        bucket_columns = [(f'{name}_{aggregate}', dtype) for name, dtype in columns for aggregate in AGGREGATES]
+        self.buckets = RingBuffer(max(1, int(round(retention / width))), bucket_columns + [('count', np.uint32)])
+        self._open = None  # Bucket number of the open bucket
+        self._offset = 0.0  # Sum of shift_times() deltas; bucket n starts at n * width + offset
+
+    def __len__(self):
+        return len(self.buckets)
+
+    def append(self, t, *values):
+        number = int((t - self._offset) // self.width)
+        buckets = self.buckets
+        if number == self._open:
+            count = int(buckets.last('count'))
+            for name, value in zip(self.names, values):
+                if value < buckets.last(f'{name}_min'):
+                    buckets.set_last(f'{name}_min', value)
+                if value > buckets.last(f'{name}_max'):
+                    buckets.set_last(f'{name}_max', value)
+                mean = buckets.last(f'{name}_mean')
+                buckets.set_last(f'{name}_mean', mean + (value - mean) / (count + 1))
+                buckets.set_last(f'{name}_last', value)
+            buckets.set_last('count', count + 1)
+        else:
+            row = []
+            for value in values:
+                row += [value] * len(AGGREGATES)
+            buckets.append(number * self.width + self._offset, *row, 1)
+            self._open = number
+
+    def extend(self, times, *columns):
+        """Fold many samples in at once, with one reduceat pass per aggregate"""
+        times = np.asarray(times, dtype=np.float64)
+        if len(times) == 0:
+            return
+        numbers = ((times - self._offset) // self.width).astype(np.int64)
+        # Samples that still belong to the open bucket are folded into it together
+        carry = int(np.searchsorted(numbers, self._open, side='right')) if self._open is not None else 0
+        if carry:
+            self._merge_open([np.asarray(column)[:carry] for column in columns])
+        if carry == len(times):
+            return
+
+        numbers = numbers[carry:]
+        starts = np.flatnonzero(np.diff(numbers, prepend=numbers[0] - 1))
+        ends = np.append(starts[1:], len(numbers))
+        counts = ends - starts
+        row = []
+        for column in columns:
+            values = np.asarray(column)[carry:]
+            row += [
+                np.minimum.reduceat(values, starts),
+                np.maximum.reduceat(values, starts),
+                np.add.reduceat(values.astype(np.float64), starts) / counts,
+                values[ends - 1],
+            ]
+        self.buckets.extend(numbers[starts] * self.width + self._offset, *row, counts)
+        self._open = int(numbers[-1])
+
+    def _merge_open(self, columns):
+        """Fold samples of the open bucket in, like append() one by one but in a single pass"""
+        buckets = self.buckets
+        count = int(buckets.last('count'))
+        n = len(columns[0])
+        for name, values in zip(self.names, columns):
+            buckets.set_last(f'{name}_min', min(buckets.last(f'{name}_min'), values.min()))
+            buckets.set_last(f'{name}_max', max(buckets.last(f'{name}_max'), values.max()))
+            mean = float(buckets.last(f'{name}_mean'))
+            buckets.set_last(f'{name}_mean', mean + (float(values.sum(dtype=np.float64)) - n * mean) / (count + n))
+            buckets.set_last(f'{name}_last', values[-1])
+        buckets.set_last('count', count + n)
+
+    def visible(self, t0, t1):
+        """(x, {column: y}) of the buckets in [t0, t1] as min/max pairs"""
+        times = self.buckets.times
+        i0 = max(0, int(np.searchsorted(times, t0, side='right')) - 1)
+        i1 = min(len(times), int(np.searchsorted(times, t1, side='right')) + 1)
+        ys = {}
+        for name in self.names:
+            low = self.buckets.column(f'{name}_min')[i0:i1]
+            y = np.empty(2 * len(low), dtype=low.dtype)
+            y[0::2] = low
+            y[1::2] = self.buckets.column(f'{name}_max')[i0:i1]
+            ys[name] = y
+        return np.repeat(times[i0:i1], 2), ys
+
+    def nearest(self, t):
+        """(time, {column: last value}) of the bucket holding t, or the closest one.
+
+        The time is t itself when a bucket holds it, and the nearest edge of
+        the closest bucket otherwise: a bucket has no single sample time, and
+        its start can be far from t in a wide one.
+        """
+        if len(self.buckets) == 0:
+            return None
+        times = self.buckets.times
+        i = max(0, int(np.searchsorted(times, t, side='right')) - 1)
+        values = {name: self.buckets.value_at(f'{name}_last', i) for name in self.names}
+        return min(max(t, times[i]), times[i] + self.width), values
+
+    def covers(self, t):
+        return len(self.buckets) > 0 and self.buckets.time_at(0) <= t
+
+    def shift_times(self, delta):
+        # Boundaries move with the buckets, so the open bucket keeps its number and accumulators
+        self.buckets.shift_times(delta)
+        self._offset += delta
+
+    def clear(self):
+        self.buckets.clear()
+        self._open = None
+        self._offset = 0.0
+
+
+class Rollups:
+    """All rollup tiers of one series; see ROLLUP_TIERS"""
+
+    def __init__(self, columns=DEFAULT_COLUMNS, tiers=ROLLUP_TIERS):
+        self.tiers = [RollupTier(width, retention, columns) for width, retention in tiers]
+
+    def append(self, t, *values):
+        for tier in self.tiers:
+            tier.append(t, *values)
+
+    def extend(self, times, *columns):
+        for tier in self.tiers:
+            tier.extend(times, *columns)
+
+    def select(self, t0, t1, width):
+        """The finest tier reaching back to t0 with at most MAX_BUCKETS_PER_PIXEL buckets per pixel, else the coarsest"""
+        for tier in self.tiers:
+            if (t1 - t0) / tier.width <= MAX_BUCKETS_PER_PIXEL * width and tier.covers(t0):
+                return tier
+        return self.tiers[-1]
+
+    def visible(self, t0, t1, width):
+        """(x, {column: y}) min/max pairs for [t0, t1] from the tier matching the zoom, about one pair per pixel"""
+        x, ys = self.select(t0, t1, max(1, int(width))).visible(t0, t1)
+        return decimate(x, ys, width)
+
+    def nearest(self, t):
+        for tier in self.tiers:
+            if tier.covers(t):
+                return tier.nearest(t)
+        return self.tiers[-1].nearest(t)
+
+    def shift_times(self, delta):
+        for tier in self.tiers:
+            tier.shift_times(delta)
+
+    def clear(self):
+        for tier in self.tiers:
+            tier.clear()
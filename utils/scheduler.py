@@ -0,0 +1,387 @@
+"""One scheduler for every sampled metric, and the store its readings go to.
+
+A metric is a Source: a read() plus how often to call it (fixed, or adapting
+to how fast its values change, see utils/adaptive_interval.py), how long a
+read may take, how many reads may be in flight at once and after how long
+its latest value counts as stale. The Scheduler runs each source as its own
+task on one asyncio loop in a daemon thread and puts every reading, with the
+wall-clock time it was taken, into a SampleStore that the GUI or the
+headless loop drains.
+
+Sources cannot hold each other up. A plain read() runs on worker threads of
+its own source, a coroutine read() on the loop (it must not block), and a
+read that overruns its timeout is abandoned. While a source has
+`concurrency` reads still running, abandoned ones included, its ticks are
+skipped and counted as dropped instead of piling up more threads.
+
+A new metric is a small plugin:
+
+    class LoadSource(Source):
+        def __init__(self):
+            super().__init__('load', interval=5.0, timeout=1.0)
+
+        def read(self):
+            return os.getloadavg()
+
+    scheduler.add(LoadSource())
+    ...
+    store.latest('load')  # None until the first reading, and once stale
+"""
+import asyncio
+import concurrent.futures
+import queue
+import sys
+import threading
+import time
+from collections import deque
+
+from utils.adaptive_interval import AdaptiveInterval
+
+MIN_INTERVAL = 0.01  # 10 ms
+QUEUE_SIZE = 100_000  # Undrained readings kept per source
+JITTER_WINDOW = 512
+
+
+class Source:
+    """A metric the Scheduler polls; subclass it and implement read().
+
+    `interval` is the seconds between reads. With `max_interval` and
+    `resolution` given it adapts between the two: series() picks the numbers
+    out of a reading that AdaptiveInterval follows. A read still running after
+    `timeout` seconds is abandoned. The latest reading is stale after
+    `stale_after` seconds, by default twice the longest interval plus the
+    timeout. `queue_size` 0 keeps only the latest reading, for values nobody
+    needs every one of.
+    """
+
+    def __init__(self, name, interval=1.0, max_interval=None, resolution=None, timeout=5.0, concurrency=1,
+                 stale_after=None, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.interval = max(MIN_INTERVAL, interval)  # Current interval, re-chosen after every reading
+        self.schedule = None
+        if max_interval is not None and resolution is not None:
+            self.schedule = AdaptiveInterval(self.interval, max_interval, resolution)
+        self.timeout = timeout
+        self.concurrency = concurrency
+        longest = self.schedule.max_interval if self.schedule is not None else self.interval
+        self.stale_after = stale_after if stale_after is not None else 2 * longest + timeout
+        self.queue_size = queue_size
+
+    def read(self):
+        """The current value: a plain function run on a worker thread, or a coroutine function"""
+        raise NotImplementedError
+
+    def series(self, value):
+        """{key: number} of a reading, for the adaptive interval"""
+        return {}
+
+    def next_interval(self, timestamp, value):
+        if self.schedule is None:
+            return self.interval
+        return self.schedule.update(timestamp, self.series(value))
+
+
+class SampleStore:
+    """Every source's readings, written by the scheduler's thread and read by one consumer.
+
+    Per source there is a queue of (timestamp, value) readings not drained yet
+    and the latest reading. The queues are deques with one producer and one
+    consumer, whose append/popleft are atomic, so neither side takes a lock.
+    """
+
+    def __init__(self):
+        self.queues = {}  # Source name -> deque of (timestamp, value)
+        self.readings = {}  # Source name -> (timestamp, value, time.monotonic() when stored)
+        self.stale_after = {}
+        self.produced = {}
+        self.consumed = {}
+        self.updated = threading.Event()  # Set by every put(), for consumers that wait()
+
+    def register(self, name, stale_after, queue_size=QUEUE_SIZE):
+        if name not in self.queues:
+            self.queues[name] = deque(maxlen=queue_size)
+            self.produced[name] = self.consumed[name] = 0
+        self.stale_after[name] = stale_after
+
+    def put(self, name, timestamp, value):
+        self.queues[name].append((timestamp, value))
+        self.readings[name] = (timestamp, value, time.monotonic())
+        self.produced[name] += 1
+        self.updated.set()
+
+    def drain(self, name):
+        """Remove and return the source's queued readings, oldest first"""
+        batch = []
+        readings = self.queues.get(name)
+        while readings:
+            batch.append(readings.popleft())
+        if name in self.consumed:
+            self.consumed[name] += len(batch)
+        return batch
+
+    def wait(self, timeout=None):
+        """Block until something was put since the last wait(); False on timeout"""
+        updated = self.updated.wait(timeout)
+        self.updated.clear()
+        return updated
+
+    def age(self, name):
+        """Seconds since the source's latest reading, None before the first"""
+        reading = self.readings.get(name)
+        return time.monotonic() - reading[2] if reading is not None else None
+
+    def is_stale(self, name):
+        age = self.age(name)
+        return age is not None and age > self.stale_after[name]
+
+    def latest(self, name, default=None):
+        """The value of the source's latest reading, or `default` before the first and once it is stale"""
+        reading = self.readings.get(name)
+        if reading is None or self.is_stale(name):
+            return default
+        return reading[1]
+
+    def overflowed(self, name):
+        """Readings the consumer never saw because the source's queue was full"""
+        queue_size = self.queues[name].maxlen
+        if queue_size == 0:
+            return 0  # Latest value only, by design
+        return self.produced[name] - self.consumed[name] - len(self.queues[name])
+
+
+class _Workers:
+    """`count` daemon threads running one source's plain reads.
+
+    Daemon threads, unlike a ThreadPoolExecutor's, cannot hold up exit when a
+    read never returns.
+    """
+
+    def __init__(self, name, count):
+        self.jobs = queue.SimpleQueue()
+        self.threads = [threading.Thread(target=self._work, name=f'{name}-{i}', daemon=True) for i in range(count)]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, fn):
+        future = concurrent.futures.Future()
+        self.jobs.put((future, fn))
+        return future
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            future, fn = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+
+    def stop(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+
+
+class _SourceState:
+    """The scheduler's bookkeeping for one source; written on the loop's thread only"""
+
+    def __init__(self, source):
+        self.workers = None if asyncio.iscoroutinefunction(source.read) else _Workers(source.name, source.concurrency)
+        self.wake = asyncio.Event()  # Set by sample_soon() to cut a wait short
+        self.task = None
+        self.reads = set()  # Read tasks, referenced so they are not collected while running
+        self.in_flight = 0  # Reads started and not returned, abandoned ones included
+        self.failing = False  # The last read failed or timed out, and that was reported
+        self.ticks = 0
+        self.late_ticks = 0  # Ticks that started more than half an interval behind schedule
+        self.dropped_ticks = 0  # Ticks skipped because reads overran
+        self.timeouts = 0
+        self.errors = 0
+        self.jitter = deque(maxlen=JITTER_WINDOW)  # Seconds behind schedule, recent ticks
+
+
+class Scheduler:
+    """Polls every added Source on one asyncio loop and stores the readings in `store`.
+
+    `profile` is a TickProfiler; each read's duration is recorded under the
+    phase named in `phases` for its source, if any. The loop can also run
+    other coroutines (run_coroutine()), such as the fleet collector client.
+    """
+
+    def __init__(self, store=None, profile=None, phases=None):
+        self.store = store if store is not None else SampleStore()
+        self.profile = profile
+        self.phases = phases or {}  # Source name -> TickProfiler phase
+        self.sources = {}
+        self.paused = False
+        self.running = False
+        self.loop = asyncio.new_event_loop()
+        self._states = {}
+        self._thread = None
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run_loop, name='scheduler', daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def add(self, source):
+        """Start polling `source`; call from any thread"""
+        if source.name in self.sources:
+            raise ValueError(f"A source named '{source.name}' is already scheduled")
+        self.sources[source.name] = source
+        self.store.register(source.name, source.stale_after, source.queue_size)
+        self.loop.call_soon_threadsafe(self._start_source, source)
+
+    def _start_source(self, source):
+        state = self._states[source.name] = _SourceState(source)
+        state.task = self.loop.create_task(self._poll(source, state))
+
+    def run_coroutine(self, coroutine):
+        """Run `coroutine` on the scheduler's loop; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    async def _poll(self, source, state):
+        loop = self.loop
+        next_tick = loop.time()
+        while self.running:
+            started = loop.time()
+            lateness = started - next_tick
+            if not self.paused:
+                if state.in_flight < source.concurrency:
+                    # Wait at most one interval for the read, so a quick one can shorten the wait that follows
+                    read = loop.create_task(self._read(source, state))
+                    state.reads.add(read)
+                    read.add_done_callback(state.reads.discard)
+                    await asyncio.wait({read}, timeout=source.interval)
+                else:
+                    state.dropped_ticks += 1
+                state.ticks += 1
+                state.jitter.append(lateness)
+                if lateness > source.interval / 2:
+                    state.late_ticks += 1
+
+            # Skip the ticks already missed rather than bursting to catch up
+            next_tick += source.interval
+            now = loop.time()
+            if now > next_tick:
+                missed = int((now - next_tick) // source.interval) + 1
+                if not self.paused:
+                    state.dropped_ticks += missed
+                next_tick += missed * source.interval
+            try:
+                await asyncio.wait_for(state.wake.wait(), next_tick - now)
+            except asyncio.TimeoutError:
+                continue
+            state.wake.clear()
+            next_tick = loop.time()
+
+    def _release(self, state):
+        state.in_flight -= 1
+
+    async def _read(self, source, state):
+        state.in_flight += 1
+        start = time.perf_counter()
+        try:
+            if state.workers is None:
+                try:
+                    value = await asyncio.wait_for(source.read(), source.timeout)
+                finally:
+                    state.in_flight -= 1
+            else:
+                future = state.workers.submit(source.read)
+                # Released when the thread is done, not when the read is abandoned
+                future.add_done_callback(lambda _: self._call_soon(self._release, state))
+                value = await asyncio.wait_for(asyncio.wrap_future(future), source.timeout)
+        except asyncio.TimeoutError:
+            state.timeouts += 1
+            if not state.failing:  # Only report the first failure of an outage
+                print(f"Reading {source.name} took over {source.timeout:g}s; abandoned it", file=sys.stderr)
+                state.failing = True
+            return
+        except Exception as e:
+            state.errors += 1
+            if not state.failing:
+                print(f"Error reading {source.name}: {e!r}", file=sys.stderr)
+                state.failing = True
+            return
+        state.failing = False
+        phase = self.phases.get(source.name)
+        if self.profile is not None and phase is not None:
+            self.profile.record(phase, time.perf_counter() - start)
+        timestamp = time.time()
+        self.store.put(source.name, timestamp, value)
+        source.interval = max(MIN_INTERVAL, source.next_interval(timestamp, value))
+
+    def _call_soon(self, callback, *args):
+        try:
+            self.loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            pass  # The loop has been closed
+
+    def _wake(self, name):
+        for source_name, state in self._states.items():
+            if name is None or source_name == name:
+                state.wake.set()
+
+    def sample_soon(self, name=None):
+        """Read `name` (every source if None) now instead of at the end of a long interval"""
+        self._call_soon(self._wake, name)
+
+    def stop(self, timeout=1.0):
+        """Cancel every task on the loop and stop it, waiting up to `timeout` seconds"""
+        self.running = False
+        try:
+            future = self.run_coroutine(self._shutdown())
+        except RuntimeError:
+            return  # The loop has been closed
+        if self._thread is not None and self._thread is not threading.current_thread():
+            try:
+                future.result(timeout)
+            except (concurrent.futures.TimeoutError, concurrent.futures.CancelledError):
+                pass
+
+    async def _shutdown(self):
+        tasks = [task for task in asyncio.all_tasks(self.loop) if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for state in self._states.values():
+            if state.workers is not None:
+                state.workers.stop()
+        self.loop.call_soon(self.loop.stop)
+
+    def stats(self, name):
+        """Health of one source since it was added; the disk source's keys match what the metrics expect"""
+        state = self._states.get(name)
+        source = self.sources[name]
+        if state is None:  # Not started on the loop yet
+            return {'interval_ms': source.interval * 1000, 'ticks': 0, 'late_ticks': 0, 'dropped_ticks': 0,
+                    'overflowed': 0, 'jitter_p50_ms': 0.0, 'jitter_p99_ms': 0.0, 'timeouts': 0, 'errors': 0,
+                    'age_s': None, 'stale': False}
+        jitter = sorted(state.jitter)
+        if jitter:
+            p50 = jitter[len(jitter) // 2]
+            p99 = jitter[min(len(jitter) - 1, int(len(jitter) * 0.99))]
+        else:
+            p50 = p99 = 0.0
+        return {
+            'interval_ms': source.interval * 1000,
+            'ticks': state.ticks,
+            'late_ticks': state.late_ticks,
+            'dropped_ticks': state.dropped_ticks,
+            # Readings never drained because the queue overflowed while the consumer stalled
+            'overflowed': self.store.overflowed(name),
+            'jitter_p50_ms': p50 * 1000,
+            'jitter_p99_ms': p99 * 1000,
+            'timeouts': state.timeouts,
+            'errors': state.errors,
+            'age_s': self.store.age(name),
+            'stale': self.store.is_stale(name),
+        }
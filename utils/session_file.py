@@ -0,0 +1,199 @@
+"""Export a drive's recorded samples to a file, and load such a file back for viewing.
+
+Formats, chosen by extension:
+
+    .arrow, .feather  Arrow IPC file, one record batch per EXPORT_CHUNK samples
+    .parquet          Parquet, one row group per EXPORT_CHUNK samples
+    .npy              NumPy array of EXPORT_DTYPE records
+    .csv              time,usage,docker_usage lines after a '#' line of JSON metadata
+
+Arrow and Parquet need pyarrow, which is optional; .npy and .csv need only
+NumPy. Every format holds wall-clock seconds and GB, like the history store.
+Both directions work a chunk at a time, so a long history is never copied
+in full: exports stream the compressed history chunk by chunk, and imports
+memory-map .npy and Arrow files and read Parquet and CSV in chunks.
+"""
+import itertools
+import json
+import os
+
+import numpy as np
+
+EXPORT_DTYPE = np.dtype([
+    ('time', '<f8'),          # Wall-clock seconds since the epoch
+    ('usage', '<f4'),         # System used GB
+    ('docker_usage', '<f4'),  # Docker used GB (0 when unavailable)
+])
+EXPORT_CHUNK = 65_536  # Samples per record batch, row group or CSV block
+FORMATS = {'.arrow': 'arrow', '.feather': 'arrow', '.parquet': 'parquet', '.npy': 'npy', '.csv': 'csv'}
+CSV_ROW = '%.3f,%.4f,%.4f\n'
+
+
+def have_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def file_format(path):
+    """The format written to or read from `path`, from its extension; ValueError if unknown or unavailable"""
+    extension = os.path.splitext(path)[1].lower()
+    kind = FORMATS.get(extension)
+    if kind is None:
+        raise ValueError(f"Unknown session file type '{extension}'; use one of {', '.join(FORMATS)}")
+    if kind in ('arrow', 'parquet') and not have_pyarrow():
+        raise ValueError(f"Writing and reading {extension} files needs pyarrow (pip install pyarrow)")
+    return kind
+
+
+def blocks(chunks, size=EXPORT_CHUNK):
+    """Regroup (times, usage, docker_usage) chunks of any length into EXPORT_DTYPE arrays of `size` records.
+
+    Only the last block is shorter. Each block is a new array, so consumers may keep it.
+    """
+    block = np.empty(size, dtype=EXPORT_DTYPE)
+    filled = 0
+    for times, usage, docker_usage in chunks:
+        start = 0
+        while start < len(times):
+            n = min(size - filled, len(times) - start)
+            block['time'][filled:filled + n] = times[start:start + n]
+            block['usage'][filled:filled + n] = usage[start:start + n]
+            block['docker_usage'][filled:filled + n] = docker_usage[start:start + n]
+            filled += n
+            start += n
+            if filled == size:
+                yield block
+                block = np.empty(size, dtype=EXPORT_DTYPE)
+                filled = 0
+    if filled:
+        yield block[:filled]
+
+
+def _arrow_schema(metadata):
+    import pyarrow as pa
+    return pa.schema([(name, pa.from_numpy_dtype(EXPORT_DTYPE[name])) for name in EXPORT_DTYPE.names],
+                     metadata={'disk-space-visualizer': json.dumps(metadata)})
+
+
+def _record_batch(block, schema):
+    import pyarrow as pa
+    return pa.record_batch([pa.array(block[name]) for name in EXPORT_DTYPE.names], schema=schema)
+
+
+def export_session(path, chunks, count, metadata):
+    """Write `count` samples, given as (times, usage, docker_usage) chunks oldest first, to `path`.
+
+    `metadata` is a JSON-compatible dict stored alongside, where the format
+    allows (not in .npy). Returns the number of samples written.
+    """
+    kind = file_format(path)
+    if count == 0:
+        raise ValueError("There are no samples to export")
+    written = 0
+    if kind == 'npy':
+        # Sized up front and filled in place, so the samples are never all in memory
+        array = np.lib.format.open_memmap(path, mode='w+', dtype=EXPORT_DTYPE, shape=(count,))
+        for block in blocks(chunks):
+            array[written:written + len(block)] = block[:count - written]
+            written = min(count, written + len(block))
+        array.flush()
+        del array
+    elif kind == 'csv':
+        with open(path, 'w') as f:
+            f.write('# ' + json.dumps(metadata) + '\n')
+            f.write(','.join(EXPORT_DTYPE.names) + '\n')
+            for block in blocks(chunks):
+                # One % over the whole block; np.savetxt formats row by row, about 4x slower
+                values = np.column_stack([block[name] for name in EXPORT_DTYPE.names]).astype(np.float64)
+                f.write((CSV_ROW * len(block)) % tuple(values.ravel().tolist()))
+                written += len(block)
+    elif kind == 'arrow':
+        import pyarrow as pa
+        schema = _arrow_schema(metadata)
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for block in blocks(chunks):
+                writer.write_batch(_record_batch(block, schema))
+                written += len(block)
+    else:
+        import pyarrow.parquet as pq
+        schema = _arrow_schema(metadata)
+        with pq.ParquetWriter(path, schema) as writer:
+            for block in blocks(chunks):
+                writer.write_batch(_record_batch(block, schema), row_group_size=EXPORT_CHUNK)
+                written += len(block)
+    return written
+
+
+def _records(columns):
+    """EXPORT_DTYPE array from per-field arrays, e.g. the columns of an Arrow record batch"""
+    records = np.empty(len(columns[0]), dtype=EXPORT_DTYPE)
+    for name, column in zip(EXPORT_DTYPE.names, columns):
+        records[name] = column
+    return records
+
+
+def _batch_records(batch):
+    return _records([batch.column(name).to_numpy(zero_copy_only=False) for name in EXPORT_DTYPE.names])
+
+
+def _arrow_metadata(schema):
+    raw = (schema.metadata or {}).get(b'disk-space-visualizer')
+    return json.loads(raw) if raw else {}
+
+
+def _check_order(parts):
+    last = -np.inf
+    for part in parts:
+        times = part['time']
+        if len(times) and (times[0] < last or np.any(times[1:] < times[:-1])):
+            raise ValueError("Samples are not in time order")
+        if len(times):
+            last = times[-1]
+
+
+def load_session(path):
+    """(parts, metadata) of a session file.
+
+    `parts` are record arrays with at least EXPORT_DTYPE's fields, oldest
+    first, like HistoryStore.load() returns, ready for DriveHistory.fill().
+    A .npy file is a single memory map; other formats come a chunk at a time.
+    """
+    kind = file_format(path)
+    metadata = {}
+    if kind == 'npy':
+        array = np.load(path, mmap_mode='r')
+        if array.ndim != 1 or not set(EXPORT_DTYPE.names) <= set(array.dtype.names or ()):
+            raise ValueError(f"{path} does not hold {', '.join(EXPORT_DTYPE.names)} records")
+        parts = [array]
+    elif kind == 'csv':
+        parts = []
+        with open(path) as f:
+            first = f.readline()
+            if first.startswith('#'):
+                metadata = json.loads(first[1:])
+                first = f.readline()
+            names = first.strip().split(',')
+            usecols = [names.index(name) for name in EXPORT_DTYPE.names]
+            while True:
+                lines = list(itertools.islice(f, EXPORT_CHUNK))
+                if not lines:
+                    break
+                values = np.loadtxt(lines, delimiter=',', usecols=usecols, ndmin=2)
+                parts.append(_records(values.T))
+    elif kind == 'arrow':
+        import pyarrow as pa
+        reader = pa.ipc.open_file(pa.memory_map(path, 'r'))
+        metadata = _arrow_metadata(reader.schema)
+        parts = [_batch_records(reader.get_batch(i)) for i in range(reader.num_record_batches)]
+    else:
+        import pyarrow.parquet as pq
+        parquet = pq.ParquetFile(path, memory_map=True)
+        metadata = _arrow_metadata(parquet.schema_arrow)
+        parts = [_batch_records(batch) for batch in parquet.iter_batches(batch_size=EXPORT_CHUNK,
+                                                                       columns=list(EXPORT_DTYPE.names))]
+    parts = [part for part in parts if len(part)]
+    _check_order(parts)
+    return parts, metadata
@@ -0,0 +1,119 @@
+import json
+import socket
+import sys
+
+
+class StdoutSink:
+    """Write samples to a stream (stdout by default) as JSON lines"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def write(self, sample):
+        self.stream.write(json.dumps(sample) + '\n')
+        self.stream.flush()
+
+    def close(self):
+        pass
+
+
+class NullSink:
+    """Discard samples, e.g. when they are only served as metrics"""
+
+    def write(self, sample):
+        pass
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """Append samples to a file as JSON lines"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', buffering=1)  # Line buffered
+
+    def write(self, sample):
+        self.file.write(json.dumps(sample) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class SocketSink:
+    """Stream samples as JSON lines to a TCP (host, port) or Unix socket path.
+
+    Reconnects on the next sample after a failure; samples taken while the
+    peer is unreachable are dropped.
+    """
+
+    def __init__(self, address):
+        self.address = address
+        self.sock = None
+        self.failing = False
+
+    def _connect(self):
+        if isinstance(self.address, tuple):
+            self.sock = socket.create_connection(self.address, timeout=2)
+        else:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(2)
+            self.sock.connect(self.address)
+
+    def write(self, sample):
+        try:
+            if self.sock is None:
+                self._connect()
+            self.sock.sendall((json.dumps(sample) + '\n').encode())
+            self.failing = False
+        except OSError as e:
+            if not self.failing:  # Only report the first failure of an outage
+                print(f"Error writing to socket sink {self.address}: {e}", file=sys.stderr)
+                self.failing = True
+            self.close()
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+SINK_FORMS = 'stdout, none, file:PATH, tcp:HOST:PORT, unix:PATH or collector:HOST:PORT'
+
+
+def parse_sink(spec):
+    """(kind, target) of a command line sink spec: target is a path, a (host, port) or None.
+
+    Raises ValueError for a spec that is not one of SINK_FORMS, so callers
+    can report it before starting anything.
+    """
+    if spec in ('-', 'stdout'):
+        return 'stdout', None
+    if spec == 'none':
+        return 'none', None
+    kind, _, target = spec.partition(':')
+    if kind in ('file', 'unix') and target:
+        return kind, target
+    if kind in ('tcp', 'collector') and target:
+        host, _, port = target.rpartition(':')
+        try:
+            return kind, (host or 'localhost', int(port))
+        except ValueError:
+            raise ValueError(f"Invalid port in sink '{spec}' (use {kind}:HOST:PORT)") from None
+    raise ValueError(f"Unknown sink '{spec}' (use {SINK_FORMS})")
+
+
+def make_sink(spec):
+    """Build a sink from a command line spec; see parse_sink()"""
+    kind, target = parse_sink(spec)
+    if kind == 'stdout':
+        return StdoutSink()
+    if kind == 'none':
+        return NullSink()
+    if kind == 'file':
+        return FileSink(target)
+    if kind == 'collector':
+        from utils.fleet_agent import AgentSink
+        return AgentSink(target)
+    return SocketSink(target)
@@ -0,0 +1,58 @@
+"""The metrics the app samples, as Scheduler sources (see utils/scheduler.py)"""
+from utils.disk_utils import BatchDiskSampler
+from utils.scheduler import Source
+
+DISK_TIMEOUT = 1.0  # Backstop only: BatchDiskSampler leaves out mounts that miss its own 0.25 s deadline
+DOCKER_TIMEOUT = 10.0  # The CLI fallback runs `docker exec`, which can take seconds
+# A whole round of per-container queries; each query also has its own --container-timeout
+CONTAINER_ROUND_TIMEOUT = 60.0
+
+
+class DiskSource(Source):
+    """{mountpoint: (total_gb, used_gb, available_gb, percent)} of every drive `drives()` returns, in one pass"""
+
+    def __init__(self, drives, interval, max_interval, resolution):
+        super().__init__('disk', interval, max_interval, resolution, timeout=DISK_TIMEOUT)
+        self.drives = drives
+        self.disk_sampler = BatchDiskSampler()
+
+    def read(self):
+        return self.disk_sampler.sample(self.drives())
+
+    def series(self, usages):
+        return {drive: disk[1] for drive, disk in usages.items()}
+
+
+class DockerSource(Source):
+    """(total_gb, used_gb) of the Docker disk, (None, None) when unavailable.
+
+    Only the latest value is kept: every disk sample is recorded with the
+    Docker value current at the time.
+    """
+
+    def __init__(self, interval, max_interval=None, resolution=None):
+        super().__init__('docker', interval, max_interval, resolution, timeout=DOCKER_TIMEOUT, queue_size=0)
+
+    def read(self):
+        from utils.docker_utils import get_docker_usage
+        return get_docker_usage()
+
+    def series(self, values):
+        return {None: values[1]}
+
+
+class ContainerSource(Source):
+    """{container name: writable-layer GB, None for a failed query} of the containers matching `patterns`"""
+
+    def __init__(self, patterns, interval, max_interval, resolution, concurrency=8, query_timeout=5.0):
+        super().__init__('containers', interval, max_interval, resolution, timeout=CONTAINER_ROUND_TIMEOUT)
+        self.patterns = patterns or None  # None queries every running container
+        self.query_concurrency = concurrency
+        self.query_timeout = query_timeout
+
+    async def read(self):
+        from utils.docker_utils import get_container_sizes_async
+        return await get_container_sizes_async(self.patterns, self.query_concurrency, self.query_timeout)
+
+    def series(self, sizes):
+        return sizes
@@ -0,0 +1,42 @@
+import json
+import sys
+import time
+
+
+class StartupProfiler:
+    """Wall-clock duration of each startup phase.
+
+    `origin` is a time.perf_counter() value, normally taken on the first line
+    of main.py; each mark() closes the phase that started at the previous mark.
+    report() prints a table to stderr, or writes JSON if `path` is not '-'.
+    """
+
+    def __init__(self, origin=None, interpreter_ms=None, path='-'):
+        self.path = path
+        self.origin = time.perf_counter() if origin is None else origin
+        self.last = self.origin
+        self.phases = []  # [(phase, duration_ms)]
+        if interpreter_ms is not None:
+            self.phases.append(('interpreter startup', interpreter_ms))
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+
+    def report(self):
+        if self.path != '-':
+            with open(self.path, 'w') as f:
+                json.dump({'phases': [{'phase': p, 'ms': ms} for p, ms in self.phases]}, f)
+            return
+        total = 0
+        print(f"{'phase':<28} {'ms':>8} {'total':>8}", file=sys.stderr)
+        for phase, ms in self.phases:
+            total += ms
+            print(f"{phase:<28} {ms:8.1f} {total:8.1f}", file=sys.stderr)
+
+
+def interpreter_startup_ms():
+    """Time from process creation to now, at the ~10 ms resolution the OS reports it"""
+    import psutil
+    return max(0.0, (time.time() - psutil.Process().create_time()) * 1000)
@@ -0,0 +1,147 @@
+import bisect
+import json
+import math
+import time
+
+# Phases of one frame, in the order they run. `sample` (drives) and `docker`
+# (Docker and containers) are timed by the scheduler, once per read; `paint` is timed
+# whenever Qt paints the plot; the rest are summed per tick of the frame timer.
+PHASES = ('sample', 'docker', 'append', 'metrics', 'decimate', 'setData', 'axes', 'label', 'paint')
+# Per tick: the whole update_plot() call, the frame timer's lateness and how old the Docker values are
+GAUGES = ('tick', 'timer_drift', 'docker_age')
+
+BUCKETS_PER_DECADE = 10
+MIN_SECONDS = 1e-6
+MAX_SECONDS = 100.0
+_DECADES = round(math.log10(MAX_SECONDS / MIN_SECONDS))
+BUCKET_BOUNDS = [MIN_SECONDS * 10 ** (i / BUCKETS_PER_DECADE) for i in range(_DECADES * BUCKETS_PER_DECADE + 1)]
+
+
+class Histogram:
+    """Fixed log-spaced buckets of durations in seconds, from MIN_SECONDS to MAX_SECONDS.
+
+    Recording is a bisect and three additions, so it can run on every tick;
+    memory never grows. Percentiles are read back at bucket resolution
+    (about 26% wide); the exact maximum and last value are kept alongside.
+    """
+
+    bounds = BUCKET_BOUNDS
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)  # Bucket i holds values up to bounds[i]; the last, the rest
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (0-100), capped at the maximum seen"""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.bounds[i], self.max) if i < len(self.bounds) else self.max
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self):
+        """Milliseconds, for display and dumps"""
+        return {
+            'count': self.count,
+            'mean_ms': self.mean * 1000,
+            'p50_ms': self.percentile(50) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'max_ms': self.max * 1000,
+            'last_ms': self.last * 1000,
+        }
+
+
+class TickProfiler:
+    """Where the time of each frame goes, in one Histogram per phase.
+
+    On the GUI thread, begin() starts a tick and each mark(phase) adds the
+    time since the previous mark to that phase; end() files the tick's sums
+    into the histograms, so a phase entered several times per tick (decimate
+    and setData, once per curve) counts once with its total. Marks outside a
+    tick, from redraws while zooming for instance, are ignored. Other threads
+    record() their own phases directly. Timing costs one perf_counter() call
+    per mark.
+    """
+
+    def __init__(self):
+        self.histograms = {name: Histogram() for name in PHASES + GAUGES}
+        self.started = time.time()
+        self._tick = {}  # Phase -> seconds so far in the current tick
+        self._tick_start = None
+        self._last = None
+
+    def begin(self):
+        self._tick.clear()
+        self._tick_start = self._last = time.perf_counter()
+
+    def cancel(self):
+        """Drop the current tick, e.g. one that had nothing to draw"""
+        self._tick.clear()
+        self._tick_start = self._last = None
+
+    def mark(self, phase):
+        if self._last is None:
+            return
+        now = time.perf_counter()
+        self._tick[phase] = self._tick.get(phase, 0.0) + (now - self._last)
+        self._last = now
+
+    def end(self):
+        if self._tick_start is None:
+            return
+        self.record('tick', time.perf_counter() - self._tick_start)
+        for phase, seconds in self._tick.items():
+            self.histograms[phase].record(seconds)
+        self._tick.clear()
+        self._tick_start = self._last = None
+
+    def record(self, name, seconds):
+        self.histograms[name].record(seconds)
+
+    def reset(self):
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self.started = time.time()
+
+    def summary(self):
+        return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def table(self):
+        """One line per phase and gauge that has been recorded, for the HUD"""
+        lines = [f"{'':<12}{'last':>8}{'p50':>8}{'p99':>8}{'max':>8}  ms"]
+        for name, histogram in self.histograms.items():
+            if histogram.count:
+                s = histogram.summary()
+                lines.append(f"{name:<12}{s['last_ms']:8.2f}{s['p50_ms']:8.2f}{s['p99_ms']:8.2f}{s['max_ms']:8.1f}")
+        return '\n'.join(lines)
+
+    def dump(self, path, **context):
+        """Write every histogram, buckets included, as JSON to `path`"""
+        data = dict(context, since=self.started, time=time.time(),
+                    bucket_bounds_s=BUCKET_BOUNDS, histograms={
+                        name: dict(histogram.summary(), counts=histogram.counts)
+                        for name, histogram in self.histograms.items()})
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
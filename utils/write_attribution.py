@@ -0,0 +1,485 @@
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import deque, OrderedDict
+
+from watchdog.events import (FileSystemEventHandler, FileCreatedEvent, FileModifiedEvent, FileDeletedEvent,
+                             FileMovedEvent, DirCreatedEvent)
+from watchdog.observers import Observer
+
+MAX_USER_WATCHES_PATH = '/proc/sys/fs/inotify/max_user_watches'
+DEFAULT_MAX_WATCHES = 50_000  # Also capped to half the kernel's inotify limit, leaving room for other programs
+MAX_SCHEDULES = 64  # Watchdog runs an emitter thread per scheduled directory
+DEFAULT_DEPTH = 3  # Writes count towards their directory at most this many levels below a root
+BATCH_INTERVAL = 0.5  # Seconds between batches
+MAX_PENDING = 20_000  # Distinct paths waiting for a batch; further events are dropped and counted
+STATS_PER_BATCH = 5_000  # Paths stat'ed per batch; the rest wait for the next one
+DEFAULT_WINDOW = 60  # Seconds of writes behind top()
+MAX_TRACKED_FILES = 200_000  # Last known sizes kept, least recently touched dropped first
+
+# What happened to a pending path, as far as its size goes
+MODIFIED, CREATED, REMOVED = range(3)
+# Events that can change a size. With inotify the filter also keeps opens and
+# closes out of the kernel queue, a third of an install's events.
+EVENT_FILTER = [FileCreatedEvent, FileModifiedEvent, FileDeletedEvent, FileMovedEvent, DirCreatedEvent]
+
+# inotify, read directly on Linux (see _InotifyQueue)
+IN_MODIFY = 0x2
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_DONT_FOLLOW = 0x2000000
+IN_EXCL_UNLINK = 0x4000000
+IN_ISDIR = 0x40000000
+INOTIFY_MASK = (IN_MODIFY | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR | IN_DONT_FOLLOW
+                | IN_EXCL_UNLINK)
+_EVENT = struct.Struct('iIII')  # struct inotify_event: wd, mask, cookie, len, then the name
+READ_SIZE = 64 * 1024
+READ_INTERVAL = 0.02  # Seconds between reads of the kernel's queue, which holds 16k events by default
+POLL_TIMEOUT = 0.2  # Seconds between checks for stop() while nothing happens
+
+_STAT_DIR_FD = os.stat in os.supports_dir_fd  # Not on Windows
+
+_libc = None
+if sys.platform.startswith('linux'):
+    try:
+        _libc = ctypes.CDLL(None, use_errno=True)
+        _libc.inotify_init1, _libc.inotify_add_watch, _libc.inotify_rm_watch  # Missing from some libcs
+    except (OSError, AttributeError):
+        _libc = None
+
+
+def watch_budget(max_watches=DEFAULT_MAX_WATCHES, path=MAX_USER_WATCHES_PATH):
+    """Directories we may watch: max_watches, or half the inotify limit where that is lower"""
+    try:
+        with open(path) as f:
+            return min(max_watches, int(f.read()) // 2)
+    except (OSError, ValueError):
+        return max_watches  # Not Linux; FSEvents and ReadDirectoryChangesW have no per-directory cost
+
+
+def _subdirs(path, device):
+    """Subdirectories of path on filesystem `device`, symlinks and other mounts (/proc, network shares) left out"""
+    subdirs = []
+    crossed = False
+    with os.scandir(path) as entries:
+        for e in entries:
+            if not e.is_dir(follow_symlinks=False):
+                continue
+            try:
+                same = e.stat(follow_symlinks=False).st_dev == device
+            except OSError:
+                continue
+            if same:
+                subdirs.append(e.path)
+            else:
+                crossed = True
+    return subdirs, crossed
+
+
+def count_dirs(path, limit, device=None):
+    """Directories in the tree at path (itself included), counting no further than limit + 1.
+
+    With `device` given, a tree that has another filesystem mounted inside it
+    counts as limit + 1 too: a recursive watch would follow into that mount.
+    """
+    if device is None:
+        device = os.stat(path).st_dev
+    count = 0
+    stack = [path]
+    while stack and count <= limit:
+        count += 1
+        try:
+            subdirs, crossed = _subdirs(stack.pop(), device)
+        except OSError:
+            continue
+        if crossed:
+            return limit + 1
+        stack.extend(subdirs)
+    return count
+
+
+def plan_watches(roots, budget, max_schedules=MAX_SCHEDULES):
+    """Split roots into (path, recursive) watches covering as much as `budget` directories allow.
+
+    A tree that fits is watched recursively. One that does not, or that has
+    another filesystem mounted inside it, is watched at its top level only and
+    its subdirectories are planned the same way, so a huge tree degrades to
+    watching its shallower parts. Only each root's own filesystem is watched:
+    mounts below it are left out. Returns the watches, the paths left
+    unwatched and the number of directories watched.
+    """
+    initial_budget = budget
+    watches = []
+    skipped = []
+    queue = deque()
+    for root in roots:
+        try:
+            queue.append((root, os.stat(root).st_dev))
+        except OSError:
+            skipped.append(root)
+    while queue:
+        path, device = queue.popleft()
+        if budget <= 0 or len(watches) >= max_schedules:
+            skipped.append(path)
+            continue
+        size = count_dirs(path, budget, device)
+        if size <= budget:
+            watches.append((path, True))
+            budget -= size
+            continue
+        watches.append((path, False))
+        budget -= 1
+        try:
+            subdirs, _ = _subdirs(path, device)
+        except OSError:
+            continue
+        queue.extend((subdir, device) for subdir in sorted(subdirs))
+    return watches, skipped, initial_budget - budget
+
+
+class _PendingPaths:
+    """Changed paths waiting for a batch, one entry per path however many events it gets"""
+
+    def __init__(self, max_pending):
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        self.pending = {}  # Path -> MODIFIED, CREATED or REMOVED
+        self.events = 0
+        self.dropped = 0
+
+    def _add(self, path, kind):
+        with self.lock:
+            self._add_locked(path, kind)
+
+    def _add_locked(self, path, kind):
+        self.events += 1
+        previous = self.pending.get(path)
+        if previous is not None:
+            if kind != MODIFIED:  # A modification does not hide that the file is new
+                self.pending[path] = kind
+        elif len(self.pending) < self.max_pending:
+            self.pending[path] = kind
+        else:
+            self.dropped += 1
+
+    def take(self, limit):
+        """Up to `limit` pending paths, oldest first, and the event/drop counts so far"""
+        with self.lock:
+            if len(self.pending) <= limit:
+                batch, self.pending = self.pending, {}
+            else:
+                batch = {}
+                for path in list(self.pending)[:limit]:
+                    batch[path] = self.pending.pop(path)
+            return batch, self.events, self.dropped
+
+
+class _EventQueue(_PendingPaths, FileSystemEventHandler):
+    """Collects changed paths from watchdog's threads"""
+
+    def __init__(self, max_pending, watches):
+        super().__init__(max_pending)
+        self.observer = Observer()
+        for path, recursive in watches:
+            try:
+                try:
+                    self.observer.schedule(self, path, recursive=recursive, event_filter=EVENT_FILTER)
+                except TypeError:  # watchdog before 4.0
+                    self.observer.schedule(self, path, recursive=recursive)
+            except OSError as e:
+                print(f"Error watching {path}: {e}")
+        self.observer.start()
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._add(event.src_path, CREATED)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self._add(event.src_path, MODIFIED)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._add(event.src_path, REMOVED)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self._add(event.src_path, REMOVED)
+            self._add(event.dest_path, CREATED)
+
+    def stop(self):
+        self.observer.stop()
+        self.observer.join()
+
+
+class _InotifyQueue(_PendingPaths):
+    """Collects changed paths straight from an inotify descriptor, on Linux.
+
+    Watchdog hands every event through three threads and several queues,
+    each a wakeup and a few Python calls per event. Here one
+    thread reads the kernel's queue in bulk every READ_INTERVAL and folds
+    each read into the pending paths under a single lock, so a burst of
+    writes to one file costs a dictionary lookup per event and nothing more.
+    Recursive watches add a watch per directory, following new ones.
+    """
+
+    def __init__(self, max_pending, watches):
+        super().__init__(max_pending)
+        self.fd = _libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}  # Watch descriptor -> (directory, recursive, device)
+        self.paths = {}  # Directory -> watch descriptor
+        self._stopped = threading.Event()
+        for path, recursive in watches:
+            try:
+                self._watch_tree(path, recursive, os.stat(path).st_dev)
+            except OSError as e:
+                print(f"Error watching {path}: {e}")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _watch(self, path, recursive, device):
+        wd = _libc.inotify_add_watch(self.fd, os.fsencode(path), INOTIFY_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {path}')
+        self.watches[wd] = (path, recursive, device)
+        self.paths[path] = wd
+
+    def _watch_tree(self, path, recursive, device, created=False):
+        """Watch path, and with `recursive` every directory below it on `device`.
+
+        With `created`, the files already in these directories are queued as
+        new: they were written before their directory's watch existed.
+        """
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            self._watch(directory, recursive, device)
+            if created:
+                with os.scandir(directory) as entries:
+                    for e in entries:
+                        if not e.is_dir(follow_symlinks=False):
+                            self._add_locked(e.path, CREATED)
+            if recursive:
+                stack.extend(_subdirs(directory, device)[0])
+
+    def _unwatch_tree(self, path):
+        """Forget the watches of a directory moved away and of everything below it"""
+        prefix = path.rstrip(os.sep) + os.sep
+        for directory in [d for d in self.paths if d == path or d.startswith(prefix)]:
+            _libc.inotify_rm_watch(self.fd, self.paths.pop(directory))
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self.fd, select.POLLIN)
+        while not self._stopped.is_set():
+            if not poller.poll(POLL_TIMEOUT * 1000):
+                continue
+            chunks = []
+            while True:
+                try:
+                    chunks.append(os.read(self.fd, READ_SIZE))
+                except BlockingIOError:
+                    break
+            with self.lock:
+                for chunk in chunks:
+                    self._parse(chunk)
+            self._stopped.wait(READ_INTERVAL)  # Let the next events pile up, to read them in one go
+        os.close(self.fd)
+
+    def _parse(self, buffer):
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = _EVENT.unpack_from(buffer, offset)
+            name = buffer[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b'\0')
+            offset += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                self.dropped += 1  # The kernel dropped an unknown number of events
+                continue
+            watch = self.watches.get(wd)
+            if watch is None:
+                continue
+            if mask & IN_IGNORED:
+                del self.watches[wd]
+                if self.paths.get(watch[0]) == wd:
+                    del self.paths[watch[0]]
+                continue
+            directory, recursive, device = watch
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                if mask & IN_MOVED_FROM:
+                    self._unwatch_tree(path)
+                elif recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    try:
+                        # A new directory may have files already; one moved in brings no new bytes
+                        self._watch_tree(path, True, device, created=bool(mask & IN_CREATE))
+                    except OSError:
+                        pass  # Gone again, or out of watches
+            elif mask & IN_MODIFY:
+                self._add_locked(path, MODIFIED)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_locked(path, CREATED)
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._add_locked(path, REMOVED)
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+
+class WriteAttributor(threading.Thread):
+    """Live bytes written per directory under a few roots, from filesystem events.
+
+    Filesystem events (read from inotify directly on Linux, through watchdog
+    elsewhere) are coalesced per path as they arrive, and handled in batches
+    every BATCH_INTERVAL seconds: only the touched files are stat'ed, once per
+    batch however often they were written, and the change
+    from their last known size is credited to their directory (or its
+    ancestor DEFAULT_DEPTH levels below the root). A file seen for the first
+    time through a modification only sets its baseline, since its earlier
+    size is unknown. Under an event storm at most MAX_PENDING paths wait and
+    STATS_PER_BATCH are stat'ed per batch; the rest are dropped and reported
+    in stats(). top() answers from running totals over the last `window`
+    seconds.
+
+    Overhead: in bench_write_attribution (50,000 files written into 500 new
+    directories) the process uses about 8% more CPU with the attributor
+    reading inotify than without one, and about 40% more going through
+    watchdog (medians of 3 runs on one busy core).
+    """
+
+    def __init__(self, roots, max_watches=DEFAULT_MAX_WATCHES, depth=DEFAULT_DEPTH, window=DEFAULT_WINDOW):
+        super().__init__(daemon=True)
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.max_watches = max_watches
+        self.depth = depth
+        self.window = window
+        self.queue = _PendingPaths(MAX_PENDING)  # Replaced by one fed by the watches once they are planned
+        self.watches = []
+        self.skipped = []
+        self._sizes = OrderedDict()  # Path -> last known size, in least recently touched order
+        self._batches = deque()  # (monotonic time, {directory: bytes}) within the window
+        self._totals = {}  # Directory -> bytes over the batches in the window
+        self._lock = threading.Lock()  # Guards _batches and _totals, read by the GUI thread
+        self._stats = {'watched_dirs': 0, 'events': 0, 'dropped': 0, 'events_per_s': 0.0}
+        self._stopped = threading.Event()
+
+    def run(self):
+        # Planning walks the trees, so it happens here rather than on the caller's thread
+        budget = watch_budget(self.max_watches)
+        self.watches, self.skipped, self._stats['watched_dirs'] = plan_watches(self.roots, budget)
+        queue = None
+        if _libc is not None:
+            try:
+                queue = _InotifyQueue(MAX_PENDING, self.watches)
+            except OSError as e:
+                print(f"Error opening inotify, falling back to watchdog: {e}")
+        self.queue = queue or _EventQueue(MAX_PENDING, self.watches)
+        if self.skipped:
+            print(f"Watch limit reached; not watching {len(self.skipped)} directories such as {self.skipped[0]}")
+
+        last_events = 0
+        last_time = time.monotonic()
+        while not self._stopped.wait(BATCH_INTERVAL):
+            batch, events, dropped = self.queue.take(STATS_PER_BATCH)
+            now = time.monotonic()
+            self._apply(now, self._measure(batch))
+            self._stats.update(events=events, dropped=dropped,
+                               events_per_s=(events - last_events) / max(now - last_time, 1e-9))
+            last_events, last_time = events, now
+        self.queue.stop()
+
+    def _owner(self, directory):
+        """The directory the bytes of files in `directory` are credited to"""
+        for root in self.roots:
+            if directory == root or directory.startswith(root.rstrip(os.sep) + os.sep):
+                parts = os.path.relpath(directory, root).split(os.sep)
+                if len(parts) > self.depth:
+                    return os.path.join(root, *parts[:self.depth])
+                return directory
+        return directory
+
+    def _measure(self, batch):
+        """{directory: bytes} for one batch of changed paths.
+
+        Paths are grouped by directory, so each directory is resolved once and
+        its files are stat'ed relative to it rather than from the root again.
+        """
+        by_directory = {}
+        for path, kind in batch.items():
+            directory, name = os.path.split(path)
+            by_directory.setdefault(directory, []).append((path, name, kind))
+        deltas = {}
+        sizes = self._sizes
+        for directory, entries in by_directory.items():
+            fd = None
+            if _STAT_DIR_FD and any(kind != REMOVED for _, _, kind in entries):
+                try:
+                    fd = os.open(directory, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+                except OSError:
+                    pass  # Gone, with everything in it; the stats below fail the same way
+            try:
+                delta = 0
+                for path, name, kind in entries:
+                    previous = sizes.pop(path, None)
+                    try:
+                        if kind == REMOVED:
+                            size = None
+                        elif fd is not None:
+                            size = os.stat(name, dir_fd=fd, follow_symlinks=False).st_size
+                        else:
+                            size = os.stat(path, follow_symlinks=False).st_size
+                    except OSError:
+                        size = None  # Gone by now
+                    if size is not None:
+                        sizes[path] = size
+                        if len(sizes) > MAX_TRACKED_FILES:
+                            sizes.popitem(last=False)
+                    if previous is None and kind == MODIFIED:
+                        continue  # First sighting of an existing file only sets its baseline
+                    delta += (size or 0) - (previous or 0)
+            finally:
+                if fd is not None:
+                    os.close(fd)
+            if delta:
+                owner = self._owner(directory)
+                deltas[owner] = deltas.get(owner, 0) + delta
+        return deltas
+
+    def _apply(self, now, deltas):
+        with self._lock:
+            if deltas:
+                self._batches.append((now, deltas))
+                for directory, delta in deltas.items():
+                    self._totals[directory] = self._totals.get(directory, 0) + delta
+            while self._batches and now - self._batches[0][0] > self.window:
+                _, expired = self._batches.popleft()
+                for directory, delta in expired.items():
+                    total = self._totals[directory] - delta
+                    if total:
+                        self._totals[directory] = total
+                    else:
+                        del self._totals[directory]
+
+    def top(self, n=10):
+        """The n directories with the most bytes written in the window, as (directory, bytes), largest first"""
+        with self._lock:
+            growing = [(d, b) for d, b in self._totals.items() if b > 0]
+        growing.sort(key=lambda item: item[1], reverse=True)
+        return growing[:n]
+
+    def stats(self):
+        return dict(self._stats, unwatched_trees=len(self.skipped), pending=len(self.queue.pending))
+
+    def stop(self):
+        self._stopped.set()